@@ -1,36 +1,70 @@
-from flask import Flask, send_from_directory
+from flask import Flask, send_from_directory, abort
+from werkzeug.serving import is_running_from_reloader
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
 
+# -----------------------------------------------------------
+# ✅ Load environment variables from .env file
+#    (before the route imports, which read env at import time)
+# -----------------------------------------------------------
+load_dotenv()
+
+from config.db_config import init_app as init_db, warm_up_pool, get_read_connection, release_request_connection
+from utils.storage import lookup_rel_path, existing_path
+from utils.response_layer import init_app as init_response_layer, raw_response
+
 # ✅ Import route blueprints
 from routes.upload_routes import upload_bp
+from routes.chunked_upload_routes import chunked_upload_bp
 from routes.human_review_routes import human_review_bp
 from routes.dashboard_routes import dashboard_bp
 from routes.fix_review_routes import fix_review_bp
 from routes.monitoring_routes import monitoring_bp
 from routes.login_route import login_bp  # ✅ NEW
+from routes.export_routes import export_bp
+from routes.ops_routes import ops_bp
+from utils.conversion_jobs import start_pool as start_conversion_pool
 
 # -----------------------------------------------------------
-# ✅ Load environment variables from .env file
+# ✅ Image -> PDF workers, forked before any thread is running
+#    (with the debug reloader only the serving child needs them)
 # -----------------------------------------------------------
-load_dotenv()
+if __name__ != "__main__" or is_running_from_reloader():
+    start_conversion_pool()
 
 # -----------------------------------------------------------
 # ✅ Initialize Flask App
 # -----------------------------------------------------------
 app = Flask(__name__)
 CORS(app)  # Allow frontend (React) to make API calls
+init_db(app)  # Per-request DB connection is always returned on teardown
+init_response_layer(app)  # ETag / 304 + gzip for JSON GET responses
+
+# Open the DB pool in the background; /readyz reports when it's usable
+if os.getenv("DB_POOL_WARMUP", "1") == "1":
+    warm_up_pool()
 
 # -----------------------------------------------------------
 # ✅ Register all blueprints (routes)
 # -----------------------------------------------------------
 app.register_blueprint(upload_bp)
+app.register_blueprint(chunked_upload_bp)
 app.register_blueprint(monitoring_bp)
 app.register_blueprint(human_review_bp)
 app.register_blueprint(dashboard_bp)
 app.register_blueprint(fix_review_bp)
 app.register_blueprint(login_bp)
+app.register_blueprint(export_bp)
+app.register_blueprint(ops_bp)
+
+# -----------------------------------------------------------
+# ✅ Optional host_sync drop-folder watcher (HOST_SYNC_WATCH=1)
+#    With the debug reloader only the serving child starts it.
+# -----------------------------------------------------------
+if os.getenv("HOST_SYNC_WATCH", "0") == "1" and (__name__ != "__main__" or is_running_from_reloader()):
+    from workers.host_sync_watcher import start_watcher
+    start_watcher(app)
 
 
 
@@ -48,8 +82,26 @@ print(f"✅ Upload folder: {UPLOAD_FOLDER}")
 # ✅ Serve PDF and image files
 # -----------------------------------------------------------
 @app.route("/uploaded_docs/<path:filename>")
+@raw_response
 def serve_uploaded_docs(filename):
-    return send_from_directory(UPLOAD_FOLDER, filename)
+    # Flat file or a sharded relative path: served as-is
+    if os.path.isfile(os.path.join(UPLOAD_FOLDER, filename)):
+        return send_from_directory(UPLOAD_FOLDER, filename)
+
+    # Bare name of a sharded file: resolve through stored_files
+    rel_path = None
+    if "/" not in filename:
+        try:
+            rel_path = lookup_rel_path(get_read_connection(), filename)
+        except Exception as e:
+            print(f"❌ Could not resolve {filename}: {e}")
+        finally:
+            release_request_connection()
+
+    found = existing_path(UPLOAD_FOLDER, rel_path, os.path.basename(filename))
+    if not found:
+        abort(404)
+    return send_from_directory(UPLOAD_FOLDER, found)
 
 # -----------------------------------------------------------
 # ✅ Run the app
@@ -1,35 +1,366 @@
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg
+from psycopg.pq import TransactionStatus
 from psycopg_pool import ConnectionPool
+from flask import g, request
+
+# -----------------------------------------------------------
+# ✅ Pool settings (override via environment / .env)
+#    DB_*          -> primary (all writes)
+#    DB_REPLICA_*  -> optional streaming replica for read-only routes;
+#                     unset DB_REPLICA_HOST = everything uses the primary
+# -----------------------------------------------------------
+def _db_config(role="primary"):
+    cfg = {
+        'dbname': os.getenv("DB_NAME", "mydb"),
+        'user': os.getenv("DB_USER", "sql_developer"),
+        'password': os.getenv("DB_PASSWORD", "Dev@123"),
+        'host': os.getenv("DB_HOST", "103.14.123.44"),
+        'port': int(os.getenv("DB_PORT", "5432")),
+    }
+    if role == "replica":
+        cfg = {
+            'dbname': os.getenv("DB_REPLICA_NAME", cfg['dbname']),
+            'user': os.getenv("DB_REPLICA_USER", cfg['user']),
+            'password': os.getenv("DB_REPLICA_PASSWORD", cfg['password']),
+            'host': os.getenv("DB_REPLICA_HOST"),
+            'port': int(os.getenv("DB_REPLICA_PORT", cfg['port'])),
+        }
+    return cfg
+
+
+def _pool_settings(role="primary"):
+    prefix = "DB_REPLICA_POOL" if role == "replica" else "DB_POOL"
+    return {
+        "min_size": int(os.getenv(f"{prefix}_MIN_SIZE", os.getenv("DB_POOL_MIN_SIZE", "1"))),
+        "max_size": int(os.getenv(f"{prefix}_MAX_SIZE", os.getenv("DB_POOL_MAX_SIZE", "10"))),
+        # seconds getconn() waits for a free connection before failing
+        "timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "10")),
+    }
 
-DB_CONFIG = {
-    'dbname': 'mydb',
-    'user': 'sql_developer',
-    'password': 'Dev@123',
-    'host': '103.14.123.44',
-    'port': 5432
-}
-
-try:
-    # ✅ Create connection pool (psycopg 3+ syntax)
-    connection_pool = ConnectionPool(
-        conninfo=(
-            f"dbname={DB_CONFIG['dbname']} "
-            f"user={DB_CONFIG['user']} "
-            f"password={DB_CONFIG['password']} "
-            f"host={DB_CONFIG['host']} "
-            f"port={DB_CONFIG['port']}"
-        ),
-        min_size=1,
-        max_size=10,
+
+def replica_configured():
+    return bool(os.getenv("DB_REPLICA_HOST"))
+
+
+def _conninfo(cfg, connect_timeout):
+    return (
+        f"dbname={cfg['dbname']} "
+        f"user={cfg['user']} "
+        f"password={cfg['password']} "
+        f"host={cfg['host']} "
+        f"port={cfg['port']} "
+        f"connect_timeout={connect_timeout}"
     )
-    print("✅ Connected to Remote PostgreSQL (103.14.123.44)")
-except Exception as e:
-    print("❌ Database Connection Error:", str(e))
 
 
-def get_connection():
-    return connection_pool.getconn()
+# -----------------------------------------------------------
+# ✅ Lazy connection pools
+#    Nothing connects at import time; a pool is created on first use
+#    (or by warm_up_pool() at startup) and fills in the background.
+# -----------------------------------------------------------
+_pools = {"primary": None, "replica": None}
+_pool_lock = threading.Lock()
+
+
+def get_pool(role="primary"):
+    if _pools[role] is None:
+        with _pool_lock:
+            if _pools[role] is None:
+                cfg = _db_config(role)
+                settings = _pool_settings(role)
+                pool = ConnectionPool(
+                    conninfo=_conninfo(cfg, settings["connect_timeout"]),
+                    min_size=settings["min_size"],
+                    max_size=settings["max_size"],
+                    timeout=settings["timeout"],
+                    name=f"boosterentry-{role}",
+                    open=False,
+                )
+                pool.open(wait=False)
+                _pools[role] = pool
+                print(f"✅ Connection pool created for PostgreSQL {role} ({cfg['host']}:{cfg['port']}/{cfg['dbname']})")
+    return _pools[role]
+
+
+def warm_up_pool(wait_timeout=None):
+    """Create the pool(s) in a background thread so startup never blocks on the DB."""
+    roles = ["primary"] + (["replica"] if replica_configured() else [])
+
+    def _warm():
+        for role in roles:
+            try:
+                get_pool(role).wait(timeout=wait_timeout or float(os.getenv("DB_WARMUP_TIMEOUT", "30")))
+                print(f"✅ Connection pool warmed up ({role})")
+            except Exception as e:
+                print(f"❌ Database warm-up failed ({role}):", str(e))
+
+    threading.Thread(target=_warm, name="db-pool-warmup", daemon=True).start()
+
+
+def check_ready(timeout=None):
+    """(ready, detail): a pooled connection answers SELECT 1 within timeout."""
+    timeout = timeout or float(os.getenv("DB_READY_TIMEOUT", "2"))
+    try:
+        with connection(timeout=timeout) as conn:
+            conn.execute("SELECT 1")
+        return True, "ok"
+    except Exception as e:
+        return False, str(e)
+
+
+# -----------------------------------------------------------
+# ✅ Connection checkout tracking
+#    Every getconn() is recorded with its start time and caller so we
+#    can warn on long holds and list connections that never came back.
+# -----------------------------------------------------------
+CONN_HOLD_WARN_SECONDS = float(os.getenv("DB_CONN_HOLD_WARN_SECONDS", "5"))
+
+_checkouts = {}              # id(conn) -> (started_at, caller, role)
+_checkouts_lock = threading.Lock()
+_checkout_totals = {"checkouts": 0, "releases": 0, "slow_releases": 0, "max_hold_seconds": 0.0}
+
+
+def _caller():
+    frame = sys._getframe(2)
+    while frame and frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+    if not frame:
+        return "?"
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+
+
+def get_connection(timeout=None, role="primary"):
+    conn = get_pool(role).getconn(timeout=timeout)
+    with _checkouts_lock:
+        _checkouts[id(conn)] = (time.monotonic(), _caller(), role)
+        _checkout_totals["checkouts"] += 1
+    return conn
 
 
 def release_connection(conn):
-    connection_pool.putconn(conn)
+    """Return conn to the pool. Rolls back any open transaction; safe to call twice."""
+    with _checkouts_lock:
+        checkout = _checkouts.pop(id(conn), None)
+    if checkout is None:
+        return  # already released
+
+    started_at, caller, role = checkout
+    held = time.monotonic() - started_at
+    with _checkouts_lock:
+        _checkout_totals["releases"] += 1
+        _checkout_totals["max_hold_seconds"] = max(_checkout_totals["max_hold_seconds"], held)
+        if held > CONN_HOLD_WARN_SECONDS:
+            _checkout_totals["slow_releases"] += 1
+    if held > CONN_HOLD_WARN_SECONDS:
+        print(f"⚠️ DB connection ({role}) held {held:.1f}s (> {CONN_HOLD_WARN_SECONDS:.0f}s) by {caller}")
+
+    # Never hand a connection back mid-transaction
+    try:
+        if not conn.closed and conn.info.transaction_status != TransactionStatus.IDLE:
+            conn.rollback()
+    except Exception as e:
+        print("⚠️ Rollback before release failed, discarding connection:", str(e))
+        conn.close()
+    _pools[role].putconn(conn)
+
+
+@contextmanager
+def connection(timeout=None, role="primary"):
+    """with connection() as conn: ...  -- always rolled back / returned."""
+    conn = get_connection(timeout=timeout, role=role)
+    try:
+        yield conn
+    finally:
+        release_connection(conn)
+
+
+def listen_connection():
+    """
+    Dedicated autocommit connection to the primary, outside the pool.
+    For LISTEN: the session must stay open for as long as notifications
+    are wanted, which a pooled connection can't guarantee.
+    """
+    settings = _pool_settings("primary")
+    return psycopg.connect(_conninfo(_db_config("primary"), settings["connect_timeout"]), autocommit=True)
+
+
+# -----------------------------------------------------------
+# ✅ Replica lag check
+#    Measured at most every DB_REPLICA_LAG_CHECK_SECONDS by whichever
+#    request finds the last reading stale; reads fall back to the
+#    primary while lag > DB_REPLICA_MAX_LAG_SECONDS or the replica is down.
+# -----------------------------------------------------------
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "10"))
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv("DB_REPLICA_LAG_CHECK_SECONDS", "5"))
+# After a write, the same browser reads from the primary for this long
+STICKY_PRIMARY_SECONDS = int(os.getenv("DB_STICKY_PRIMARY_SECONDS", "10"))
+STICKY_COOKIE = "db_primary_until"
+
+_replica_state = {"checked_at": 0.0, "lag_seconds": None, "healthy": False, "error": None}
+_replica_check_lock = threading.Lock()
+
+
+def _check_replica_lag():
+    # An idle primary sends no WAL, so "nothing left to replay" counts as 0 lag
+    try:
+        with connection(timeout=1, role="replica") as conn:
+            lag = conn.execute("""
+                SELECT CASE
+                    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+                END
+            """).fetchone()[0]
+        _replica_state.update(lag_seconds=float(lag), healthy=True, error=None)
+    except Exception as e:
+        _replica_state.update(lag_seconds=None, healthy=False, error=str(e))
+    _replica_state["checked_at"] = time.monotonic()
+
+
+def replica_usable():
+    if not replica_configured():
+        return False
+    stale = time.monotonic() - _replica_state["checked_at"] > REPLICA_LAG_CHECK_SECONDS
+    # Only one thread refreshes; the rest use the last reading
+    if stale and _replica_check_lock.acquire(blocking=False):
+        try:
+            _check_replica_lag()
+        finally:
+            _replica_check_lock.release()
+    lag = _replica_state["lag_seconds"]
+    return _replica_state["healthy"] and lag is not None and lag <= REPLICA_MAX_LAG_SECONDS
+
+
+def _sticky_to_primary():
+    if g.get("db_wrote"):
+        return True
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def read_role():
+    """'replica' or 'primary' for a read in the current request."""
+    if _sticky_to_primary() or not replica_usable():
+        return "primary"
+    return "replica"
+
+
+# -----------------------------------------------------------
+# ✅ Per-request connections (Flask g + teardown)
+#    get_request_connection() -> primary, for writes
+#    get_read_connection()    -> replica when healthy, else primary
+#    The teardown registered by init_app() returns both even if the
+#    view raised.
+# -----------------------------------------------------------
+def get_request_connection():
+    if "db_conn" not in g:
+        g.db_conn = get_connection()
+    return g.db_conn
+
+
+def get_read_connection():
+    # Already on the primary in this request -> read our own writes there
+    if "db_conn" in g:
+        return g.db_conn
+    if "db_read_conn" not in g:
+        if read_role() != "replica":
+            return get_request_connection()
+        try:
+            g.db_read_conn = get_connection(role="replica")
+        except Exception as e:
+            print("⚠️ Replica unavailable, reading from primary:", str(e))
+            _replica_state.update(healthy=False, error=str(e))
+            return get_request_connection()
+    return g.db_read_conn
+
+
+def mark_write():
+    """Call after committing a write: this browser reads from the primary for a while."""
+    g.db_wrote = True
+
+
+def release_request_connection():
+    """Hand the request's connection(s) back early (before slow non-DB work)."""
+    for key in ("db_conn", "db_read_conn"):
+        conn = g.pop(key, None)
+        if conn is not None:
+            release_connection(conn)
+
+
+def _teardown_request_connection(exc=None):
+    release_request_connection()
+
+
+def _set_sticky_cookie(response):
+    if g.get("db_wrote") and replica_configured():
+        until = time.time() + STICKY_PRIMARY_SECONDS
+        response.set_cookie(STICKY_COOKIE, f"{until:.0f}", max_age=STICKY_PRIMARY_SECONDS,
+                            httponly=True, samesite="Lax")
+    return response
+
+
+def init_app(app):
+    app.after_request(_set_sticky_cookie)
+    app.teardown_appcontext(_teardown_request_connection)
+
+
+def held_connections():
+    """Connections currently checked out, longest-held first."""
+    now = time.monotonic()
+    with _checkouts_lock:
+        items = list(_checkouts.values())
+    held = [
+        {"held_seconds": round(now - started_at, 3), "caller": caller, "role": role,
+         "over_threshold": now - started_at > CONN_HOLD_WARN_SECONDS}
+        for started_at, caller, role in items
+    ]
+    return sorted(held, key=lambda h: h["held_seconds"], reverse=True)
+
+
+def pool_stats():
+    with _checkouts_lock:
+        totals = dict(_checkout_totals)
+    return {
+        "pool": _pools["primary"].get_stats() if _pools["primary"] else None,
+        "replica_pool": _pools["replica"].get_stats() if _pools["replica"] else None,
+        "replica": {
+            "configured": replica_configured(),
+            "healthy": _replica_state["healthy"],
+            "lag_seconds": _replica_state["lag_seconds"],
+            "max_lag_seconds": REPLICA_MAX_LAG_SECONDS,
+            "error": _replica_state["error"],
+        },
+        "checkouts": totals,
+        "hold_warn_seconds": CONN_HOLD_WARN_SECONDS,
+        "held": held_connections(),
+    }
+
+
+# ✅ Run several read queries in one network round trip
+#    queries: [(sql, params), ...]  ->  [rows_of_query_1, rows_of_query_2, ...]
+#    Uses psycopg 3 pipeline mode; falls back to one-by-one if libpq < 14.
+def batch_read(conn, queries):
+    if not psycopg.Pipeline.is_supported():
+        results = []
+        for sql, params in queries:
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            results.append(cur.fetchall())
+        return results
+
+    cursors = []
+    with conn.pipeline() as pipeline:
+        for sql, params in queries:
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            cursors.append(cur)
+        pipeline.sync()
+        return [cur.fetchall() for cur in cursors]
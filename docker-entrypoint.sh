@@ -4,7 +4,14 @@ set -e
 echo "🟢 Starting Flask API on port 30010..."
 nohup python app.py > flask.log 2>&1 &
 
-sleep 4
+# Wait until the API reports ready (pool warmed, DB reachable), max 60s
+for i in $(seq 1 120); do
+  if curl -fs http://127.0.0.1:30010/readyz > /dev/null; then
+    echo "✅ Flask API is ready"
+    break
+  fi
+  sleep 0.5
+done
 
 echo "🟣 Starting React UI on port 30012..."
 npm run dev -- --host 0.0.0.0 --port 30012
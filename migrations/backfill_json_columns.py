@@ -0,0 +1,67 @@
+# migrations/backfill_json_columns.py
+# -------------------------------------------------------------------
+# Fills the JSONB shadow columns of doc_processing_log (migration 10)
+# for documents written before its trigger existed; migration 11 swaps
+# them in once nothing is left.
+#
+#   python -m migrations.backfill_json_columns            # convert
+#   python -m migrations.backfill_json_columns --dry-run  # report only
+#
+# Runs in doc_id batches, one transaction each, so the table is never
+# locked for long and the command can be stopped and re-run; rows that
+# are already converted are not written again. Rows written meanwhile
+# are converted by the trigger.
+# -------------------------------------------------------------------
+
+import sys
+from dotenv import load_dotenv
+from config.db_config import connection
+
+BATCH_SIZE = 1000
+
+
+def backfill(dry_run=False):
+    with connection() as conn:
+        last_id = 0
+        scanned = changed = 0
+        while True:
+            ids = [r[0] for r in conn.execute("""
+                SELECT doc_id FROM doc_processing_log
+                WHERE doc_id > %s
+                ORDER BY doc_id
+                LIMIT %s
+            """, (last_id, BATCH_SIZE)).fetchall()]
+            if not ids:
+                break
+            last_id = ids[-1]
+            scanned += len(ids)
+
+            # text_to_jsonb() is NULL only for NULL / blank text
+            pending = """
+                FROM doc_processing_log
+                WHERE doc_id = ANY(%s)
+                  AND ((extracted_jsonb IS NULL AND btrim(extracted_json::text) <> '')
+                    OR (corrected_jsonb IS NULL AND btrim(corrected_json::text) <> ''))
+            """
+            if dry_run:
+                changed += conn.execute("SELECT COUNT(*) " + pending, (ids,)).fetchone()[0]
+                conn.rollback()
+                continue
+
+            cur = conn.execute(f"""
+                UPDATE doc_processing_log
+                SET extracted_jsonb = text_to_jsonb(extracted_json::text),
+                    corrected_jsonb = text_to_jsonb(corrected_json::text)
+                WHERE doc_id IN (SELECT doc_id {pending})
+            """, (ids,))
+            changed += cur.rowcount
+            conn.commit()
+            print(f"🔄 Up to doc_id {last_id}: {changed} of {scanned} converted")
+
+        verb = "Would convert" if dry_run else "Converted"
+        print(f"✅ {verb} {changed} of {scanned} document(s)")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    backfill(dry_run="--dry-run" in sys.argv[1:])
@@ -0,0 +1,75 @@
+# migrations/backfill_upload_hashes.py
+# -------------------------------------------------------------------
+# Offline backfill of upload_file_hashes (migration 5) from the files
+# already in UPLOAD_FOLDER (flat and sharded), so re-uploads of older
+# documents dedup too.
+#
+#   python -m migrations.backfill_upload_hashes            # hash + insert
+#   python -m migrations.backfill_upload_hashes --dry-run  # report only
+#
+# The client is taken from the stored name "<client>_<doc_type>_...".
+# Files already in the table are skipped, so the command can be re-run;
+# existing rows are never overwritten. Images that were converted on
+# upload are indexed by their PDF's hash (the original bytes are gone),
+# so those only dedup against a re-upload of the PDF itself.
+# -------------------------------------------------------------------
+
+import os
+import sys
+from dotenv import load_dotenv
+from config.db_config import connection
+
+BATCH_SIZE = 500
+
+
+def _flush(conn, batch):
+    with conn.cursor() as cur:
+        cur.executemany("""
+            INSERT INTO upload_file_hashes (client_id, sha256, file_name, source_name, file_size)
+            VALUES (%s, %s, %s, NULL, %s)
+            ON CONFLICT (client_id, sha256) DO NOTHING
+        """, batch)
+    conn.commit()
+    batch.clear()
+
+
+def backfill(dry_run=False):
+    # Read env (UPLOAD_FOLDER) only after load_dotenv()
+    from utils.uploads import hash_file
+    from utils.storage import load_client_prefixes, client_for_file_name, walk_stored_files
+
+    with connection() as conn:
+        prefixes = load_client_prefixes(conn)
+        known = {r[0] for r in conn.execute("SELECT file_name FROM upload_file_hashes").fetchall()}
+
+        batch = []
+        hashed = skipped = unmatched = 0
+        # Skips in-flight uploads and the host_sync drop folder, whose
+        # files are not stored uploads (yet)
+        for dir_path, name in walk_stored_files():
+            if name in known:
+                skipped += 1
+                continue
+
+            client_id, _ = client_for_file_name(name, prefixes)
+            if client_id is None:
+                unmatched += 1
+                print(f"⚠️ No client matches {name}")
+                continue
+
+            sha256, size = hash_file(os.path.join(dir_path, name))
+            hashed += 1
+            batch.append((client_id, sha256, name, size))
+            if len(batch) >= BATCH_SIZE and not dry_run:
+                _flush(conn, batch)
+
+        if batch and not dry_run:
+            _flush(conn, batch)
+
+        verb = "Would index" if dry_run else "Indexed"
+        print(f"✅ {verb} {hashed} file(s); {skipped} already indexed, {unmatched} without a client")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    backfill(dry_run="--dry-run" in sys.argv[1:])
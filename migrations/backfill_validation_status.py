@@ -0,0 +1,69 @@
+# migrations/backfill_validation_status.py
+# -------------------------------------------------------------------
+# Backfill of doc_processing_log.validation_status and doc_failed_fields
+# (migration 12) for documents written before its triggers existed.
+#
+#   python -m migrations.backfill_validation_status            # update
+#   python -m migrations.backfill_validation_status --dry-run  # report only
+#
+# Runs in doc_id batches, one transaction each, so the table is never
+# locked for long and the command can be stopped and re-run; rows whose
+# stored value is already current are not written again.
+# -------------------------------------------------------------------
+
+import sys
+from dotenv import load_dotenv
+from config.db_config import connection
+
+BATCH_SIZE = 1000
+
+
+def backfill(dry_run=False):
+    with connection() as conn:
+        last_id = 0
+        scanned = changed = 0
+        while True:
+            ids = [r[0] for r in conn.execute("""
+                SELECT doc_id FROM doc_processing_log
+                WHERE doc_id > %s
+                ORDER BY doc_id
+                LIMIT %s
+            """, (last_id, BATCH_SIZE)).fetchall()]
+            if not ids:
+                break
+            last_id = ids[-1]
+            scanned += len(ids)
+
+            stale = """
+                FROM doc_processing_log
+                WHERE doc_id = ANY(%s)
+                  AND validation_status IS DISTINCT FROM COALESCE(
+                      find_validation_status(corrected_json),
+                      find_validation_status(extracted_json)
+                  )
+            """
+            if dry_run:
+                changed += conn.execute("SELECT COUNT(*) " + stale, (ids,)).fetchone()[0]
+                conn.rollback()
+                continue
+
+            # The row trigger fills doc_failed_fields from the new value
+            cur = conn.execute(f"""
+                UPDATE doc_processing_log
+                SET validation_status = COALESCE(
+                    find_validation_status(corrected_json),
+                    find_validation_status(extracted_json)
+                )
+                WHERE doc_id IN (SELECT doc_id {stale})
+            """, (ids,))
+            changed += cur.rowcount
+            conn.commit()
+            print(f"🔄 Up to doc_id {last_id}: {changed} of {scanned} updated")
+
+        verb = "Would update" if dry_run else "Updated"
+        print(f"✅ {verb} {changed} of {scanned} document(s)")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    backfill(dry_run="--dry-run" in sys.argv[1:])
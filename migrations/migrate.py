@@ -0,0 +1,638 @@
+# migrations/migrate.py
+# -------------------------------------------------------------------
+# Versioned schema migrations for the BoosterEntry AI database.
+#
+#   python -m migrations.migrate            # apply all pending
+#   python -m migrations.migrate --list     # show applied / pending
+#
+# Each entry in MIGRATIONS is applied once and recorded in
+# `schema_migrations`. Never edit an applied migration — append a new one.
+#
+# Migrations with "concurrent": True run statement-by-statement in
+# autocommit mode (required for CREATE INDEX CONCURRENTLY) so they don't
+# lock doc_processing_log against writes while the index builds. A
+# CONCURRENTLY build that was interrupted leaves an INVALID index that
+# IF NOT EXISTS would skip; it is dropped and rebuilt on the next run.
+#
+# Migrations 10 / 11 convert extracted_json / corrected_json to JSONB
+# without a table rewrite. On a database with documents the run stops
+# at 11 until the existing rows are converted:
+#   python -m migrations.migrate                  # stops at 11
+#   python -m migrations.backfill_json_columns    # batched, online
+#   python -m migrations.migrate                  # swap (brief lock) + rest
+# Until 11 has run, writers may keep sending text. Afterwards the
+# columns only accept valid JSON, so the extraction pipeline must write
+# JSON by then; deploy this app version after 11 (it reads JSONB).
+# -------------------------------------------------------------------
+
+import re
+import sys
+from dotenv import load_dotenv
+from config.db_config import connection
+
+MIGRATIONS = [
+    {
+        "version": 1,
+        "name": "doc_processing_log uploaded_on indexes",
+        "concurrent": True,
+        "statements": [
+            # Keyset paging / ORDER BY uploaded_on DESC on the list routes
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_dpl_uploaded_on
+            ON doc_processing_log (uploaded_on DESC, doc_id DESC)
+            """,
+            # Client filter + half-open date range (dashboard, monitoring)
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_dpl_client_uploaded_on
+            ON doc_processing_log (client_id, uploaded_on DESC, doc_id DESC)
+            """,
+            # The human review queue's partial indexes are built on the
+            # status code columns (migrations 2 and 3)
+        ],
+    },
+    {
+        "version": 2,
+        "name": "normalized status code columns",
+        "statements": [
+            # One ALTER so the table is rewritten only once.
+            # Codes are documented in utils/status_codes.py.
+            """
+            ALTER TABLE doc_processing_log
+                ADD COLUMN IF NOT EXISTS overall_status_code TEXT GENERATED ALWAYS AS (
+                    CASE
+                        WHEN overall_status ILIKE 'In Progress%' THEN 'in_progress'
+                        WHEN overall_status ILIKE 'Completed%' THEN 'completed'
+                        WHEN overall_status ILIKE 'Failed%' OR overall_status ILIKE 'Error%' THEN 'failed'
+                        ELSE 'other'
+                    END
+                ) STORED,
+                ADD COLUMN IF NOT EXISTS extraction_status_code TEXT GENERATED ALWAYS AS (
+                    CASE
+                        WHEN data_extraction_status ILIKE 'Completed%' OR data_extraction_status ILIKE 'Success%' THEN 'success'
+                        WHEN data_extraction_status ILIKE 'In Progress%' THEN 'in_progress'
+                        WHEN data_extraction_status ILIKE 'Failed%' OR data_extraction_status ILIKE 'Error%' THEN 'failed'
+                        ELSE 'other'
+                    END
+                ) STORED,
+                ADD COLUMN IF NOT EXISTS erp_status_code TEXT GENERATED ALWAYS AS (
+                    CASE
+                        WHEN erp_entry_status ILIKE 'Failed%' OR erp_entry_status ILIKE 'Error%' THEN 'failed'
+                        WHEN erp_entry_status ILIKE 'File Missing%' THEN 'file_missing'
+                        WHEN erp_entry_status ILIKE 'Fixed%' THEN 'fixed'
+                        WHEN erp_entry_status ILIKE 'Completed%' OR erp_entry_status ILIKE 'Success%' THEN 'success'
+                        WHEN erp_entry_status ILIKE 'In Progress%' THEN 'in_progress'
+                        ELSE 'other'
+                    END
+                ) STORED
+            """,
+        ],
+    },
+    {
+        "version": 3,
+        "name": "status code indexes",
+        "concurrent": True,
+        "statements": [
+            # Human review queue served from a partial index on the codes
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_dpl_review_codes
+            ON doc_processing_log (uploaded_on DESC, doc_id DESC)
+            WHERE extraction_status_code = 'success'
+              AND erp_status_code IN ('failed', 'file_missing')
+            """,
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_dpl_review_codes_client
+            ON doc_processing_log (client_id, uploaded_on DESC, doc_id DESC)
+            WHERE extraction_status_code = 'success'
+              AND erp_status_code IN ('failed', 'file_missing')
+            """,
+            # Monitoring ?status= filter
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_dpl_overall_code
+            ON doc_processing_log (overall_status_code, uploaded_on DESC, doc_id DESC)
+            """,
+        ],
+    },
+    {
+        "version": 4,
+        "name": "doc_daily_stats rollup",
+        "statements": [
+            # One row per (day, client, status bucket); dashboard_summary
+            # reads counts and the trend from here instead of scanning
+            # doc_processing_log. client_id 0 = document without a client.
+            """
+            CREATE TABLE IF NOT EXISTS doc_daily_stats (
+                day                     DATE    NOT NULL,
+                client_id               INTEGER NOT NULL,
+                overall_status_code     TEXT    NOT NULL,
+                extraction_status_code  TEXT    NOT NULL,
+                erp_status_code         TEXT    NOT NULL,
+                doc_count               INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, client_id, overall_status_code, extraction_status_code, erp_status_code)
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_dds_client_day
+            ON doc_daily_stats (client_id, day)
+            """,
+            # Statement-level triggers with transition tables: a bulk
+            # INSERT/UPDATE/DELETE touches each affected bucket once, and
+            # updates that don't move a row between buckets (e.g. saving
+            # corrected_json) net out to zero and write nothing.
+            """
+            CREATE OR REPLACE FUNCTION doc_daily_stats_apply() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' THEN
+                    INSERT INTO doc_daily_stats AS s
+                        (day, client_id, overall_status_code, extraction_status_code, erp_status_code, doc_count)
+                    SELECT uploaded_on::date, COALESCE(client_id, 0),
+                           overall_status_code, extraction_status_code, erp_status_code, COUNT(*)
+                    FROM new_rows
+                    WHERE uploaded_on IS NOT NULL
+                    GROUP BY 1, 2, 3, 4, 5
+                    ON CONFLICT (day, client_id, overall_status_code, extraction_status_code, erp_status_code)
+                    DO UPDATE SET doc_count = s.doc_count + EXCLUDED.doc_count;
+
+                ELSIF TG_OP = 'DELETE' THEN
+                    INSERT INTO doc_daily_stats AS s
+                        (day, client_id, overall_status_code, extraction_status_code, erp_status_code, doc_count)
+                    SELECT uploaded_on::date, COALESCE(client_id, 0),
+                           overall_status_code, extraction_status_code, erp_status_code, -COUNT(*)
+                    FROM old_rows
+                    WHERE uploaded_on IS NOT NULL
+                    GROUP BY 1, 2, 3, 4, 5
+                    ON CONFLICT (day, client_id, overall_status_code, extraction_status_code, erp_status_code)
+                    DO UPDATE SET doc_count = s.doc_count + EXCLUDED.doc_count;
+
+                ELSE
+                    INSERT INTO doc_daily_stats AS s
+                        (day, client_id, overall_status_code, extraction_status_code, erp_status_code, doc_count)
+                    SELECT day, client_id, o, e, r, SUM(delta)
+                    FROM (
+                        SELECT uploaded_on::date AS day, COALESCE(client_id, 0) AS client_id,
+                               overall_status_code AS o, extraction_status_code AS e, erp_status_code AS r,
+                               -1 AS delta
+                        FROM old_rows WHERE uploaded_on IS NOT NULL
+                        UNION ALL
+                        SELECT uploaded_on::date, COALESCE(client_id, 0),
+                               overall_status_code, extraction_status_code, erp_status_code,
+                               1
+                        FROM new_rows WHERE uploaded_on IS NOT NULL
+                    ) x
+                    GROUP BY 1, 2, 3, 4, 5
+                    HAVING SUM(delta) <> 0
+                    ON CONFLICT (day, client_id, overall_status_code, extraction_status_code, erp_status_code)
+                    DO UPDATE SET doc_count = s.doc_count + EXCLUDED.doc_count;
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+            "DROP TRIGGER IF EXISTS trg_dds_insert ON doc_processing_log",
+            "DROP TRIGGER IF EXISTS trg_dds_update ON doc_processing_log",
+            "DROP TRIGGER IF EXISTS trg_dds_delete ON doc_processing_log",
+            """
+            CREATE TRIGGER trg_dds_insert AFTER INSERT ON doc_processing_log
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION doc_daily_stats_apply()
+            """,
+            """
+            CREATE TRIGGER trg_dds_update AFTER UPDATE ON doc_processing_log
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION doc_daily_stats_apply()
+            """,
+            """
+            CREATE TRIGGER trg_dds_delete AFTER DELETE ON doc_processing_log
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION doc_daily_stats_apply()
+            """,
+            # Full rebuild, also usable by hand if the rollup is ever in doubt:
+            #   SELECT doc_daily_stats_rebuild();
+            """
+            CREATE OR REPLACE FUNCTION doc_daily_stats_rebuild() RETURNS void AS $$
+            BEGIN
+                LOCK TABLE doc_processing_log IN SHARE MODE;
+                DELETE FROM doc_daily_stats;
+                INSERT INTO doc_daily_stats
+                    (day, client_id, overall_status_code, extraction_status_code, erp_status_code, doc_count)
+                SELECT uploaded_on::date, COALESCE(client_id, 0),
+                       overall_status_code, extraction_status_code, erp_status_code, COUNT(*)
+                FROM doc_processing_log
+                WHERE uploaded_on IS NOT NULL
+                GROUP BY 1, 2, 3, 4, 5;
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+            "SELECT doc_daily_stats_rebuild()",
+        ],
+    },
+    {
+        "version": 5,
+        "name": "upload_file_hashes dedup index",
+        "statements": [
+            # (client, content hash) -> stored file name; upload_files
+            # returns the existing document for an exact re-upload.
+            # Backfill existing files with:
+            #   python -m migrations.backfill_upload_hashes
+            """
+            CREATE TABLE IF NOT EXISTS upload_file_hashes (
+                client_id    INTEGER     NOT NULL,
+                sha256       CHAR(64)    NOT NULL,
+                file_name    TEXT        NOT NULL,
+                source_name  TEXT,
+                file_size    BIGINT,
+                created_on   TIMESTAMP   NOT NULL DEFAULT now(),
+                PRIMARY KEY (client_id, sha256)
+            )
+            """,
+        ],
+    },
+    {
+        "version": 6,
+        "name": "doc_processing_log doc_file_name index",
+        "concurrent": True,
+        "statements": [
+            # Resolves a deduplicated upload to its doc_id
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_dpl_doc_file_name
+            ON doc_processing_log (doc_file_name)
+            """,
+        ],
+    },
+    {
+        "version": 7,
+        "name": "stored_files path index",
+        "statements": [
+            # Stored file name -> path relative to UPLOAD_FOLDER for files in
+            # the sharded layout (utils/storage.py). No row = flat file.
+            # Move existing files with: python -m migrations.shard_uploads
+            """
+            CREATE TABLE IF NOT EXISTS stored_files (
+                file_name  TEXT        PRIMARY KEY,
+                rel_path   TEXT        NOT NULL,
+                client_id  INTEGER,
+                stored_on  TIMESTAMP   NOT NULL DEFAULT now()
+            )
+            """,
+        ],
+    },
+    {
+        "version": 8,
+        "name": "doc_ingest_jobs queue",
+        "statements": [
+            # One row per stored upload for the extraction pipeline
+            # (utils/ingest_queue.py, reference worker workers/ingest_worker.py).
+            # A row is claimable while status is pending/running and
+            # visible_at has passed: claiming pushes visible_at out by the
+            # visibility timeout, so a crashed worker's job reappears.
+            """
+            CREATE TABLE IF NOT EXISTS doc_ingest_jobs (
+                job_id         BIGSERIAL    PRIMARY KEY,
+                file_name      TEXT         NOT NULL,
+                rel_path       TEXT         NOT NULL,
+                client_id      INTEGER,
+                doc_format_id  INTEGER,
+                source_name    TEXT,
+                sha256         CHAR(64),
+                status         TEXT         NOT NULL DEFAULT 'pending',
+                attempts       INTEGER      NOT NULL DEFAULT 0,
+                max_attempts   INTEGER      NOT NULL DEFAULT 5,
+                visible_at     TIMESTAMPTZ  NOT NULL DEFAULT now(),
+                locked_by      TEXT,
+                last_error     TEXT,
+                created_on     TIMESTAMPTZ  NOT NULL DEFAULT now(),
+                updated_on     TIMESTAMPTZ  NOT NULL DEFAULT now(),
+                CHECK (status IN ('pending', 'running', 'done', 'failed'))
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_dij_claimable
+            ON doc_ingest_jobs (visible_at, job_id)
+            WHERE status IN ('pending', 'running')
+            """,
+        ],
+    },
+    {
+        "version": 9,
+        "name": "host_sync_files checkpoint",
+        "statements": [
+            # Files the host_sync watcher (workers/host_sync_watcher.py) has
+            # taken in, keyed by their path under the drop folder. A file is
+            # only picked up again if its size or mtime changes.
+            """
+            CREATE TABLE IF NOT EXISTS host_sync_files (
+                rel_path      TEXT         PRIMARY KEY,
+                file_size     BIGINT       NOT NULL,
+                mtime_ns      BIGINT       NOT NULL,
+                file_name     TEXT,
+                status        TEXT         NOT NULL,
+                processed_on  TIMESTAMPTZ  NOT NULL DEFAULT now()
+            )
+            """,
+        ],
+    },
+    {
+        "version": 10,
+        "name": "JSONB shadow columns for extracted_json / corrected_json",
+        "statements": [
+            # text -> jsonb, NULL when it isn't JSON. Retries with single
+            # quotes replaced, as the review route's JSON parsing did; also used
+            # for JSON nested as a string value (find_validation_status()).
+            """
+            CREATE OR REPLACE FUNCTION try_jsonb(t TEXT) RETURNS JSONB AS $$
+            BEGIN
+                IF t IS NULL OR btrim(t) = '' THEN
+                    RETURN NULL;
+                END IF;
+                BEGIN
+                    RETURN t::jsonb;
+                EXCEPTION WHEN others THEN
+                    NULL;
+                END;
+                BEGIN
+                    RETURN replace(t, '''', '"')::jsonb;
+                EXCEPTION WHEN others THEN
+                    RETURN NULL;
+                END;
+            END;
+            $$ LANGUAGE plpgsql IMMUTABLE
+            """,
+            # Lenient text -> jsonb for one column value: text that doesn't
+            # parse is kept as a JSON string, not dropped (the routes treat
+            # anything but an object as empty); blank -> NULL
+            """
+            CREATE OR REPLACE FUNCTION text_to_jsonb(t TEXT) RETURNS JSONB AS $$
+                SELECT COALESCE(try_jsonb(t), to_jsonb(NULLIF(btrim(t), '')))
+            $$ LANGUAGE sql IMMUTABLE
+            """,
+            # Converted in place, ALTER COLUMN ... TYPE JSONB would rewrite
+            # the table under an ACCESS EXCLUSIVE lock. Instead: JSONB shadow
+            # columns (no rewrite, no default), kept in step with every write
+            # to the text columns by a trigger, filled for existing rows by
+            #   python -m migrations.backfill_json_columns
+            # and swapped in by migration 11.
+            """
+            ALTER TABLE doc_processing_log
+                ADD COLUMN IF NOT EXISTS extracted_jsonb JSONB,
+                ADD COLUMN IF NOT EXISTS corrected_jsonb JSONB
+            """,
+            """
+            CREATE OR REPLACE FUNCTION dpl_json_shadow_sync() RETURNS trigger AS $$
+            BEGIN
+                NEW.extracted_jsonb := text_to_jsonb(NEW.extracted_json::text);
+                NEW.corrected_jsonb := text_to_jsonb(NEW.corrected_json::text);
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+            "DROP TRIGGER IF EXISTS trg_dpl_json_shadow ON doc_processing_log",
+            """
+            CREATE TRIGGER trg_dpl_json_shadow
+            BEFORE INSERT OR UPDATE OF extracted_json, corrected_json ON doc_processing_log
+            FOR EACH ROW EXECUTE FUNCTION dpl_json_shadow_sync()
+            """,
+        ],
+    },
+    {
+        "version": 11,
+        "name": "swap in the JSONB extracted_json / corrected_json",
+        "statements": [
+            # Brief ACCESS EXCLUSIVE lock for the swap (catalog changes only).
+            # Give up rather than queue every writer behind a long query.
+            "SET LOCAL lock_timeout = '10s'",
+            # Only once the backfill is done: converting the remaining rows
+            # here would hold that lock for a table scan
+            """
+            DO $$
+            BEGIN
+                IF EXISTS (
+                    SELECT 1 FROM doc_processing_log
+                    WHERE (extracted_jsonb IS NULL AND btrim(extracted_json::text) <> '')
+                       OR (corrected_jsonb IS NULL AND btrim(corrected_json::text) <> '')
+                ) THEN
+                    RAISE EXCEPTION 'doc_processing_log has unconverted JSON; run python -m migrations.backfill_json_columns, then migrate again';
+                END IF;
+            END;
+            $$
+            """,
+            "DROP TRIGGER IF EXISTS trg_dpl_json_shadow ON doc_processing_log",
+            "DROP FUNCTION IF EXISTS dpl_json_shadow_sync()",
+            # From here on the columns only accept valid JSON: writers must
+            # send JSON (or wrap text in text_to_jsonb()) before this runs
+            """
+            ALTER TABLE doc_processing_log
+                DROP COLUMN extracted_json,
+                DROP COLUMN corrected_json
+            """,
+            "ALTER TABLE doc_processing_log RENAME COLUMN extracted_jsonb TO extracted_json",
+            "ALTER TABLE doc_processing_log RENAME COLUMN corrected_jsonb TO corrected_json",
+        ],
+    },
+    {
+        "version": 12,
+        "name": "precomputed validation status + doc_failed_fields",
+        "statements": [
+            # The ValidationStatus-like object of one document ("final_data"
+            # unwrapped): an object with FailedFields under a
+            # ValidationStatus / validation / validation_status key (any
+            # case) at any depth, or in JSON kept as a top-level string value.
+            """
+            CREATE OR REPLACE FUNCTION find_validation_status(doc JSONB) RETURNS JSONB AS $$
+            DECLARE
+                found JSONB;
+                s RECORD;
+            BEGIN
+                IF jsonb_typeof(doc) = 'object' AND doc ? 'final_data' THEN
+                    doc := doc -> 'final_data';
+                END IF;
+                IF doc IS NULL OR jsonb_typeof(doc) NOT IN ('object', 'array') THEN
+                    RETURN NULL;
+                END IF;
+                found := jsonb_path_query_first(doc, 'lax $.** ? (@.type() == "object").keyvalue() ? (@.key like_regex "^validation(_?status)?$" flag "i" && @.value.type() == "object" && exists(@.value.FailedFields)).value', '{}', true);
+                IF found IS NOT NULL OR jsonb_typeof(doc) <> 'object' THEN
+                    RETURN found;
+                END IF;
+                FOR s IN
+                    SELECT e.key, e.value FROM jsonb_each_text(doc) e
+                    WHERE jsonb_typeof(doc -> e.key) = 'string' AND e.value LIKE '%FailedFields%'
+                LOOP
+                    found := jsonb_path_query_first(try_jsonb(s.value), 'lax $.** ? (@.type() == "object").keyvalue() ? (@.key like_regex "^validation(_?status)?$" flag "i" && @.value.type() == "object" && exists(@.value.FailedFields)).value', '{}', true);
+                    IF found IS NOT NULL THEN
+                        RETURN found;
+                    END IF;
+                END LOOP;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql IMMUTABLE
+            """,
+            "ALTER TABLE doc_processing_log ADD COLUMN IF NOT EXISTS validation_status JSONB",
+            # One row per FailedFields entry of validation_status, for
+            # "documents failing field X". field_key is the field name
+            # lower-cased with only letters and digits kept (the matching
+            # FixReview.jsx uses); utils/json_projection.field_key() does the same.
+            """
+            CREATE TABLE IF NOT EXISTS doc_failed_fields (
+                doc_id     BIGINT   NOT NULL,
+                position   INTEGER  NOT NULL,
+                field      TEXT     NOT NULL,
+                field_key  TEXT     NOT NULL,
+                reason     TEXT,
+                PRIMARY KEY (doc_id, position)
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_dff_field_key
+            ON doc_failed_fields (field_key, doc_id)
+            """,
+            # Computed whenever extraction results or corrections are
+            # written, by the app or by the external pipeline: corrected
+            # first, else extracted (what the review screen shows).
+            """
+            CREATE OR REPLACE FUNCTION doc_validation_status_set() RETURNS trigger AS $$
+            BEGIN
+                NEW.validation_status := COALESCE(
+                    find_validation_status(NEW.corrected_json),
+                    find_validation_status(NEW.extracted_json)
+                );
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+            """
+            CREATE OR REPLACE FUNCTION doc_failed_fields_sync() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'UPDATE'
+                   AND NEW.doc_id = OLD.doc_id
+                   AND NEW.validation_status IS NOT DISTINCT FROM OLD.validation_status THEN
+                    RETURN NULL;
+                END IF;
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    DELETE FROM doc_failed_fields WHERE doc_id = OLD.doc_id;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO doc_failed_fields (doc_id, position, field, field_key, reason)
+                    SELECT NEW.doc_id, f.ord, f.field,
+                           lower(regexp_replace(f.field, '[^A-Za-z0-9]', '', 'g')), f.reason
+                    FROM (
+                        SELECT e.ord,
+                               CASE jsonb_typeof(e.item)
+                                   WHEN 'object' THEN COALESCE(e.item ->> 'Field', e.item ->> 'field',
+                                                               e.item ->> 'FieldName', e.item ->> 'name')
+                                   WHEN 'string' THEN e.item #>> '{}'
+                               END AS field,
+                               CASE WHEN jsonb_typeof(e.item) = 'object'
+                                   THEN COALESCE(e.item ->> 'Reason', e.item ->> 'reason', e.item ->> 'message')
+                               END AS reason
+                        FROM jsonb_array_elements(
+                            CASE WHEN jsonb_typeof(NEW.validation_status -> 'FailedFields') = 'array'
+                                 THEN NEW.validation_status -> 'FailedFields' ELSE '[]'::jsonb END
+                        ) WITH ORDINALITY AS e(item, ord)
+                    ) f
+                    WHERE lower(regexp_replace(f.field, '[^A-Za-z0-9]', '', 'g')) <> '';
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+            "DROP TRIGGER IF EXISTS trg_dpl_validation_status ON doc_processing_log",
+            "DROP TRIGGER IF EXISTS trg_dpl_failed_fields ON doc_processing_log",
+            """
+            CREATE TRIGGER trg_dpl_validation_status
+            BEFORE INSERT OR UPDATE OF extracted_json, corrected_json ON doc_processing_log
+            FOR EACH ROW EXECUTE FUNCTION doc_validation_status_set()
+            """,
+            """
+            CREATE TRIGGER trg_dpl_failed_fields
+            AFTER INSERT OR UPDATE OR DELETE ON doc_processing_log
+            FOR EACH ROW EXECUTE FUNCTION doc_failed_fields_sync()
+            """,
+            # Existing rows: python -m migrations.backfill_validation_status
+        ],
+    },
+]
+
+
+def ensure_migrations_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version     INTEGER PRIMARY KEY,
+            name        TEXT NOT NULL,
+            applied_on  TIMESTAMP NOT NULL DEFAULT NOW()
+        )
+    """)
+    conn.commit()
+
+
+def applied_versions(conn):
+    rows = conn.execute("SELECT version FROM schema_migrations").fetchall()
+    conn.commit()
+    return {r[0] for r in rows}
+
+
+CONCURRENT_INDEX_RE = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE
+)
+
+
+def drop_invalid_index(conn, stmt):
+    """Drop the index stmt creates if a failed CONCURRENTLY build left it INVALID."""
+    match = CONCURRENT_INDEX_RE.search(stmt)
+    if not match:
+        return
+    index_name = match.group(1)
+    row = conn.execute(
+        "SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)",
+        (index_name,),
+    ).fetchone()
+    if row and row[0]:
+        print(f"⚠️ Index {index_name} is INVALID (interrupted build); rebuilding")
+        conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+
+
+def apply_migration(conn, migration):
+    version, name = migration["version"], migration["name"]
+    print(f"🔧 Applying migration {version}: {name}")
+
+    if migration.get("concurrent"):
+        conn.autocommit = True
+        try:
+            for stmt in migration["statements"]:
+                drop_invalid_index(conn, stmt)
+                conn.execute(stmt)
+            conn.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                (version, name),
+            )
+        finally:
+            conn.autocommit = False
+    else:
+        with conn.transaction():
+            for stmt in migration["statements"]:
+                conn.execute(stmt)
+            conn.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                (version, name),
+            )
+
+    print(f"✅ Migration {version} applied")
+
+
+def migrate(list_only=False):
+    with connection() as conn:
+        ensure_migrations_table(conn)
+        done = applied_versions(conn)
+
+        for migration in sorted(MIGRATIONS, key=lambda m: m["version"]):
+            state = "applied" if migration["version"] in done else "pending"
+            if list_only:
+                print(f"  {migration['version']:>4}  {state:<8} {migration['name']}")
+                continue
+            if state == "pending":
+                apply_migration(conn, migration)
+
+        if not list_only:
+            print("✅ Schema is up to date")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    migrate(list_only="--list" in sys.argv[1:])
@@ -0,0 +1,153 @@
+# migrations/shard_uploads.py
+# -------------------------------------------------------------------
+# Incrementally move flat files in UPLOAD_FOLDER into the sharded
+# layout <client>/<YYYY>/<MM>/<DD>/<file_name> (utils/storage.py).
+#
+#   python -m migrations.shard_uploads                    # all eligible files
+#   python -m migrations.shard_uploads --limit 5000       # one slice per run
+#   python -m migrations.shard_uploads --include-unknown  # also files with no doc row
+#   python -m migrations.shard_uploads --dry-run
+#
+# Per batch, each file is first hard-linked to its new path, then the
+# stored_files rows are committed, then the flat name is removed, so
+# every file is readable at every step and a run can stop anywhere.
+# Re-running finishes files that an interrupted run already indexed.
+#
+# Client and day come from doc_processing_log (client, uploaded_on);
+# otherwise from the stored name "<client>_<doc_type>_<YYYYmmdd>_...".
+# By default only files the extraction pipeline has already logged are
+# moved, so nothing is pulled out from under a pending ingest.
+# -------------------------------------------------------------------
+
+import datetime
+import os
+import re
+import shutil
+import sys
+from dotenv import load_dotenv
+from config.db_config import connection
+
+BATCH_SIZE = 500
+
+_NAME_DATE_RE = re.compile(r"_(\d{8})_\d{6}_\d{6}(?:_[0-9a-f]{6})?\.[^.]+$")
+
+
+def _arg(name, default=None):
+    args = sys.argv[1:]
+    if name in args and args.index(name) + 1 < len(args):
+        return args[args.index(name) + 1]
+    return default
+
+
+def _day_from_name(file_name, path):
+    match = _NAME_DATE_RE.search(file_name)
+    if match:
+        try:
+            return datetime.datetime.strptime(match.group(1), "%Y%m%d")
+        except ValueError:
+            pass
+    return datetime.datetime.fromtimestamp(os.path.getmtime(path))
+
+
+def _place(src, dest):
+    """Second name for src at dest (hard link; copy if linking isn't possible)."""
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    try:
+        os.link(src, dest)
+    except FileExistsError:
+        pass
+    except OSError:
+        shutil.copy2(src, dest)
+
+
+def _process_batch(conn, names, prefixes, include_unknown, dry_run, upload_folder):
+    from utils.storage import rel_path_for, record_stored_files, client_for_file_name
+
+    indexed = dict(conn.execute(
+        "SELECT file_name, rel_path FROM stored_files WHERE file_name = ANY(%s)", (names,)
+    ).fetchall())
+    docs = {
+        name: (client_id, client_name, uploaded_on)
+        for name, client_id, client_name, uploaded_on in conn.execute("""
+            SELECT DISTINCT ON (d.doc_file_name)
+                   d.doc_file_name, d.client_id, c.client_name, d.uploaded_on
+            FROM doc_processing_log d
+            LEFT JOIN clients c ON d.client_id = c.client_id
+            WHERE d.doc_file_name = ANY(%s)
+            ORDER BY d.doc_file_name, d.doc_id DESC
+        """, (names,)).fetchall()
+    }
+    conn.rollback()
+
+    moves, skipped = [], 0
+    for name in names:
+        flat = os.path.join(upload_folder, name)
+
+        if name in indexed:
+            # Indexed by an interrupted run: the sharded copy is what counts
+            moves.append((name, indexed[name], None))
+            continue
+
+        if name in docs:
+            client_id, client_name, uploaded_on = docs[name]
+            client_name = client_name.replace(" ", "_") if client_name else None
+            day = uploaded_on or _day_from_name(name, flat)
+        elif include_unknown:
+            client_id, client_name = client_for_file_name(name, prefixes)
+            day = _day_from_name(name, flat)
+        else:
+            skipped += 1
+            continue
+
+        moves.append((name, rel_path_for(name, client_name, day, layout="sharded"), client_id))
+
+    if dry_run:
+        for name, rel_path, _ in moves:
+            print(f"  {name} -> {rel_path}")
+        return len(moves), skipped
+
+    for name, rel_path, _ in moves:
+        _place(os.path.join(upload_folder, name), os.path.join(upload_folder, rel_path))
+    record_stored_files(conn, [m for m in moves if m[0] not in indexed])
+    for name, _, _ in moves:
+        os.remove(os.path.join(upload_folder, name))
+
+    return len(moves), skipped
+
+
+def shard_uploads(limit=None, include_unknown=False, dry_run=False):
+    # Read env (UPLOAD_FOLDER) only after load_dotenv()
+    from utils.uploads import UPLOAD_FOLDER
+    from utils.storage import load_client_prefixes
+
+    names = sorted(
+        e.name for e in os.scandir(UPLOAD_FOLDER)
+        if e.is_file() and not e.name.startswith(".")
+    )
+    if limit:
+        names = names[:limit]
+    print(f"🔧 {len(names)} flat file(s) in {UPLOAD_FOLDER}")
+
+    moved = skipped = 0
+    with connection() as conn:
+        prefixes = load_client_prefixes(conn)
+        for i in range(0, len(names), BATCH_SIZE):
+            batch_moved, batch_skipped = _process_batch(
+                conn, names[i:i + BATCH_SIZE], prefixes, include_unknown, dry_run, UPLOAD_FOLDER
+            )
+            moved += batch_moved
+            skipped += batch_skipped
+            print(f"   … {min(i + BATCH_SIZE, len(names))}/{len(names)}")
+
+    verb = "Would move" if dry_run else "Moved"
+    print(f"✅ {verb} {moved} file(s); {skipped} without a doc_processing_log row left flat")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    limit = _arg("--limit")
+    shard_uploads(
+        limit=int(limit) if limit else None,
+        include_unknown="--include-unknown" in sys.argv[1:],
+        dry_run="--dry-run" in sys.argv[1:],
+    )
@@ -0,0 +1,354 @@
+# routes/chunked_upload_routes.py
+# -------------------------------------------------------------------
+# Chunked, resumable uploads for large scans over flaky links.
+#
+#   POST   /api/upload/chunked/init               {client_id, doc_format_id, file_name, total_size, sha256?}
+#   PUT    /api/upload/chunked/<upload_id>?offset=N   raw bytes (application/octet-stream)
+#   GET    /api/upload/chunked/<upload_id>        received / missing byte ranges (for resume)
+#   POST   /api/upload/chunked/<upload_id>/finalize   {sha256?, force_upload?}
+#   DELETE /api/upload/chunked/<upload_id>        abort
+#
+# Chunk bodies are streamed straight from the socket into a preallocated
+# file at their offset (no multipart spooling, no second copy), so chunks
+# may arrive in any order and in parallel. Each stored chunk leaves an
+# empty marker file "<offset>_<length>"; the set of markers is the resume
+# state and needs no locking. Finalize checks coverage + SHA-256, renames
+# the file into .staging and hands it to utils/ingest.ingest_staged like
+# every other entry point (dedup unless force_upload, naming, PDF
+# conversion of images, stored_files / hashes / ingest job).
+# Single-shot /api/upload is unchanged.
+# -------------------------------------------------------------------
+
+from flask import Blueprint, request, jsonify
+from utils.response_cache import invalidate_response_cache
+from utils.uploads import UPLOAD_FOLDER, is_image, staging_path, hash_file
+from utils import reference_data
+from utils.ingest import ingest_staged
+from utils import conversion_jobs
+from werkzeug.utils import secure_filename
+import json
+import os
+import re
+import shutil
+import time
+import traceback
+import uuid
+
+chunked_upload_bp = Blueprint("chunked_upload_bp", __name__)
+
+CHUNKED_DIR = os.path.join(UPLOAD_FOLDER, ".chunked")
+CHUNK_SIZE = int(os.getenv("CHUNKED_UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+MAX_FILE_SIZE = int(os.getenv("CHUNKED_UPLOAD_MAX_SIZE", str(2 * 1024 * 1024 * 1024)))
+SESSION_TTL_SECONDS = int(os.getenv("CHUNKED_UPLOAD_TTL_HOURS", "24")) * 3600
+# Finalize waits this long for a conversion slot if another upload took
+# the last one after the free_slots() check
+CHUNKED_QUEUE_WAIT = int(os.getenv("CHUNKED_UPLOAD_QUEUE_WAIT", "60"))
+IO_BLOCK = 1024 * 1024
+
+_UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+# ---------- Helpers ----------
+def _session_dir(upload_id):
+    if not _UPLOAD_ID_RE.match(upload_id or ""):
+        return None
+    path = os.path.join(CHUNKED_DIR, upload_id)
+    return path if os.path.isdir(path) else None
+
+
+def _load_session(session_dir):
+    with open(os.path.join(session_dir, "session.json"), encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _touch_session(session_dir):
+    """Record activity: session.json's mtime is what the stale-session sweep checks."""
+    try:
+        os.utime(os.path.join(session_dir, "session.json"))
+    except OSError:
+        pass
+
+
+def _received_ranges(session_dir):
+    """Merged [start, end) ranges from the chunk markers."""
+    ranges = []
+    for marker in os.listdir(os.path.join(session_dir, "chunks")):
+        start, length = marker.split("_")
+        ranges.append((int(start), int(start) + int(length)))
+    ranges.sort()
+
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _missing_ranges(received, total_size):
+    missing, pos = [], 0
+    for start, end in received:
+        if start > pos:
+            missing.append([pos, start])
+        pos = max(pos, end)
+    if pos < total_size:
+        missing.append([pos, total_size])
+    return missing
+
+
+def _cleanup_stale_sessions():
+    if not os.path.isdir(CHUNKED_DIR):
+        return
+    cutoff = time.time() - SESSION_TTL_SECONDS
+    for name in os.listdir(CHUNKED_DIR):
+        path = os.path.join(CHUNKED_DIR, name)
+        # Chunk writes don't change the session directory's own mtime;
+        # every PUT / status call touches session.json instead
+        marker = os.path.join(path, "session.json")
+        try:
+            last_activity = os.path.getmtime(marker if os.path.exists(marker) else path)
+            if last_activity < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            continue
+
+
+def _status_payload(upload_id, session, session_dir):
+    received = _received_ranges(session_dir)
+    missing = _missing_ranges(received, session["total_size"])
+    return {
+        "upload_id": upload_id,
+        "file_name": session["file_name"],
+        "total_size": session["total_size"],
+        "bytes_received": sum(end - start for start, end in received),
+        "received": received,
+        "missing": missing,
+        "complete": not missing,
+    }
+
+
+# ============================================================== #
+# 1️⃣ Start a chunked upload
+# ============================================================== #
+@chunked_upload_bp.route("/api/upload/chunked/init", methods=["POST"])
+def init_chunked_upload():
+    try:
+        payload = request.get_json(silent=True) or request.form
+        client_id = payload.get("client_id")
+        doc_format_id = payload.get("doc_format_id")
+        orig_name = secure_filename(payload.get("file_name") or "uploaded_file")
+        expected_sha256 = (payload.get("sha256") or "").lower() or None
+
+        try:
+            total_size = int(payload.get("total_size"))
+        except (TypeError, ValueError):
+            return jsonify({"status": "error", "message": "total_size must be an integer"}), 400
+
+        if not client_id or not doc_format_id:
+            return jsonify({"status": "error", "message": "Missing client or format ID"}), 400
+        if total_size <= 0 or total_size > MAX_FILE_SIZE:
+            return jsonify({"status": "error", "message": f"total_size must be between 1 and {MAX_FILE_SIZE} bytes"}), 400
+
+        # Unknown client / format fails here rather than at finalize
+        try:
+            reference_data.lookup_name_parts(client_id, doc_format_id)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+        _cleanup_stale_sessions()
+
+        ext = os.path.splitext(orig_name)[1].lower()
+        upload_id = uuid.uuid4().hex
+        session_dir = os.path.join(CHUNKED_DIR, upload_id)
+        os.makedirs(os.path.join(session_dir, "chunks"))
+
+        session = {
+            "client_id": client_id,
+            "doc_format_id": doc_format_id,
+            "file_name": orig_name,
+            "ext": ext,
+            "total_size": total_size,
+            "sha256": expected_sha256,
+            "created_at": time.time(),
+        }
+        with open(os.path.join(session_dir, "session.json"), "w", encoding="utf-8") as fh:
+            json.dump(session, fh)
+
+        # Preallocate so chunks can be written at any offset, in any order
+        with open(os.path.join(session_dir, "data.part"), "wb") as fh:
+            fh.truncate(total_size)
+
+        return jsonify({
+            "status": "success",
+            "data": {"upload_id": upload_id, "chunk_size": CHUNK_SIZE, "total_size": total_size},
+        }), 201
+
+    except Exception as e:
+        print("❌ Chunked Upload Init Error:", str(e))
+        traceback.print_exc()
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+# ============================================================== #
+# 2️⃣ Upload one chunk at ?offset=N
+# ============================================================== #
+@chunked_upload_bp.route("/api/upload/chunked/<upload_id>", methods=["PUT"])
+def put_chunk(upload_id):
+    try:
+        session_dir = _session_dir(upload_id)
+        if not session_dir:
+            return jsonify({"status": "error", "message": "Unknown upload_id"}), 404
+        session = _load_session(session_dir)
+        _touch_session(session_dir)
+
+        try:
+            offset = int(request.args.get("offset", ""))
+        except ValueError:
+            return jsonify({"status": "error", "message": "offset must be an integer"}), 400
+
+        length = request.content_length
+        if length is None:
+            return jsonify({"status": "error", "message": "Content-Length required"}), 411
+        if offset < 0 or length <= 0 or offset + length > session["total_size"]:
+            return jsonify({"status": "error", "message": "Chunk outside file bounds"}), 416
+
+        # Stream the body straight to its offset in the preallocated file
+        written = 0
+        with open(os.path.join(session_dir, "data.part"), "r+b") as fh:
+            fh.seek(offset)
+            while written < length:
+                block = request.stream.read(min(IO_BLOCK, length - written))
+                if not block:
+                    break
+                fh.write(block)
+                written += len(block)
+
+        if written:
+            # Record only what actually arrived; a cut-off chunk is resumed from here
+            open(os.path.join(session_dir, "chunks", f"{offset}_{written}"), "w").close()
+            _touch_session(session_dir)
+
+        if written < length:
+            return jsonify({
+                "status": "error",
+                "message": f"Chunk truncated: got {written} of {length} bytes",
+                "data": _status_payload(upload_id, session, session_dir),
+            }), 400
+
+        return jsonify({"status": "success", "data": _status_payload(upload_id, session, session_dir)}), 200
+
+    except Exception as e:
+        print("❌ Chunk Upload Error:", str(e))
+        traceback.print_exc()
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+# ============================================================== #
+# 3️⃣ Resume: which byte ranges are still missing?
+# ============================================================== #
+@chunked_upload_bp.route("/api/upload/chunked/<upload_id>", methods=["GET"])
+def chunked_upload_status(upload_id):
+    try:
+        session_dir = _session_dir(upload_id)
+        if not session_dir:
+            return jsonify({"status": "error", "message": "Unknown upload_id"}), 404
+        session = _load_session(session_dir)
+        _touch_session(session_dir)
+        return jsonify({"status": "success", "data": _status_payload(upload_id, session, session_dir)}), 200
+
+    except Exception as e:
+        print("❌ Chunked Upload Status Error:", str(e))
+        traceback.print_exc()
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+# ============================================================== #
+# 4️⃣ Finalize: verify coverage + checksum, hand over to ingest
+# ============================================================== #
+@chunked_upload_bp.route("/api/upload/chunked/<upload_id>/finalize", methods=["POST"])
+def finalize_chunked_upload(upload_id):
+    try:
+        session_dir = _session_dir(upload_id)
+        if not session_dir:
+            return jsonify({"status": "error", "message": "Unknown upload_id"}), 404
+        session = _load_session(session_dir)
+
+        status = _status_payload(upload_id, session, session_dir)
+        if not status["complete"]:
+            return jsonify({"status": "error", "message": "Upload incomplete", "data": status}), 409
+
+        part_path = os.path.join(session_dir, "data.part")
+        payload = request.get_json(silent=True) or {}
+        expected = (payload.get("sha256") or session.get("sha256") or "").lower()
+        actual, size = hash_file(part_path)
+        if expected and expected != actual:
+            return jsonify({
+                "status": "error",
+                "message": "Checksum mismatch",
+                "data": {"expected_sha256": expected, "actual_sha256": actual},
+            }), 422
+
+        try:
+            client_name, doc_type, _ = reference_data.lookup_name_parts(
+                session["client_id"], session.get("doc_format_id")
+            )
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+        # Refuse before touching the data, so finalize can simply be retried
+        ext = session["ext"]
+        if is_image(ext) and conversion_jobs.free_slots() < 1:
+            resp = jsonify({"status": "error", "message": "Image conversion queue is full, please retry shortly"})
+            resp.headers["Retry-After"] = "5"
+            return resp, 503
+
+        # Same filesystem -> rename, no copy; from here on it's an ordinary
+        # staged upload (dedup, naming, conversion, indexing, ingest job)
+        src_path = staging_path(ext)
+        os.replace(part_path, src_path)
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+        force_upload = str(payload.get("force_upload", "")).lower() in ("1", "true", "yes")
+        entry = {
+            "orig_name": session["file_name"],
+            "ext": ext,
+            "is_image": is_image(ext),
+            "src_path": src_path,
+            "sha256": actual,
+            "size": size,
+        }
+        uploaded_records = ingest_staged(
+            [entry], session["client_id"], session.get("doc_format_id"), client_name, doc_type,
+            force_upload=force_upload, queue_wait=CHUNKED_QUEUE_WAIT,
+        )
+
+        result = entry.get("result") or {"status": "error", "message": "not processed"}
+        if result["status"] == "error":
+            return jsonify({"status": "error", "message": result["message"]}), 500
+
+        if result["status"] == "duplicate":
+            message = "0 file(s) uploaded successfully. 1 duplicate(s) matched existing documents."
+        else:
+            invalidate_response_cache()
+            message = "1 file(s) uploaded successfully."
+        print(f"✅ Chunked upload {upload_id} finalized as {result['file_name']} ({result['status']})")
+
+        return jsonify({"status": "success", "message": message, "data": uploaded_records}), 200
+
+    except Exception as e:
+        print("❌ Chunked Upload Finalize Error:", str(e))
+        traceback.print_exc()
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+# ============================================================== #
+# 5️⃣ Abort
+# ============================================================== #
+@chunked_upload_bp.route("/api/upload/chunked/<upload_id>", methods=["DELETE"])
+def abort_chunked_upload(upload_id):
+    session_dir = _session_dir(upload_id)
+    if not session_dir:
+        return jsonify({"status": "error", "message": "Unknown upload_id"}), 404
+    shutil.rmtree(session_dir, ignore_errors=True)
+    return jsonify({"status": "success", "message": f"Upload {upload_id} aborted"}), 200
@@ -1,78 +1,81 @@
 # routes/dashboard_routes.py
 from flask import Blueprint, request, jsonify
-from config.db_config import get_connection, release_connection
+from config.db_config import get_read_connection, batch_read
+from utils.query_filters import build_doc_filters
+from utils.response_cache import cached_response
+from utils.db_json import DB_RENDERED_JSON, json_object_sql, json_array_sql, json_response
 from datetime import datetime, timedelta
 
 dashboard_bp = Blueprint("dashboard_bp", __name__)
 
+# One recent upload, rendered by Postgres (same keys / formats as the Python path)
+RECENT_ROW_JSON = json_object_sql({
+    "client": "client_name",
+    "doc_type": "doc_type",
+    "file_name": "doc_file_name",
+    "uploaded_on": "to_char(uploaded_on, 'YYYY-MM-DD HH24:MI:SS')",
+    "status": "overall_status",
+})
+
 @dashboard_bp.route("/api/dashboard_summary", methods=["GET"])
+@cached_response("dashboard_summary")
 def dashboard_summary():
-    conn = None
+    # --- Optional Filters (client + half-open date range) ---
+    try:
+        filters, params = build_doc_filters(request.args)
+        # Same filters against the doc_daily_stats rollup (migration 4)
+        stats_filters, stats_params = build_doc_filters(request.args, alias="s", date_column="day")
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-
-        # --- Optional Filters ---
-        client_id = request.args.get("client_id")
-        from_date = request.args.get("from_date")
-        to_date = request.args.get("to_date")
-
-        filters = []
-        params = []
-
-        if client_id:
-            filters.append("d.client_id = %s")
-            params.append(client_id)
-
-        if from_date and to_date:
-            filters.append("DATE(d.uploaded_on) BETWEEN %s AND %s")
-            params.extend([from_date, to_date])
-        elif from_date:
-            filters.append("DATE(d.uploaded_on) >= %s")
-            params.append(from_date)
-        elif to_date:
-            filters.append("DATE(d.uploaded_on) <= %s")
-            params.append(to_date)
+        conn = get_read_connection()
 
         where_clause = "WHERE " + " AND ".join(filters) if filters else ""
+        stats_where = "WHERE " + " AND ".join(stats_filters) if stats_filters else ""
+
+        # --- 1️⃣ Summary counts (from rollup) ---
+        # The rollup has no bucket for documents without uploaded_on; they
+        # are counted from doc_processing_log (uploaded_on index, IS NULL)
+        # unless a date range excludes them anyway
+        summary_source = f"""
+            SELECT s.overall_status_code, s.extraction_status_code, s.erp_status_code, s.doc_count
+            FROM doc_daily_stats s
+            {stats_where}
+        """
+        summary_params = list(stats_params)
+        if not (request.args.get("from_date") or request.args.get("to_date")):
+            summary_source += f"""
+            UNION ALL
+            SELECT d.overall_status_code, d.extraction_status_code, d.erp_status_code, 1
+            FROM doc_processing_log d
+            WHERE {" AND ".join(filters + ["d.uploaded_on IS NULL"])}
+            """
+            summary_params += params
 
-        # --- 1️⃣ Summary counts ---
         summary_query = f"""
             SELECT 
-                COUNT(*) AS total_docs,
-                COUNT(*) FILTER (WHERE d.overall_status ILIKE 'In Progress%%') AS in_progress,
-                COUNT(*) FILTER (WHERE d.overall_status ILIKE 'Completed%%') AS completed,
-                COUNT(*) FILTER (WHERE d.overall_status ILIKE 'Failed%%' OR d.overall_status ILIKE 'Error%%') AS failed,
-                COUNT(*) FILTER (
-                    WHERE (d.data_extraction_status ILIKE 'Completed%%' OR d.data_extraction_status ILIKE 'Success%%')
-                    AND (d.erp_entry_status ILIKE 'Failed%%' OR d.erp_entry_status ILIKE 'Error%%')
-                ) AS human_review
-            FROM doc_processing_log d
-            {where_clause};
+                COALESCE(SUM(s.doc_count), 0) AS total_docs,
+                COALESCE(SUM(s.doc_count) FILTER (WHERE s.overall_status_code = 'in_progress'), 0) AS in_progress,
+                COALESCE(SUM(s.doc_count) FILTER (WHERE s.overall_status_code = 'completed'), 0) AS completed,
+                COALESCE(SUM(s.doc_count) FILTER (WHERE s.overall_status_code = 'failed'), 0) AS failed,
+                COALESCE(SUM(s.doc_count) FILTER (
+                    WHERE s.extraction_status_code = 'success'
+                    AND s.erp_status_code = 'failed'
+                ), 0) AS human_review
+            FROM ({summary_source}) s;
         """
-        cur.execute(summary_query, tuple(params))
-        summary_row = cur.fetchone()
-
-        summary = {
-            "total_docs": summary_row[0] or 0,
-            "in_progress": summary_row[1] or 0,
-            "completed": summary_row[2] or 0,
-            "failed": summary_row[3] or 0,
-            "human_review": summary_row[4] or 0,
-        }
 
-        # --- 2️⃣ Trend chart: docs per day (last 7 or filtered) ---
+        # --- 2️⃣ Trend chart: docs per day (from rollup; undated docs have no day) ---
         trend_query = f"""
-            SELECT TO_CHAR(DATE(d.uploaded_on), 'Mon DD') AS day_label,
-                   COUNT(*) AS documents
-            FROM doc_processing_log d
-            {where_clause}
+            SELECT TO_CHAR(s.day, 'Mon DD') AS day_label,
+                   SUM(s.doc_count) AS documents
+            FROM doc_daily_stats s
+            {stats_where}
             GROUP BY day_label
-            ORDER BY MIN(DATE(d.uploaded_on));
+            HAVING SUM(s.doc_count) > 0
+            ORDER BY MIN(s.day);
         """
-        cur.execute(trend_query, tuple(params))
-        trend_rows = cur.fetchall()
-        trend_data = [{"date": r[0], "documents": r[1]} for r in trend_rows]
 
         # --- 3️⃣ Recent uploads (last 5) ---
         recent_query = f"""
@@ -87,10 +90,39 @@ def dashboard_summary():
             LEFT JOIN doc_formats f ON d.doc_format_id = f.doc_format_id
             {where_clause}
             ORDER BY d.uploaded_on DESC
-            LIMIT 5;
+            LIMIT 5
         """
-        cur.execute(recent_query, tuple(params))
-        recent_rows = cur.fetchall()
+        if DB_RENDERED_JSON:
+            recent_query = f"""
+                SELECT {json_array_sql(RECENT_ROW_JSON, "uploaded_on DESC")}
+                FROM ({recent_query}) AS recent;
+            """
+
+        # ✅ All three queries in a single round trip (pipeline mode)
+        summary_rows, trend_rows, recent_rows = batch_read(conn, [
+            (summary_query, tuple(summary_params)),
+            (trend_query, tuple(stats_params)),
+            (recent_query, tuple(params)),
+        ])
+        summary_row = summary_rows[0]
+
+        summary = {
+            "total_docs": summary_row[0] or 0,
+            "in_progress": summary_row[1] or 0,
+            "completed": summary_row[2] or 0,
+            "failed": summary_row[3] or 0,
+            "human_review": summary_row[4] or 0,
+        }
+
+        trend_data = [{"date": r[0], "documents": r[1]} for r in trend_rows]
+
+        if DB_RENDERED_JSON:
+            return json_response(
+                raw={"recent": recent_rows[0][0]},
+                status="success",
+                summary=summary,
+                trend=trend_data,
+            )
 
         recent_docs = []
         for r in recent_rows:
@@ -102,7 +134,6 @@ def dashboard_summary():
                 "status": r[4],
             })
 
-        release_connection(conn)
         return jsonify({
             "status": "success",
             "summary": summary,
@@ -112,9 +143,4 @@ def dashboard_summary():
 
     except Exception as e:
         print("❌ Dashboard Summary API Error:", str(e))
-        if conn:
-            try:
-                release_connection(conn)
-            except Exception:
-                pass
         return jsonify({"status": "error", "message": str(e)}), 500
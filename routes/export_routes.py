@@ -0,0 +1,143 @@
+# routes/export_routes.py
+# -------------------------------------------------------------------
+# Streaming export of the monitoring / human review lists.
+#
+#   GET /api/export/monitoring?format=csv&client_id=..&status=..&from_date=..&to_date=..
+#   GET /api/export/human_review?format=ndjson&client_id=..&from_date=..&to_date=..
+#
+# Takes the same filters as /api/monitoring and /api/human_review.
+#   csv    -> COPY (...) TO STDOUT, blocks forwarded as they arrive
+#   ndjson -> cursor.stream(), one JSON object per line
+# Nothing is collected in Python, so memory stays flat for 1k or 5M rows.
+# -------------------------------------------------------------------
+
+from flask import Blueprint, Response, request, jsonify
+from config.db_config import get_connection, release_connection, read_role
+from routes.monitoring_routes import build_monitoring_query
+from routes.human_review_routes import build_human_review_query
+from datetime import datetime
+import json
+import traceback
+
+export_bp = Blueprint("export_bp", __name__)
+
+EXPORT_SOURCES = {
+    "monitoring": build_monitoring_query,
+    "human_review": build_human_review_query,
+}
+
+# Flush NDJSON to the client in ~64 KB chunks rather than per row
+NDJSON_FLUSH_BYTES = 64 * 1024
+
+# Same columns / names / timestamp format as the JSON list responses
+EXPORT_COLUMNS = [
+    "id", "client_name", "doc_type", "file_name", "uploaded_on",
+    "overall_status", "data_extraction_status", "erp_entry_status",
+]
+
+
+def _export_select(base_query):
+    return f"""
+        SELECT
+            q.doc_id AS id,
+            q.client_name,
+            q.doc_type,
+            q.doc_file_name AS file_name,
+            TO_CHAR(q.uploaded_on, 'YYYY-MM-DD HH24:MI:SS') AS uploaded_on,
+            q.overall_status,
+            q.data_extraction_status,
+            q.erp_entry_status
+        FROM ({base_query}) AS q
+        ORDER BY q.uploaded_on DESC NULLS LAST, q.doc_id DESC
+    """
+
+
+def _stream_csv(conn, query, params):
+    try:
+        cur = conn.cursor()
+        copy_sql = f"COPY ({query}) TO STDOUT WITH (FORMAT CSV, HEADER)"
+        with cur.copy(copy_sql, tuple(params)) as copy:
+            for block in copy:
+                yield bytes(block)
+    except Exception as e:
+        # Re-raise so the chunked response is aborted: the client must see
+        # a broken transfer, not a short file that looks complete
+        print("❌ CSV Export Error:", str(e))
+        traceback.print_exc()
+        raise
+
+
+def _stream_ndjson(conn, query, params):
+    try:
+        cur = conn.cursor()
+        buf = []
+        size = 0
+        for row in cur.stream(query, tuple(params)):
+            line = json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + "\n"
+            buf.append(line)
+            size += len(line)
+            if size >= NDJSON_FLUSH_BYTES:
+                yield "".join(buf)
+                buf, size = [], 0
+        if buf:
+            yield "".join(buf)
+    except Exception as e:
+        # Re-raise so the chunked response is aborted: the client must see
+        # a broken transfer, not a short file that looks complete
+        print("❌ NDJSON Export Error:", str(e))
+        traceback.print_exc()
+        raise
+
+
+# ==========================================================
+# ✅ Stream filtered processing logs as CSV / NDJSON
+# ==========================================================
+@export_bp.route("/api/export/<source>", methods=["GET"])
+def export_processing_logs(source):
+    build_query = EXPORT_SOURCES.get(source)
+    if not build_query:
+        return jsonify({"status": "error", "message": f"Unknown export source: {source}"}), 404
+
+    fmt = (request.args.get("format") or "csv").lower()
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"status": "error", "message": "format must be csv or ndjson"}), 400
+
+    try:
+        base_query, params = build_query(request.args)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    conn = None
+    try:
+        query = _export_select(base_query)
+
+        conn = get_connection(role=read_role())
+
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if fmt == "csv":
+            body = _stream_csv(conn, query, params)
+            mimetype = "text/csv"
+        else:
+            body = _stream_ndjson(conn, query, params)
+            mimetype = "application/x-ndjson"
+
+        response = Response(
+            body,
+            mimetype=mimetype,
+            headers={
+                "Content-Disposition": f'attachment; filename="{source}_export_{stamp}.{fmt}"',
+                "X-Accel-Buffering": "no",
+            },
+        )
+        # The response now owns the connection; release_connection() rolls
+        # back (or discards it, if cut off mid-stream) when the body closes
+        response.call_on_close(lambda c=conn: release_connection(c))
+        conn = None
+        return response
+
+    except Exception as e:
+        print("❌ Export Error:", str(e))
+        traceback.print_exc()
+        if conn:
+            release_connection(conn)
+        return jsonify({"status": "error", "message": str(e)}), 500
@@ -1,7 +1,11 @@
 # fix_review_routes.py
 from flask import Blueprint, jsonify, request, send_from_directory
-from config.db_config import get_connection, release_connection
-import json
+from config.db_config import get_request_connection, get_read_connection, release_request_connection, mark_write
+from utils.response_cache import invalidate_response_cache
+from utils.storage import existing_path
+from utils.response_layer import raw_response
+from utils.json_projection import PROJECTION_JOIN, matched_fields_sql
+from psycopg.types.json import Jsonb
 import traceback
 import os
 
@@ -11,74 +15,35 @@ UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), "upload
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 print(f"📂 Upload folder set to: {UPLOAD_FOLDER}")
 
-# ---------- Helpers ----------
-def safe_json_load(text):
-    if not text:
-        return {}
-    try:
-        return json.loads(text)
-    except Exception:
-        # Try to fix single quotes -> double quotes (best-effort), else return {}
-        try:
-            return json.loads(text.replace("'", '"'))
-        except Exception:
-            return {}
-
-def deep_find_validation(obj):
-    """Look through object and nested stringified JSONs to find ValidationStatus-like object."""
-    if not obj or not isinstance(obj, (dict, list)):
-        return None
-    # If dict and has ValidationStatus or validation key - return it
-    if isinstance(obj, dict):
-        for k in obj.keys():
-            if k and isinstance(k, str) and k.lower() in ("validationstatus", "validation", "validation_status", "validationstatus"):
-                candidate = obj.get(k)
-                if candidate and isinstance(candidate, dict) and "FailedFields" in candidate:
-                    return candidate
-        # otherwise search recursively
-        for k, v in obj.items():
-            if isinstance(v, dict):
-                found = deep_find_validation(v)
-                if found:
-                    return found
-            elif isinstance(v, str):
-                # try parse
-                try:
-                    parsed = json.loads(v)
-                    found = deep_find_validation(parsed)
-                    if found:
-                        return found
-                except Exception:
-                    continue
-    elif isinstance(obj, list):
-        for item in obj:
-            found = deep_find_validation(item)
-            if found:
-                return found
-    return None
-
 # ============================================================== #
 # GET single document for human review (returns extracted + validation)
 # ============================================================== #
 @fix_review_bp.route("/api/human_review/<int:doc_id>", methods=["GET"])
 def get_human_review_doc(doc_id):
-    conn = None
     try:
-        conn = get_connection()
+        conn = get_read_connection()
         cur = conn.cursor()
 
-        query = """
+        # ✅ Projected in SQL: the form fields of the display / corrected
+        #    data, not the whole documents. ValidationStatus was found and
+        #    stored when the JSON was written (migration 12).
+        #    ?raw=1 adds the full extracted JSON for debugging.
+        with_raw = request.args.get("raw") == "1"
+        query = f"""
             SELECT 
                 d.doc_id,
                 d.doc_file_name,
-                d.extracted_json,
-                d.corrected_json,
+                {matched_fields_sql("p.display")},
+                {matched_fields_sql("p.corrected")},
+                d.validation_status,
+                {"d.extracted_json" if with_raw else "NULL"},
                 d.data_extraction_status,
                 d.erp_entry_status,
                 d.uploaded_on,
                 c.client_name,
                 f.doc_type
             FROM doc_processing_log d
+            {PROJECTION_JOIN}
             LEFT JOIN clients c ON d.client_id = c.client_id
             LEFT JOIN doc_formats f ON d.doc_format_id = f.doc_format_id
             WHERE d.doc_id = %s
@@ -87,15 +52,15 @@ def get_human_review_doc(doc_id):
         row = cur.fetchone()
 
         if not row:
-            if conn:
-                release_connection(conn)
             return jsonify({"status": "error", "message": "Document not found"}), 404
 
         (
             doc_id,
             file_name,
-            extracted_json_text,
-            corrected_json_text,
+            display_data,
+            corrected_data,
+            validation_obj,
+            raw_extracted,
             data_extraction_status,
             erp_entry_status,
             uploaded_on,
@@ -103,28 +68,12 @@ def get_human_review_doc(doc_id):
             doc_type,
         ) = row
 
-        extracted_json = safe_json_load(extracted_json_text)
-        corrected_json = safe_json_load(corrected_json_text)
-
-        # If extracted_json uses wrapper { "final_data": { ... } }, pick that
-        extracted_final = extracted_json.get("final_data", extracted_json) if isinstance(extracted_json, dict) else extracted_json
-        corrected_final = corrected_json.get("final_data", corrected_json) if isinstance(corrected_json, dict) else corrected_json
-
-        # prefer corrected (if non-empty) else extracted
-        display_data = corrected_final if (isinstance(corrected_final, dict) and corrected_final) else extracted_final
-
-        # Find ValidationStatus anywhere: top-level, inside extracted, or inside corrected
-        validation_obj = None
-        # 1) try corrected top-level
-        validation_obj = deep_find_validation(corrected_final) or deep_find_validation(extracted_final) or None
-
         # Build file_url for iframe preview
         base_url = request.host_url.rstrip("/")
         file_url = f"{base_url}/api/human_review/pdf/{doc_id}"
 
         # Release DB early
-        release_connection(conn)
-        conn = None
+        release_request_connection()
 
         # Return: doc + extracted_data + ValidationStatus
         response_data = {
@@ -139,21 +88,21 @@ def get_human_review_doc(doc_id):
                 "file_url": file_url,
             },
             # Note: frontend will decide which keys to show / order
-            "extracted_data": display_data if isinstance(display_data, dict) else {},
-            "corrected_data": corrected_final if isinstance(corrected_final, dict) else {},
+            "extracted_data": display_data,
+            "corrected_data": corrected_data,
             # Provide ValidationStatus in a key frontend expects
-            "ValidationStatus": validation_obj if isinstance(validation_obj, dict) else None,
-            # keep raw JSON for debugging if needed
-            "raw_extracted": extracted_json
+            "ValidationStatus": validation_obj,
         }
 
+        # keep raw JSON for debugging if needed
+        if with_raw:
+            response_data["raw_extracted"] = raw_extracted if raw_extracted is not None else {}
+
         return jsonify({"status": "success", "data": response_data}), 200
 
     except Exception as e:
         print("❌ Error loading FixReview doc:", str(e))
         traceback.print_exc()
-        if conn:
-            release_connection(conn)
         return jsonify({
             "status": "error",
             "message": str(e),
@@ -166,16 +115,14 @@ def get_human_review_doc(doc_id):
 # ============================================================== #
 @fix_review_bp.route("/api/human_review/update_corrected/<int:doc_id>", methods=["POST"])
 def update_corrected_json(doc_id):
-    conn = None
     try:
         payload = request.get_json(force=True, silent=True)
         if not payload or "corrected_json" not in payload:
             return jsonify({"status": "error", "message": "Missing corrected_json"}), 400
 
         corrected_json_data = payload["corrected_json"]
-        corrected_json_text = json.dumps({"final_data": corrected_json_data}, ensure_ascii=False)
 
-        conn = get_connection()
+        conn = get_request_connection()
         cur = conn.cursor()
 
         update_query = """
@@ -187,22 +134,24 @@ def update_corrected_json(doc_id):
             WHERE doc_id = %s
             RETURNING doc_id;
         """
-        cur.execute(update_query, (corrected_json_text, doc_id))
+        cur.execute(update_query, (Jsonb({"final_data": corrected_json_data}), doc_id))
         result = cur.fetchone()
         conn.commit()
 
+        # ✅ Row left the review queue / status changed -> drop cached lists
+        #    and keep this user's next reads on the primary
+        if result:
+            invalidate_response_cache()
+            mark_write()
+
         if not result:
-            release_connection(conn)
             return jsonify({"status": "error", "message": f"No record found for doc_id={doc_id}"}), 404
 
-        release_connection(conn)
         return jsonify({"status": "success", "message": f"Corrected JSON saved for doc_id={doc_id}"}), 200
 
     except Exception as e:
         print("❌ Exception while saving corrected JSON:", str(e))
         traceback.print_exc()
-        if conn:
-            release_connection(conn)
         return jsonify({"status": "error", "message": str(e), "traceback": traceback.format_exc()}), 500
 
 
@@ -210,29 +159,33 @@ def update_corrected_json(doc_id):
 # Serve PDF file
 # ============================================================== #
 @fix_review_bp.route("/api/human_review/pdf/<int:doc_id>", methods=["GET"])
+@raw_response
 def serve_pdf(doc_id):
-    conn = None
     try:
-        conn = get_connection()
+        conn = get_read_connection()
         cur = conn.cursor()
-        cur.execute("SELECT doc_file_name FROM doc_processing_log WHERE doc_id = %s", (doc_id,))
+        # stored_files has the sharded path; no row = flat file
+        cur.execute("""
+            SELECT d.doc_file_name, sf.rel_path
+            FROM doc_processing_log d
+            LEFT JOIN stored_files sf ON sf.file_name = d.doc_file_name
+            WHERE d.doc_id = %s
+        """, (doc_id,))
         row = cur.fetchone()
         if not row:
-            release_connection(conn)
             return jsonify({"status": "error", "message": "File not found in database"}), 404
 
-        file_name = row[0]
+        file_name, rel_path = row
         pdf_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../uploaded_docs"))
-        file_full_path = os.path.join(pdf_path, file_name)
 
-        release_connection(conn)
-        if not os.path.exists(file_full_path):
+        release_request_connection()
+        found = existing_path(pdf_path, rel_path, file_name)
+        if not found:
+            file_full_path = os.path.join(pdf_path, rel_path or file_name)
             return jsonify({"status": "error", "message": f"PDF not found on disk: {file_full_path}"}), 404
 
-        return send_from_directory(pdf_path, file_name)
+        return send_from_directory(pdf_path, found)
     except Exception as e:
         print(f"❌ Error loading PDF for doc_id={doc_id}: {str(e)}")
         traceback.print_exc()
-        if conn:
-            release_connection(conn)
         return jsonify({"status": "error", "message": str(e), "traceback": traceback.format_exc()}), 500
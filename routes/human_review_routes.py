@@ -1,75 +1,86 @@
 from flask import Blueprint, request, jsonify
-from config.db_config import get_connection, release_connection
+from config.db_config import get_read_connection
+from utils.pagination import parse_page_args, fetch_keyset_page, fetch_keyset_page_json
+from utils.db_json import DB_RENDERED_JSON, json_object_sql, json_response
+from utils.query_filters import build_doc_filters
+from utils.response_cache import cached_response
+from utils.status_codes import HUMAN_REVIEW_PREDICATE
+from utils.json_projection import field_key
 from datetime import datetime
 import traceback
 
 human_review_bp = Blueprint("human_review_bp", __name__)
 
+# ----------------------------------------------------------
+# Base SELECT + params for the human review queue
+# (shared with the streaming export in export_routes.py)
+# ----------------------------------------------------------
+def build_human_review_query(args):
+    # ✅ Queue predicate on normalized status codes (partial index, migration 3)
+    base_query = f"""
+        SELECT 
+            d.doc_id,
+            c.client_name,
+            f.doc_type,
+            d.doc_file_name,
+            d.uploaded_on,
+            d.overall_status,
+            d.data_extraction_status,
+            d.erp_entry_status
+        FROM doc_processing_log d
+        LEFT JOIN clients c ON d.client_id = c.client_id
+        LEFT JOIN doc_formats f ON d.doc_format_id = f.doc_format_id
+        WHERE {HUMAN_REVIEW_PREDICATE}
+    """
+
+    # ✅ Optional client filter + half-open uploaded_on range
+    filters, params = build_doc_filters(args)
+
+    # ✅ Add dynamic filters if any
+    if filters:
+        base_query += " AND " + " AND ".join(filters)
+
+    return base_query, params
+
+
+# One queue row, rendered by Postgres (same keys / formats as the Python path)
+HUMAN_REVIEW_ROW_JSON = json_object_sql({
+    "id": "doc_id",
+    "client_name": "client_name",
+    "doc_type": "doc_type",
+    "file_name": "doc_file_name",
+    "uploaded_on": "to_char(uploaded_on, 'YYYY-MM-DD HH24:MI:SS')",
+    "overall_status": "overall_status",
+    "data_extraction_status": "data_extraction_status",
+    "erp_entry_status": "erp_entry_status",
+})
+
+
 @human_review_bp.route("/api/human_review", methods=["GET"])
+@cached_response("human_review")
 def get_human_review():
-    conn = None
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-
-        client_id = request.args.get("client_id")
-        from_date = request.args.get("from_date")
-        to_date = request.args.get("to_date")
-
-        # ✅ Escaping %% to ensure psycopg2 handles placeholders, not Python
-        base_query = """
-            SELECT 
-                d.doc_id,
-                c.client_name,
-                f.doc_type,
-                d.doc_file_name,
-                d.uploaded_on,
-                d.overall_status,
-                d.data_extraction_status,
-                d.erp_entry_status
-            FROM doc_processing_log d
-            LEFT JOIN clients c ON d.client_id = c.client_id
-            LEFT JOIN doc_formats f ON d.doc_format_id = f.doc_format_id
-            WHERE (d.data_extraction_status ILIKE 'Completed%%' OR d.data_extraction_status ILIKE 'Success%%')
-              AND (d.erp_entry_status ILIKE 'Failed%%' OR d.erp_entry_status ILIKE 'Error%%' OR d.erp_entry_status ILIKE 'File Missing%%')
-        """
-
-        filters = []
-        params = []
-
-        # ✅ Optional client filter
-        if client_id:
-            filters.append("d.client_id = %s")
-            params.append(client_id)
-
-        # ✅ Date filtering logic
-        if from_date and to_date:
-            filters.append("DATE(d.uploaded_on) BETWEEN %s AND %s")
-            params.extend([from_date, to_date])
-        elif from_date:
-            filters.append("DATE(d.uploaded_on) >= %s")
-            params.append(from_date)
-        elif to_date:
-            filters.append("DATE(d.uploaded_on) <= %s")
-            params.append(to_date)
-
-        # ✅ Add dynamic filters if any
-        if filters:
-            base_query += " AND " + " AND ".join(filters)
-
-        base_query += " ORDER BY d.uploaded_on DESC;"
+        page = parse_page_args(request.args)
+        base_query, params = build_human_review_query(request.args)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    try:
+        conn = get_read_connection()
 
         # Debug logging
         print("\n🟡 [HUMAN_REVIEW DEBUG]")
         print("🔹 SQL:", base_query)
         print("🔹 Params:", params)
 
-        cur.execute(base_query, tuple(params))
-        rows = cur.fetchall()
+        # ✅ Postgres renders the page as JSON text; no per-row Python work
+        if DB_RENDERED_JSON:
+            data_json, paging = fetch_keyset_page_json(conn, base_query, params, page, HUMAN_REVIEW_ROW_JSON)
+            extra = {"paging": paging} if page.limit or page.count else {}
+            return json_response(raw={"data": data_json}, status="success", **extra)
 
-        # Column debug
-        colnames = [desc[0] for desc in cur.description]
-        print("🟢 Columns Returned:", colnames)
+        # ✅ Keyset paging through a server-side cursor (one page in memory)
+        rows, paging = fetch_keyset_page(conn, base_query, params, page, "human_review_page")
         print("🟢 Row Count:", len(rows))
 
         # ✅ Prepare structured JSON data
@@ -92,23 +103,123 @@ def get_human_review():
                 "erp_entry_status": r[7],
             })
 
-        release_connection(conn)
         print(f"✅ Returned {len(data)} rows.")
-        return jsonify({"status": "success", "data": data}), 200
+        response = {"status": "success", "data": data}
+        if page.limit or page.count:
+            response["paging"] = paging
+        return jsonify(response), 200
 
     except Exception as e:
         print("❌ Human Review API Error:", str(e))
         traceback.print_exc()
 
-        # Attempt to safely release connection
-        if conn:
-            try:
-                release_connection(conn)
-            except Exception as ex:
-                print("⚠️ DB Release Error:", str(ex))
-
         return jsonify({
             "status": "error",
             "message": str(e),
             "traceback": traceback.format_exc()
         }), 500
+
+
+# ----------------------------------------------------------
+# Documents whose ValidationStatus lists a failing field
+# (doc_failed_fields, migration 12)
+# ----------------------------------------------------------
+def build_failing_field_query(args):
+    key = field_key(args.get("field"))
+    if not key:
+        raise ValueError("'field' is required")
+
+    # ✅ (field_key, doc_id) index; a field listed twice still yields one row
+    base_query = """
+        SELECT 
+            d.doc_id,
+            c.client_name,
+            f.doc_type,
+            d.doc_file_name,
+            d.uploaded_on,
+            d.overall_status,
+            d.data_extraction_status,
+            d.erp_entry_status,
+            ff.field,
+            ff.reason
+        FROM doc_processing_log d
+        JOIN LATERAL (
+            SELECT field, reason
+            FROM doc_failed_fields
+            WHERE doc_id = d.doc_id AND field_key = %s
+            ORDER BY position
+            LIMIT 1
+        ) ff ON TRUE
+        LEFT JOIN clients c ON d.client_id = c.client_id
+        LEFT JOIN doc_formats f ON d.doc_format_id = f.doc_format_id
+        WHERE d.doc_id IN (SELECT doc_id FROM doc_failed_fields WHERE field_key = %s)
+    """
+    params = [key, key]
+
+    # ✅ Optional client filter + half-open uploaded_on range
+    filters, filter_params = build_doc_filters(args)
+    if filters:
+        base_query += " AND " + " AND ".join(filters)
+        params.extend(filter_params)
+
+    return base_query, params
+
+
+FAILING_FIELD_ROW_JSON = json_object_sql({
+    "id": "doc_id",
+    "client_name": "client_name",
+    "doc_type": "doc_type",
+    "file_name": "doc_file_name",
+    "uploaded_on": "to_char(uploaded_on, 'YYYY-MM-DD HH24:MI:SS')",
+    "overall_status": "overall_status",
+    "data_extraction_status": "data_extraction_status",
+    "erp_entry_status": "erp_entry_status",
+    "failed_field": "field",
+    "reason": "reason",
+})
+
+
+@human_review_bp.route("/api/human_review/failing", methods=["GET"])
+@cached_response("human_review_failing")
+def get_docs_failing_field():
+    try:
+        page = parse_page_args(request.args)
+        base_query, params = build_failing_field_query(request.args)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    try:
+        conn = get_read_connection()
+
+        # ✅ Postgres renders the page as JSON text; no per-row Python work
+        if DB_RENDERED_JSON:
+            data_json, paging = fetch_keyset_page_json(conn, base_query, params, page, FAILING_FIELD_ROW_JSON)
+            extra = {"paging": paging} if page.limit or page.count else {}
+            return json_response(raw={"data": data_json}, status="success", **extra)
+
+        rows, paging = fetch_keyset_page(conn, base_query, params, page, "failing_field_page")
+
+        data = []
+        for r in rows:
+            data.append({
+                "id": r[0],
+                "client_name": r[1],
+                "doc_type": r[2],
+                "file_name": r[3],
+                "uploaded_on": r[4].strftime("%Y-%m-%d %H:%M:%S") if isinstance(r[4], datetime) else None,
+                "overall_status": r[5],
+                "data_extraction_status": r[6],
+                "erp_entry_status": r[7],
+                "failed_field": r[8],
+                "reason": r[9],
+            })
+
+        response = {"status": "success", "data": data}
+        if page.limit or page.count:
+            response["paging"] = paging
+        return jsonify(response), 200
+
+    except Exception as e:
+        print("❌ Failing Field API Error:", str(e))
+        traceback.print_exc()
+        return jsonify({"status": "error", "message": str(e)}), 500
@@ -10,7 +10,7 @@
 # -------------------------------------------------------------------
 
 from flask import Blueprint, request, jsonify
-from config.db_config import get_connection, release_connection
+from config.db_config import get_request_connection
 import bcrypt  # ok even if your passwords are plaintext; we detect hash format
 
 login_bp = Blueprint("login_bp", __name__)
@@ -22,7 +22,6 @@ def _is_probably_bcrypt(value: str) -> bool:
 
 @login_bp.route("/api/login", methods=["POST"])
 def login():
-    conn = None
     try:
         data = request.get_json(silent=True) or {}
         email = (data.get("email") or "").strip()
@@ -31,7 +30,7 @@ def login():
         if not email or not password:
             return jsonify({"status": "error", "message": "Missing email or password"}), 400
 
-        conn = get_connection()
+        conn = get_request_connection()
         cur = conn.cursor()
 
         # Schema-qualified to avoid search_path surprises
@@ -47,7 +46,6 @@ def login():
         row = cur.fetchone()
 
         if not row:
-            release_connection(conn)
             return jsonify({"status": "error", "message": "Invalid email or password"}), 401
 
         user_id, user_email, stored_password = row
@@ -63,15 +61,10 @@ def login():
             valid = (stored_password == password)
 
         if not valid:
-            release_connection(conn)
             return jsonify({"status": "error", "message": "Invalid email or password"}), 401
 
-        release_connection(conn)
         return jsonify({"status": "success", "user": {"id": user_id, "email": user_email}}), 200
 
     except Exception as e:
         print("❌ Login API Error:", str(e))
-        if conn:
-            try: release_connection(conn)
-            except Exception: pass
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -1,63 +1,82 @@
 from flask import Blueprint, request, jsonify
-from config.db_config import get_connection, release_connection
+from config.db_config import get_read_connection
+from utils.pagination import parse_page_args, fetch_keyset_page, fetch_keyset_page_json
+from utils.db_json import DB_RENDERED_JSON, json_object_sql, json_response
+from utils.json_projection import PROJECTION_JOIN, ordered_fields_sql
+from utils.query_filters import build_doc_filters
+from utils.response_cache import cached_response
 from datetime import datetime
-import json, traceback
+import traceback
 
 monitoring_bp = Blueprint("monitoring_bp", __name__)
 
+# ----------------------------------------------------------
+# Base SELECT + params for the monitoring list
+# (shared with the streaming export in export_routes.py)
+# ----------------------------------------------------------
+def build_monitoring_query(args):
+    base_query = """
+        SELECT 
+            d.doc_id,
+            c.client_name,
+            f.doc_type,
+            d.doc_file_name,
+            d.uploaded_on,
+            d.overall_status,
+            d.data_extraction_status,
+            d.erp_entry_status
+        FROM doc_processing_log d
+        LEFT JOIN clients c ON d.client_id = c.client_id
+        LEFT JOIN doc_formats f ON d.doc_format_id = f.doc_format_id
+        WHERE 1=1
+    """
+
+    # client / status / half-open uploaded_on range
+    filters, params = build_doc_filters(args, with_status=True)
+
+    if filters:
+        base_query += " AND " + " AND ".join(filters)
+
+    return base_query, params
+
+
+# One list row, rendered by Postgres (same keys / formats as the Python path)
+MONITORING_ROW_JSON = json_object_sql({
+    "id": "doc_id",
+    "client_name": "client_name",
+    "doc_type": "doc_type",
+    "file_name": "doc_file_name",
+    # str(None) in the Python path
+    "uploaded_on": "COALESCE(to_char(uploaded_on, 'YYYY-MM-DD HH24:MI:SS'), 'None')",
+    "overall_status": "overall_status",
+    "data_extraction_status": "data_extraction_status",
+    "erp_entry_status": "erp_entry_status",
+})
+
+
 # ==========================================================
 # ✅ API 1: Fetch Monitoring Table Data
 # ==========================================================
 @monitoring_bp.route("/api/monitoring", methods=["GET"])
+@cached_response("monitoring")
 def get_monitoring_data():
-    conn = None
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-
-        client_id = request.args.get("client_id")
-        status = request.args.get("status")
-        from_date = request.args.get("from_date")
-        to_date = request.args.get("to_date")
-
-        base_query = """
-            SELECT 
-                d.doc_id,
-                c.client_name,
-                f.doc_type,
-                d.doc_file_name,
-                d.uploaded_on,
-                d.overall_status,
-                d.data_extraction_status,
-                d.erp_entry_status
-            FROM doc_processing_log d
-            LEFT JOIN clients c ON d.client_id = c.client_id
-            LEFT JOIN doc_formats f ON d.doc_format_id = f.doc_format_id
-            WHERE 1=1
-        """
-
-        filters = []
-        params = []
-
-        if client_id:
-            filters.append("d.client_id = %s")
-            params.append(client_id)
+        page = parse_page_args(request.args)
+        base_query, params = build_monitoring_query(request.args)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
 
-        if status:
-            filters.append("d.overall_status ILIKE %s")
-            params.append(f"%{status}%")
-
-        if from_date and to_date:
-            filters.append("DATE(d.uploaded_on) BETWEEN %s AND %s")
-            params.extend([from_date, to_date])
-
-        if filters:
-            base_query += " AND " + " AND ".join(filters)
+    try:
+        conn = get_read_connection()
 
-        base_query += " ORDER BY d.uploaded_on DESC;"
+        # ✅ Postgres renders the page as JSON text; no per-row Python work
+        if DB_RENDERED_JSON:
+            data_json, paging = fetch_keyset_page_json(conn, base_query, params, page, MONITORING_ROW_JSON)
+            extra = {"paging": paging} if page.limit or page.count else {}
+            return json_response(raw={"data": data_json}, status="success", **extra)
 
-        cur.execute(base_query, tuple(params))
-        rows = cur.fetchall()
+        # ✅ Keyset paging through a server-side cursor (one page in memory)
+        rows, paging = fetch_keyset_page(conn, base_query, params, page, "monitoring_page")
 
         data = []
         for r in rows:
@@ -77,14 +96,14 @@ def get_monitoring_data():
                 "erp_entry_status": r[7],
             })
 
-        release_connection(conn)
-        return jsonify({"status": "success", "data": data}), 200
+        response = {"status": "success", "data": data}
+        if page.limit or page.count:
+            response["paging"] = paging
+        return jsonify(response), 200
 
     except Exception as e:
         print("❌ Monitoring Data Error:", str(e))
         traceback.print_exc()
-        if conn:
-            release_connection(conn)
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
@@ -93,32 +112,33 @@ def get_monitoring_data():
 # ==========================================================
 @monitoring_bp.route("/api/monitoring/<int:doc_id>", methods=["GET"])
 def get_monitoring_doc_details(doc_id):
-    conn = None
     try:
-        conn = get_connection()
+        conn = get_read_connection()
         cur = conn.cursor()
 
-        query = """
+        # ✅ Only the displayed fields leave the DB, already in order
+        query = f"""
             SELECT 
                 d.doc_id,
                 c.client_name,
                 f.doc_type,
                 d.doc_file_name,
-                d.extracted_json,
-                d.corrected_json,
+                {ordered_fields_sql("p.display")},
                 d.uploaded_on,
                 d.data_extraction_status,
-                d.erp_entry_status
+                d.erp_entry_status,
+                COALESCE(sf.rel_path, d.doc_file_name)
             FROM doc_processing_log d
+            {PROJECTION_JOIN}
             LEFT JOIN clients c ON d.client_id = c.client_id
             LEFT JOIN doc_formats f ON d.doc_format_id = f.doc_format_id
+            LEFT JOIN stored_files sf ON sf.file_name = d.doc_file_name
             WHERE d.doc_id = %s
         """
         cur.execute(query, (doc_id,))
         row = cur.fetchone()
 
         if not row:
-            release_connection(conn)
             return jsonify({"status": "error", "message": "Document not found"}), 404
 
         (
@@ -126,65 +146,20 @@ def get_monitoring_doc_details(doc_id):
             client_name,
             doc_type,
             file_name,
-            extracted_json,
-            corrected_json,
+            display_data,
             uploaded_on,
             data_extraction_status,
-            erp_entry_status
+            erp_entry_status,
+            rel_path
         ) = row
 
-        # Helper to safely parse JSON
-        def parse_json(data):
-            if not data:
-                return {}
-            try:
-                return json.loads(data)
-            except Exception:
-                return {}
-
-        extracted_data = parse_json(extracted_json)
-        corrected_data = parse_json(corrected_json)
-
-        display_data = corrected_data or extracted_data
-        if "final_data" in display_data:
-            display_data = display_data["final_data"]
-
-        # ======================================================
-        # ✅ Clean unwanted keys and enforce custom order
-        # ======================================================
-        ordered_fields = [
-            "Branch", "Date", "ConsignmentNo", "Source", "Destination", "Vehicle",
-            "EWayBillNo", "Consignor", "Consignee", "GSTType", "Delivery Address",
-            "Invoice No", "ContentName", "ActualWeight", "E-WayBill ValidUpto",
-            "Invoice Date", "E-Way Bill Date", "Get Rate", "GoodsType"
-        ]
-
-        # Remove ValidationStatus entirely
-        if "ValidationStatus" in display_data:
-            display_data.pop("ValidationStatus", None)
-
-        # Remove the duplicate "E-Way Bill NO" if both exist
-        if "E-Way Bill NO" in display_data and "EWayBillNo" in display_data:
-            display_data.pop("E-Way Bill NO", None)
-
-        # Build ordered array for React
-        ordered_data = []
-        for key in ordered_fields:
-            if key in display_data:
-                ordered_data.append({"field": key, "value": display_data[key]})
-
-        # Final cleaned output
-        display_data = ordered_data
-
         # ======================================================
         # ✅ Build full PDF URL
         # ======================================================
         base_url = request.host_url.rstrip("/")
         if base_url.endswith("/app"):
             base_url = base_url[:-4]  # remove '/app'
-        pdf_url = f"{base_url}/uploaded_docs/{file_name}"
-
-        release_connection(conn)
+        pdf_url = f"{base_url}/uploaded_docs/{rel_path}"
 
         # ======================================================
         # ✅ Return Final Response
@@ -208,6 +183,4 @@ def get_monitoring_doc_details(doc_id):
     except Exception as e:
         print("❌ Monitoring Doc Fetch Error:", str(e))
         traceback.print_exc()
-        if conn:
-            release_connection(conn)
         return jsonify({"status": "error", "message": str(e)}), 500
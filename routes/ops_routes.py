@@ -0,0 +1,62 @@
+# routes/ops_routes.py
+# -------------------------------------------------------------------
+# Operational endpoints (not used by the React UI).
+#   GET /api/_cache_stats -> response cache hit/miss counters
+#   GET /api/_pool_stats  -> psycopg_pool get_stats() + checkout tracking
+#   GET /api/_reference_data -> clients/doc_formats cache version + counters
+#   GET /api/_host_sync   -> host_sync watcher state / heartbeat (HOST_SYNC_WATCH=1)
+#   GET /healthz          -> liveness (process is up, no DB touch)
+#   GET /readyz           -> readiness (pool created, DB answers SELECT 1,
+#                            host_sync watcher thread alive if started)
+# -------------------------------------------------------------------
+
+from flask import Blueprint, jsonify
+from config.db_config import pool_stats, check_ready
+from utils.response_cache import response_cache
+from utils import reference_data
+from workers.host_sync_watcher import watcher_stats
+
+ops_bp = Blueprint("ops_bp", __name__)
+
+
+@ops_bp.route("/api/_cache_stats", methods=["GET"])
+def cache_stats():
+    return jsonify({"status": "success", "data": response_cache.stats()}), 200
+
+
+@ops_bp.route("/api/_pool_stats", methods=["GET"])
+def get_pool_stats():
+    return jsonify({"status": "success", "data": pool_stats()}), 200
+
+
+@ops_bp.route("/api/_reference_data", methods=["GET"])
+def get_reference_stats():
+    return jsonify({"status": "success", "data": reference_data.reference_stats()}), 200
+
+
+@ops_bp.route("/api/_host_sync", methods=["GET"])
+def get_host_sync_stats():
+    stats = watcher_stats()
+    if stats is None:
+        return jsonify({"status": "error", "message": "host_sync watcher is not running in this process"}), 404
+    return jsonify({"status": "success", "data": stats}), 200
+
+
+@ops_bp.route("/healthz", methods=["GET"])
+def healthz():
+    return jsonify({"status": "ok"}), 200
+
+
+@ops_bp.route("/readyz", methods=["GET"])
+def readyz():
+    ready, detail = check_ready()
+    if not ready:
+        return jsonify({"status": "not_ready", "message": detail}), 503
+
+    host_sync = watcher_stats()
+    if host_sync is not None and not host_sync["alive"]:
+        return jsonify({
+            "status": "not_ready",
+            "message": f"host_sync watcher is {host_sync['state']}: {host_sync['last_error']}",
+        }), 503
+    return jsonify({"status": "ready"}), 200
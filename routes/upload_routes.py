@@ -1,33 +1,68 @@
 from flask import Blueprint, request, jsonify
-from config.db_config import get_connection, release_connection
+from utils.response_cache import invalidate_response_cache
+from utils.uploads import (
+    UPLOAD_FOLDER, IMAGE_EXTS, is_image, staging_path, save_stream,
+)
+from utils import reference_data
+from utils.ingest import ingest_staged
+from utils import conversion_jobs
+from concurrent.futures import ThreadPoolExecutor
 import os
-import datetime
+import zipfile
+from zlib import error as zlib_error
 from werkzeug.utils import secure_filename
-from PIL import Image
-import io
 
 upload_bp = Blueprint('upload_bp', __name__)
 
-# Folder for uploaded files
-UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "uploaded_docs")
+# ZIP ingestion limits (zip-bomb protection), checked against both the
+# sizes declared in the archive and the bytes actually extracted
+ZIP_MAX_MEMBERS = int(os.getenv("ZIP_MAX_MEMBERS", "1000"))
+ZIP_MAX_MEMBER_SIZE = int(os.getenv("ZIP_MAX_MEMBER_SIZE", str(100 * 1024 * 1024)))
+ZIP_MAX_TOTAL_SIZE = int(os.getenv("ZIP_MAX_TOTAL_SIZE", str(2 * 1024 * 1024 * 1024)))
+ZIP_MAX_RATIO = int(os.getenv("ZIP_MAX_RATIO", "200"))
+# A ZIP may hold more images than the conversion queue takes at once
+ZIP_QUEUE_WAIT = int(os.getenv("ZIP_QUEUE_WAIT", "300"))
+ZIP_ALLOWED_EXTS = IMAGE_EXTS | {".pdf"}
+
+# Files of a multi-file upload are staged in parallel (disk I/O and
+# hashing release the GIL); shared by all requests, so this is the bound
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+_upload_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 print(f"📂 Upload folder is set to: {UPLOAD_FOLDER}")
 
 
+# ---------- Helpers ----------
+def _stage_upload(file):
+    """Stream one uploaded file into .staging. Returns its staged entry, or one with an "error"."""
+    orig_name = secure_filename(file.filename or "uploaded_file")
+    ext = os.path.splitext(orig_name)[1].lower()
+    src_path = staging_path(ext)
+    try:
+        sha256, size = save_stream(file.stream, src_path)
+    except Exception as save_err:
+        print(f"❌ Saving failed for {orig_name}: {save_err}")
+        if os.path.exists(src_path):
+            os.remove(src_path)
+        return {"orig_name": orig_name, "error": str(save_err)}
+    return {
+        "orig_name": orig_name,
+        "ext": ext,
+        "is_image": is_image(ext, getattr(file, "mimetype", None)),
+        "src_path": src_path,
+        "sha256": sha256,
+        "size": size,
+    }
+
+
 # ========================================
 #1️⃣ Get all clients
 # ========================================
 @upload_bp.route("/api/clients", methods=["GET"])
 def get_clients():
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT client_id, client_name FROM clients ORDER BY client_name;")
-        rows = cur.fetchall()
-        release_connection(conn)
-
-        clients = [{"id": r[0], "name": r[1]} for r in rows]
-        return jsonify({"status": "success", "data": clients}), 200
+        return reference_data.clients_response()
 
     except Exception as e:
         print("❌ Error fetching clients:", str(e))
@@ -40,27 +75,7 @@ def get_clients():
 @upload_bp.route("/api/doc_formats/<int:client_id>", methods=["GET"])
 def get_doc_formats(client_id):
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT doc_format_id, doc_type, doc_format_name, file_type
-            FROM doc_formats
-            WHERE client_id = %s
-            ORDER BY doc_format_name;
-        """, (client_id,))
-        rows = cur.fetchall()
-        release_connection(conn)
-
-        formats = [
-            {
-                "id": r[0],
-                "doc_type": r[1],
-                "name": r[2],
-                "file_type": r[3]
-            }
-            for r in rows
-        ]
-        return jsonify({"status": "success", "data": formats}), 200
+        return reference_data.doc_formats_response(client_id)
 
     except Exception as e:
         print("❌ Error fetching document formats:", str(e))
@@ -79,40 +94,11 @@ def upload_files():
         if not client_id or not doc_format_id:
             return jsonify({"status": "error", "message": "Missing client or format ID"}), 400
 
-        # --- Fetch client and format details ---
-        conn = get_connection()
-        cur = conn.cursor()
-
-        # Get client name
-        cur.execute("SELECT client_name FROM clients WHERE client_id = %s;", (client_id,))
-        client_name_row = cur.fetchone()
-        if not client_name_row:
-            release_connection(conn)
-            return jsonify({"status": "error", "message": "Invalid client ID"}), 400
-        client_name = client_name_row[0].replace(" ", "_")
-
-        # Get document type and format name
-        cur.execute("""
-            SELECT doc_format_name, doc_type
-            FROM doc_formats
-            WHERE doc_format_id = %s;
-        """, (doc_format_id,))
-        doc_info = cur.fetchone()
-        release_connection(conn)
-
-        if not doc_info:
-            return jsonify({"status": "error", "message": "Invalid format ID"}), 400
-
-        doc_format_name, doc_type = doc_info
-        doc_type = doc_type.replace(" ", "_")
-        doc_format_name = doc_format_name.replace(" ", "_")
-
-        # Remove client prefix if present in format name
-        if doc_format_name.lower().startswith(client_name.lower()):
-            doc_format_name = doc_format_name[len(client_name):].lstrip("_")
-
-        # allowed image extensions
-        IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".webp"}
+        # --- Client and format details (cached, no DB round trip) ---
+        try:
+            client_name, doc_type, doc_format_name = reference_data.lookup_name_parts(client_id, doc_format_id)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
 
         # --- Handle file uploads ---
         files = request.files.getlist("files")
@@ -125,68 +111,199 @@ def upload_files():
         if not files:
             return jsonify({"status": "error", "message": "No files uploaded"}), 400
 
-        uploaded_records = []
+        # merge_images=1 -> all images of this upload become one multi-page PDF
+        merge_images = request.form.get("merge_images", "").lower() in ("1", "true", "yes")
+        # force_upload=1 -> store the files even if they were uploaded before
+        force_upload = request.form.get("force_upload", "").lower() in ("1", "true", "yes")
+
+        # Refuse the whole batch up front rather than half-accepting it
+        image_count = sum(
+            1 for f in files
+            if is_image(os.path.splitext(f.filename or "")[1].lower(), getattr(f, "mimetype", None))
+        )
+        needed_slots = min(image_count, 1) if merge_images else image_count
+        if needed_slots > conversion_jobs.free_slots():
+            resp = jsonify({"status": "error", "message": "Image conversion queue is full, please retry shortly"})
+            resp.headers["Retry-After"] = "5"
+            return resp, 503
+
+        # --- Stream the files into .staging in parallel, hashing as they go ---
+        # map() keeps request order, so names, records and errors come out
+        # in the order the files were sent
+        entries = list(_upload_executor.map(_stage_upload, files))
+        staged = [f for f in entries if "error" not in f]
+
+        uploaded_records = ingest_staged(
+            staged, client_id, doc_format_id, client_name, doc_type, merge_images, force_upload
+        )
+
+        errors = []
+        for f in entries:
+            result = f.get("result") or {}
+            if "error" in f or result.get("status") == "error":
+                errors.append({
+                    "source_name": f["orig_name"],
+                    "status": "error",
+                    "message": f.get("error") or result.get("message"),
+                })
+
+        duplicate_count = sum(1 for r in uploaded_records if r["status"] == "duplicate")
+        new_count = len(uploaded_records) - duplicate_count
+        print(f"✅ Uploaded {new_count} file(s) to {UPLOAD_FOLDER}/ ({duplicate_count} duplicate(s))")
+
+        if new_count:
+            invalidate_response_cache()
+
+        message = f"{new_count} file(s) uploaded successfully."
+        if duplicate_count:
+            message += f" {duplicate_count} duplicate(s) matched existing documents."
+        if errors:
+            message += f" {len(errors)} file(s) failed."
 
-        for file in files:
-            orig_name = secure_filename(file.filename or "uploaded_file")
-            base, ext = os.path.splitext(orig_name)
-            ext = ext.lower()
+        return jsonify({
+            "status": "success",
+            "message": message,
+            "data": uploaded_records,
+            "errors": errors
+        }), 200
 
-            # build unique name parts
-            now = datetime.datetime.now()
-            date_str = now.strftime("%Y%m%d")
-            time_str = now.strftime("%H%M%S_%f")  # microsecond precision
+    except Exception as e:
+        print("❌ Upload Error:", str(e))
+        return jsonify({"status": "error", "message": str(e)}), 500
 
-            # target doc filename prefix
-            prefix = f"{client_name}_{doc_type}_{date_str}_{time_str}"
 
-            # If incoming file is an image -> convert to PDF and save with .pdf ext
-            if ext in IMAGE_EXTS or (hasattr(file, "mimetype") and file.mimetype.startswith("image/")):
-                try:
-                    file.stream.seek(0)
-                    img = Image.open(file.stream)
-
-                    # Convert to RGB if needed (PDF requires RGB)
-                    if img.mode in ("RGBA", "P", "LA") or img.mode != "RGB":
-                        img = img.convert("RGB")
-
-                    filename_pdf = f"{prefix}.pdf"
-                    file_path = os.path.join(UPLOAD_FOLDER, filename_pdf)
-
-                    # Save image as single-page PDF
-                    img.save(file_path, "PDF", resolution=100.0)
-
-                    uploaded_records.append({
-                        "file_name": filename_pdf,
-                        "saved_path": os.path.abspath(file_path)
-                    })
-                except Exception as img_err:
-                    print(f"❌ Image conversion failed for {orig_name}: {img_err}")
-                    # skip this file and continue with others
+# ========================================
+# 4️⃣ Upload a ZIP archive of scans
+# ========================================
+@upload_bp.route("/api/upload/zip", methods=["POST"])
+def upload_zip():
+    try:
+        client_id = request.form.get("client_id")
+        doc_format_id = request.form.get("doc_format_id")
+        archive = request.files.get("archive")
+
+        if not client_id or not doc_format_id:
+            return jsonify({"status": "error", "message": "Missing client or format ID"}), 400
+        if not archive:
+            return jsonify({"status": "error", "message": "No archive uploaded"}), 400
+
+        try:
+            client_name, doc_type, _ = reference_data.lookup_name_parts(client_id, doc_format_id)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+        merge_images = request.form.get("merge_images", "").lower() in ("1", "true", "yes")
+        force_upload = request.form.get("force_upload", "").lower() in ("1", "true", "yes")
+
+        # The upload is already spooled to a temp file; ZipFile only reads
+        # the central directory up front and each member on demand
+        try:
+            zf = zipfile.ZipFile(archive.stream)
+        except zipfile.BadZipFile:
+            return jsonify({"status": "error", "message": "Not a valid ZIP archive"}), 400
+
+        with zf:
+            members = [info for info in zf.infolist() if not info.is_dir()]
+            if len(members) > ZIP_MAX_MEMBERS:
+                return jsonify({"status": "error", "message": f"Archive has {len(members)} files, limit is {ZIP_MAX_MEMBERS}"}), 413
+            declared_total = sum(info.file_size for info in members)
+            if declared_total > ZIP_MAX_TOTAL_SIZE:
+                return jsonify({"status": "error", "message": f"Archive expands to {declared_total} bytes, limit is {ZIP_MAX_TOTAL_SIZE}"}), 413
+
+            manifest = []
+            staged = []
+            extracted_total = 0
+
+            # --- Extract one member at a time into .staging ---
+            for info in members:
+                entry = {"member": info.filename}
+                manifest.append(entry)
+
+                base = os.path.basename(info.filename)
+                ext = os.path.splitext(base)[1].lower()
+                reason = None
+                if not base or base.startswith(".") or info.filename.startswith("__MACOSX/"):
+                    reason = "system file"
+                elif info.flag_bits & 0x1:
+                    reason = "encrypted"
+                elif ext not in ZIP_ALLOWED_EXTS:
+                    reason = "unsupported file type"
+                elif info.file_size > ZIP_MAX_MEMBER_SIZE:
+                    reason = f"larger than {ZIP_MAX_MEMBER_SIZE} bytes"
+                elif info.compress_size and info.file_size / info.compress_size > ZIP_MAX_RATIO:
+                    reason = f"compression ratio above {ZIP_MAX_RATIO}"
+                if reason:
+                    entry.update(status="skipped", message=reason)
                     continue
 
-            else:
-                # Treat as PDF (or save as-is)
-                filename = f"{prefix}{ext if ext else '.pdf'}"
-                file_path = os.path.join(UPLOAD_FOLDER, filename)
+                src_path = staging_path(ext)
+                budget = min(ZIP_MAX_MEMBER_SIZE, ZIP_MAX_TOTAL_SIZE - extracted_total)
                 try:
-                    file.save(file_path)
-                    uploaded_records.append({
-                        "file_name": filename,
-                        "saved_path": os.path.abspath(file_path)
-                    })
-                except Exception as save_err:
-                    print(f"❌ Saving failed for {orig_name}: {save_err}")
+                    with zf.open(info) as member:
+                        sha256, size = save_stream(member, src_path, max_bytes=budget)
+                except (ValueError, zipfile.BadZipFile, zlib_error, OSError) as ex_err:
+                    # Declared sizes can lie; the byte budget is what counts
+                    if os.path.exists(src_path):
+                        os.remove(src_path)
+                    entry.update(status="error", message=f"extraction failed: {ex_err}")
                     continue
 
-        print(f"✅ Uploaded {len(uploaded_records)} file(s) to {UPLOAD_FOLDER}/")
+                extracted_total += size
+                staged.append({
+                    "orig_name": secure_filename(base) or f"member{ext}",
+                    "ext": ext,
+                    "is_image": is_image(ext),
+                    "src_path": src_path,
+                    "sha256": sha256,
+                    "size": size,
+                    "manifest": entry,
+                })
+
+        print(f"📦 ZIP {archive.filename}: {len(staged)} of {len(members)} member(s) extracted")
+
+        uploaded_records = ingest_staged(
+            staged, client_id, doc_format_id, client_name, doc_type, merge_images, force_upload,
+            queue_wait=ZIP_QUEUE_WAIT,
+        )
+        for f in staged:
+            f["manifest"].update(f.get("result") or {"status": "error", "message": "not processed"})
+
+        if any(r["status"] != "duplicate" for r in uploaded_records):
+            invalidate_response_cache()
+
+        counts = {}
+        for entry in manifest:
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
 
         return jsonify({
             "status": "success",
-            "message": f"{len(uploaded_records)} file(s) uploaded successfully.",
-            "data": uploaded_records
+            "message": ", ".join(f"{n} {status}" for status, n in sorted(counts.items())),
+            "data": uploaded_records,
+            "manifest": manifest,
         }), 200
 
     except Exception as e:
-        print("❌ Upload Error:", str(e))
+        print("❌ ZIP Upload Error:", str(e))
         return jsonify({"status": "error", "message": str(e)}), 500
+
+
+# ========================================
+# 5️⃣ Image -> PDF conversion job status
+# ========================================
+@upload_bp.route("/api/upload/jobs", methods=["GET"])
+def get_conversion_jobs():
+    # ?ids=a,b,c -> those jobs; no ids -> pool summary
+    ids = [i for i in request.args.get("ids", "").split(",") if i]
+    if not ids:
+        return jsonify({"status": "success", "data": conversion_jobs.conversion_stats()}), 200
+
+    jobs = {job_id: conversion_jobs.get_job(job_id) for job_id in ids}
+    return jsonify({"status": "success", "data": jobs}), 200
+
+
+@upload_bp.route("/api/upload/jobs/<job_id>", methods=["GET"])
+def get_conversion_job(job_id):
+    job = conversion_jobs.get_job(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": "Unknown job_id"}), 404
+    return jsonify({"status": "success", "data": job}), 200
@@ -233,9 +233,10 @@ export default function Monitoring() {
             onChange={(e) => setFilterStatus(e.target.value)}
           >
             <option value="">All Status</option>
-            <option value="In Progress">In Progress</option>
-            <option value="Completed">Completed</option>
-            <option value="Failed">Failed</option>
+            {/* overall_status_code values (utils/status_codes.py) */}
+            <option value="in_progress">In Progress</option>
+            <option value="completed">Completed</option>
+            <option value="failed">Failed</option>
           </select>
         </div>
       </div>
@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import pytest
+from flask import Flask
+
+from utils.query_filters import build_doc_filters
+
+# (client_id, uploaded_on, overall_status, data_extraction_status, erp_entry_status)
+DOCS = [
+    (1, datetime(2024, 3, 1, 10), "Completed", "Completed", "Success"),
+    (1, datetime(2024, 3, 2, 11), "Failed", "Success", "Failed - ERP"),
+    (2, datetime(2024, 3, 2, 12), "In Progress", "In Progress", None),
+    (1, None, "Failed", "Completed", "Error"),
+    (2, None, "Completed", "Completed", "Success"),
+    (None, None, "In Progress", None, None),
+]
+
+
+@pytest.fixture
+def summary(db, monkeypatch):
+    from routes import dashboard_routes
+    from utils.response_cache import invalidate_response_cache
+
+    with db.cursor() as cur:
+        cur.executemany("""
+            INSERT INTO doc_processing_log
+                (client_id, uploaded_on, overall_status, data_extraction_status, erp_entry_status)
+            VALUES (%s, %s, %s, %s, %s)
+        """, DOCS)
+    db.commit()
+
+    monkeypatch.setattr(dashboard_routes, "get_read_connection", lambda: db)
+    app = Flask(__name__)
+    app.register_blueprint(dashboard_routes.dashboard_bp)
+    client = app.test_client()
+
+    def get(args):
+        invalidate_response_cache()
+        resp = client.get("/api/dashboard_summary", query_string=args)
+        assert resp.status_code == 200, resp.get_data(as_text=True)
+        return resp.get_json()["summary"]
+
+    return get
+
+
+def _counted(db, args):
+    """The summary as COUNT(*) over doc_processing_log (no rollup)."""
+    filters, params = build_doc_filters(args)
+    where = "WHERE " + " AND ".join(filters) if filters else ""
+    row = db.execute(f"""
+        SELECT COUNT(*),
+               COUNT(*) FILTER (WHERE d.overall_status_code = 'in_progress'),
+               COUNT(*) FILTER (WHERE d.overall_status_code = 'completed'),
+               COUNT(*) FILTER (WHERE d.overall_status_code = 'failed'),
+               COUNT(*) FILTER (WHERE d.extraction_status_code = 'success' AND d.erp_status_code = 'failed')
+        FROM doc_processing_log d {where}
+    """, params).fetchone()
+    db.rollback()
+    return dict(zip(("total_docs", "in_progress", "completed", "failed", "human_review"), row))
+
+
+@pytest.mark.parametrize("args", [
+    {},
+    {"client_id": "1"},
+    {"client_id": "2"},
+    {"from_date": "2024-03-02"},
+    {"to_date": "2024-03-01"},
+    {"client_id": "1", "from_date": "2024-03-01", "to_date": "2024-03-02"},
+])
+def test_summary_counts_every_document(db, summary, args):
+    assert summary(args) == _counted(db, args)
+
+
+def test_undated_documents_are_in_the_total(summary):
+    assert summary({})["total_docs"] == len(DOCS)
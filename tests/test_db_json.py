@@ -0,0 +1,124 @@
+from datetime import datetime
+
+import pytest
+from flask import Flask, jsonify
+
+from utils.db_json import json_object_sql, json_array_sql, json_response
+
+# Values whose JSON encoding differs most easily between Postgres and Python
+TEXT_VALUES = [
+    None,
+    "",
+    "plain",
+    "Café Ünïcode – “quotes”",
+    "emoji 😀 outside the BMP",
+    'quote " backslash \\ slash /',
+    "tab\tnewline\ncontrol\x01\x1f del\x7f",
+]
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    with app.app_context():
+        yield app
+
+
+def test_object_and_array_match_jsonify(db, app):
+    rows = [
+        (i, value, datetime(2024, 3, 1, 12, 30, 5, 999999) if i % 2 else None)
+        for i, value in enumerate(TEXT_VALUES)
+    ]
+    row_json = json_object_sql({
+        "id": "id",
+        "text": "text",
+        "uploaded_on": "to_char(uploaded_on, 'YYYY-MM-DD HH24:MI:SS')",
+        "missing": "NULL::text",
+    })
+    data_json = db.execute(f"""
+        SELECT {json_array_sql(row_json, "id")}
+        FROM (VALUES {", ".join(["(%s::int, %s::text, %s::timestamp)"] * len(rows))})
+             AS t(id, text, uploaded_on)
+    """, [v for row in rows for v in row]).fetchone()[0]
+
+    expected = jsonify({
+        "status": "success",
+        "data": [
+            {
+                "id": i,
+                "text": text,
+                "uploaded_on": uploaded_on.strftime("%Y-%m-%d %H:%M:%S") if uploaded_on else None,
+                "missing": None,
+            }
+            for i, text, uploaded_on in rows
+        ],
+    })
+    actual = json_response(raw={"data": data_json}, status="success")
+    assert actual.get_data() == expected.get_data()
+
+
+def test_empty_array_matches_jsonify(db, app):
+    data_json = db.execute(
+        f"SELECT {json_array_sql(json_object_sql({'id': 'id'}), 'id')} FROM (SELECT 1 AS id) t WHERE false"
+    ).fetchone()[0]
+    assert json_response(raw={"data": data_json}).get_data() == jsonify({"data": []}).get_data()
+
+
+def test_non_ascii_is_left_alone_without_ensure_ascii(app):
+    app.json.ensure_ascii = False
+    body = json_response(raw={"data": '["Café"]'}).get_data()
+    assert body == jsonify({"data": ["Café"]}).get_data()
+
+
+# ---------- The list routes, both paths ----------
+
+@pytest.fixture
+def client(db, monkeypatch):
+    from routes import monitoring_routes, human_review_routes
+    from utils.response_cache import invalidate_response_cache
+
+    with db.cursor() as cur:
+        cur.execute("INSERT INTO clients (client_name) VALUES ('Café Ünïcode 😀'), (NULL)")
+        cur.execute("INSERT INTO doc_formats (client_id, doc_type) VALUES (1, 'LR – “Lorry”')")
+        cur.executemany("""
+            INSERT INTO doc_processing_log
+                (client_id, doc_format_id, doc_file_name, uploaded_on,
+                 overall_status, data_extraction_status, erp_entry_status)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, [
+            (1, 1, "scan_ü.pdf", datetime(2024, 3, 1, 12, 30, 5, 500000), "Completed", "Completed", "Failed: naïve \"row\""),
+            (2, None, "plain.pdf", datetime(2024, 3, 2), None, "Success", "File Missing"),
+            (1, 1, "undated.pdf", None, "In Progress", "Completed", "Error\tERP"),
+        ])
+    db.commit()
+
+    for module in (monitoring_routes, human_review_routes):
+        monkeypatch.setattr(module, "get_read_connection", lambda: db)
+
+    app = Flask(__name__)
+    app.register_blueprint(monitoring_routes.monitoring_bp)
+    app.register_blueprint(human_review_routes.human_review_bp)
+    test_client = app.test_client()
+
+    def get(url, db_rendered):
+        for module in (monitoring_routes, human_review_routes):
+            monkeypatch.setattr(module, "DB_RENDERED_JSON", db_rendered)
+        invalidate_response_cache()
+        resp = test_client.get(url)
+        assert resp.status_code == 200, resp.get_data(as_text=True)
+        return resp.get_data()
+
+    return get
+
+
+@pytest.mark.parametrize("url", [
+    "/api/monitoring",
+    "/api/monitoring?limit=2",
+    "/api/monitoring?limit=2&count=exact",
+    "/api/human_review",
+    "/api/human_review?limit=1",
+])
+def test_db_rendered_list_is_byte_identical(client, url):
+    python_body = client(url, db_rendered=False)
+    assert b'"data":[{' in python_body
+    assert client(url, db_rendered=True) == python_body
@@ -0,0 +1,159 @@
+import pytest
+
+from utils import ingest_queue
+from utils.ingest_queue import claim_jobs, extend_job, complete_job, fail_job, enqueue_ingest_jobs
+
+
+def _enqueue(conn, count):
+    enqueue_ingest_jobs(conn, [
+        (f"doc_{i}.pdf", f"doc_{i}.pdf", 1, 1, None, None) for i in range(count)
+    ])
+
+
+def _job(conn, job_id):
+    row = conn.execute("""
+        SELECT status, attempts, locked_by, last_error,
+               EXTRACT(EPOCH FROM visible_at - now())
+        FROM doc_ingest_jobs WHERE job_id = %s
+    """, (job_id,)).fetchone()
+    conn.commit()
+    return dict(zip(("status", "attempts", "locked_by", "last_error", "visible_in"), row))
+
+
+def _expire(conn, job_id):
+    conn.execute("UPDATE doc_ingest_jobs SET visible_at = now() - interval '1 second' WHERE job_id = %s", (job_id,))
+    conn.commit()
+
+
+def test_claim_marks_running_and_hides_job(db):
+    _enqueue(db, 3)
+
+    first = claim_jobs(db, "w1", limit=2, visibility_timeout=60)
+    second = claim_jobs(db, "w2", limit=5)
+
+    assert [j["job_id"] for j in first] == [1, 2]
+    assert [j["job_id"] for j in second] == [3]
+    assert claim_jobs(db, "w3", limit=5) == []
+
+    job = _job(db, 1)
+    assert job["status"] == "running"
+    assert job["attempts"] == 1
+    assert job["locked_by"] == "w1"
+    assert 55 < job["visible_in"] <= 60
+
+
+def test_claim_skips_rows_locked_by_another_claim(db, db_connect):
+    _enqueue(db, 2)
+
+    # Another worker is mid-claim on job 1 (row lock held, not committed)
+    other = db_connect()
+    other.execute("SELECT job_id FROM doc_ingest_jobs WHERE job_id = 1 FOR UPDATE")
+
+    claimed = claim_jobs(db, "w1", limit=5)
+    assert [j["job_id"] for j in claimed] == [2]
+
+    other.rollback()
+    assert [j["job_id"] for j in claim_jobs(db, "w1", limit=5)] == [1]
+
+
+def test_expired_claim_is_reclaimed_and_old_owner_is_fenced_off(db):
+    _enqueue(db, 1)
+    claim_jobs(db, "w1")
+    _expire(db, 1)
+
+    reclaimed = claim_jobs(db, "w2")
+    assert [(j["job_id"], j["attempts"]) for j in reclaimed] == [(1, 2)]
+
+    assert extend_job(db, 1, "w1") is False
+    assert complete_job(db, 1, "w1") is False
+    assert fail_job(db, 1, "w1", "late") is False
+
+    assert extend_job(db, 1, "w2", seconds=120) is True
+    assert _job(db, 1)["visible_in"] > 115
+    assert complete_job(db, 1, "w2") is True
+    assert _job(db, 1)["status"] == "done"
+
+
+def test_fail_backs_off_then_gives_up(db, monkeypatch):
+    monkeypatch.setattr(ingest_queue, "INGEST_RETRY_BASE_SECONDS", 10)
+    monkeypatch.setattr(ingest_queue, "INGEST_RETRY_MAX_SECONDS", 15)
+    enqueue_ingest_jobs(db, [("a.pdf", "a.pdf", 1, 1, None, None)])
+    db.execute("UPDATE doc_ingest_jobs SET max_attempts = 3")
+    db.commit()
+
+    # attempt 1: base delay; attempt 2: doubled but capped
+    for expected_delay in (10, 15):
+        claim_jobs(db, "w1")
+        assert fail_job(db, 1, "w1", RuntimeError("boom")) is True
+        job = _job(db, 1)
+        assert job["status"] == "pending"
+        assert job["locked_by"] is None
+        assert job["last_error"] == "boom"
+        assert expected_delay - 5 < job["visible_in"] <= expected_delay
+        assert claim_jobs(db, "w1") == []
+        _expire(db, 1)
+
+    claim_jobs(db, "w1")
+    fail_job(db, 1, "w1", "boom")
+    assert _job(db, 1)["status"] == "failed"
+
+
+def test_timeout_on_last_attempt_fails_job(db):
+    enqueue_ingest_jobs(db, [("a.pdf", "a.pdf", 1, 1, None, None)])
+    db.execute("UPDATE doc_ingest_jobs SET max_attempts = 1")
+    db.commit()
+
+    claim_jobs(db, "w1")
+    _expire(db, 1)
+
+    assert claim_jobs(db, "w2") == []
+    job = _job(db, 1)
+    assert job["status"] == "failed"
+    assert "visibility timeout expired" in job["last_error"]
+
+
+def test_worker_skips_jobs_whose_claim_expired_in_the_batch(app_connection, monkeypatch):
+    from workers import ingest_worker
+
+    db = app_connection
+    _enqueue(db, 2)
+    monkeypatch.setattr(ingest_worker, "INGEST_BATCH_SIZE", 2)
+
+    handled = []
+
+    def slow_handler(job, path):
+        handled.append(job["job_id"])
+        if job["job_id"] == 1:
+            # Job 1 outlives the batch's timeout; job 2 is taken over meanwhile
+            _expire(db, 2)
+            assert [j["job_id"] for j in claim_jobs(db, "other")] == [2]
+
+    assert ingest_worker.run_batch("w1", slow_handler) == 2
+    assert handled == [1]
+    assert _job(db, 1)["status"] == "done"
+    job = _job(db, 2)
+    assert (job["status"], job["locked_by"]) == ("running", "other")
+
+
+@pytest.mark.parametrize("fails", [False, True])
+def test_worker_extends_claim_before_each_handler(app_connection, monkeypatch, fails):
+    from workers import ingest_worker
+
+    db = app_connection
+    _enqueue(db, 1)
+    visible_in = []
+
+    def handler(job, path):
+        visible_in.append(_job(db, job["job_id"])["visible_in"])
+        if fails:
+            raise RuntimeError("extraction failed")
+
+    # Claimed with a short timeout; the worker pushes it to the full one
+    monkeypatch.setattr(ingest_queue, "INGEST_VISIBILITY_TIMEOUT", 300)
+    original_claim = ingest_queue.claim_jobs
+    monkeypatch.setattr(ingest_queue, "claim_jobs",
+                        lambda conn, worker_id, limit=1: original_claim(conn, worker_id, limit, visibility_timeout=5))
+
+    ingest_worker.run_batch("w1", handler)
+    assert visible_in and visible_in[0] > 290
+    assert _job(db, 1)["status"] == ("pending" if fails else "done")
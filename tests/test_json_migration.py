@@ -0,0 +1,78 @@
+from contextlib import contextmanager
+
+import psycopg
+import pytest
+
+# (extracted_json, corrected_json) as the pipeline wrote them -> JSONB
+ROWS = [
+    ('{"a": 1}', None),
+    ("{'a': 'single quoted'}", '{"b": [1, 2]}'),
+    ("not json at all", "  "),
+    ("", '"a string"'),
+    (None, None),
+]
+EXPECTED = [
+    ({"a": 1}, None),
+    ({"a": "single quoted"}, {"b": [1, 2]}),
+    ("not json at all", None),
+    (None, "a string"),
+    (None, None),
+]
+
+
+def _apply(conn, versions):
+    from migrations.migrate import MIGRATIONS, ensure_migrations_table, apply_migration
+
+    ensure_migrations_table(conn)
+    for migration in sorted(MIGRATIONS, key=lambda m: m["version"]):
+        if migration["version"] in versions:
+            apply_migration(conn, migration)
+
+
+def _insert(conn, rows):
+    with conn.cursor() as cur:
+        cur.executemany(
+            "INSERT INTO doc_processing_log (extracted_json, corrected_json) VALUES (%s, %s)", rows
+        )
+    conn.commit()
+
+
+def test_backfill_then_swap(unmigrated_db, monkeypatch):
+    from migrations import backfill_json_columns
+
+    conn = unmigrated_db
+
+    _apply(conn, range(1, 10))
+    _insert(conn, ROWS)
+    _apply(conn, [10])
+
+    # Existing rows aren't converted yet: the swap refuses to run
+    with pytest.raises(psycopg.errors.RaiseException, match="backfill_json_columns"):
+        _apply(conn, [11])
+    conn.rollback()
+
+    # Written after migration 10: converted by the trigger
+    _insert(conn, [("{'late': true}", None)])
+
+    @contextmanager
+    def connection(timeout=None, role="primary"):
+        yield conn
+
+    monkeypatch.setattr(backfill_json_columns, "connection", connection)
+    monkeypatch.setattr(backfill_json_columns, "BATCH_SIZE", 2)
+    backfill_json_columns.backfill(dry_run=True)
+    assert conn.execute("SELECT COUNT(*) FROM doc_processing_log WHERE extracted_jsonb IS NOT NULL").fetchone()[0] == 1
+    conn.rollback()
+    backfill_json_columns.backfill()
+
+    _apply(conn, range(11, 100))
+    rows = conn.execute(
+        "SELECT extracted_json, corrected_json FROM doc_processing_log ORDER BY doc_id"
+    ).fetchall()
+    assert rows == EXPECTED + [({"late": True}, None)]
+    column_types = dict(conn.execute("""
+        SELECT column_name, data_type FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'doc_processing_log'
+          AND column_name LIKE '%json%'
+    """).fetchall())
+    assert column_types == {"extracted_json": "jsonb", "corrected_json": "jsonb"}
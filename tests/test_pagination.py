@@ -0,0 +1,158 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+from flask import Flask
+
+from utils.pagination import (
+    PageArgs, encode_cursor, decode_cursor, parse_page_args,
+    fetch_keyset_page, fetch_keyset_page_json,
+)
+
+
+@pytest.mark.parametrize("key", [
+    (datetime(2024, 3, 1, 12, 30, 5, 123456), 42),
+    (datetime(2024, 3, 1), 1),
+    (None, 7),
+])
+def test_cursor_round_trip(key):
+    token = encode_cursor(*key)
+    assert "=" not in token
+    assert decode_cursor(token) == key
+    assert parse_page_args({"after": token}).after == key
+
+
+def _token(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("token", [
+    "not-a-cursor!",
+    _token(["2024-03-01T00:00:00", "x"]),
+    _token(["yesterday", 1]),
+    _token(["2024-03-01T00:00:00"]),
+    _token({"uploaded_on": None, "doc_id": 1}),
+    encode_cursor(datetime(2024, 3, 1), 5)[:-3],
+])
+def test_invalid_cursor_is_rejected(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+
+
+def test_invalid_cursor_is_a_400():
+    from routes.monitoring_routes import monitoring_bp
+    from routes.human_review_routes import human_review_bp
+
+    app = Flask(__name__)
+    app.register_blueprint(monitoring_bp)
+    app.register_blueprint(human_review_bp)
+    client = app.test_client()
+
+    for url in ("/api/monitoring", "/api/human_review", "/api/human_review/failing?field=Date&"):
+        sep = "" if url.endswith("&") else "?"
+        resp = client.get(f"{url}{sep}limit=10&after={_token(['2024-03-01T00:00:00', 'x'])}")
+        assert resp.status_code == 400
+        assert resp.get_json() == {"status": "error", "message": "Invalid 'after' cursor"}
+
+
+# ---------- Keyset paging across the dated -> undated boundary ----------
+
+DATED = [
+    datetime(2024, 3, 2, 9, 0),
+    datetime(2024, 3, 2, 9, 0),   # same timestamp: doc_id breaks the tie
+    datetime(2024, 3, 1, 18, 0),
+    datetime(2024, 2, 28),
+    datetime(2024, 2, 28),
+]
+
+
+@pytest.fixture
+def docs(db):
+    # Undated rows interleaved with dated ones, two clients
+    rows = []
+    for i, uploaded_on in enumerate(DATED + [None] * 4):
+        rows.append((1 + i % 2, uploaded_on, f"doc_{i}.pdf"))
+    rows.insert(2, (1, None, "early_undated.pdf"))
+    with db.cursor() as cur:
+        cur.executemany(
+            "INSERT INTO doc_processing_log (client_id, uploaded_on, doc_file_name) VALUES (%s, %s, %s)",
+            rows,
+        )
+    db.commit()
+    return db
+
+
+def _expected(db, client_id=None):
+    where = "WHERE client_id = %s" if client_id else ""
+    rows = db.execute(
+        f"SELECT doc_id FROM doc_processing_log {where} ORDER BY uploaded_on DESC NULLS LAST, doc_id DESC",
+        (client_id,) if client_id else (),
+    ).fetchall()
+    db.rollback()
+    return [r[0] for r in rows]
+
+
+def _base_query(client_id=None):
+    from routes.monitoring_routes import build_monitoring_query
+    return build_monitoring_query({"client_id": client_id} if client_id else {})
+
+
+def _walk(db, fetch, limit, client_id=None):
+    base_query, params = _base_query(client_id)
+    page = PageArgs(limit=limit)
+    seen, cursors = [], []
+    for _ in range(50):
+        if fetch == "python":
+            rows, paging = fetch_keyset_page(db, base_query, params, page, "test_page")
+            ids = [r[0] for r in rows]
+        else:
+            data_json, paging = fetch_keyset_page_json(db, base_query, params, page, "doc_id::text")
+            ids = json.loads(data_json)
+        assert len(ids) <= limit
+        seen += ids
+        if not paging["has_more"]:
+            assert paging["next_cursor"] is None
+            return seen, cursors
+        cursors.append(decode_cursor(paging["next_cursor"]))
+        page = PageArgs(limit=limit, after=cursors[-1])
+    raise AssertionError("paging did not terminate")
+
+
+@pytest.mark.parametrize("fetch", ["python", "json"])
+@pytest.mark.parametrize("limit", [1, 2, 3, 5, 6, 9, 10, 50])
+def test_pages_cover_every_row_once_in_order(docs, fetch, limit):
+    seen, cursors = _walk(docs, fetch, limit)
+    assert seen == _expected(docs)
+
+    # Once a cursor is past the dated rows it stays there
+    undated = [c for c in cursors if c[0] is None]
+    assert cursors[len(cursors) - len(undated):] == undated
+
+
+@pytest.mark.parametrize("fetch", ["python", "json"])
+def test_page_boundary_between_dated_and_undated_rows(docs, fetch):
+    expected = _expected(docs)
+
+    # Page 1 ends on the last dated row; page 2 starts with the undated ones
+    seen, cursors = _walk(docs, fetch, len(DATED))
+    assert seen == expected
+    assert cursors[0] == (DATED[-1], expected[len(DATED) - 1])
+
+    # A page that spans the boundary hands out an undated cursor
+    seen, cursors = _walk(docs, fetch, len(DATED) + 1)
+    assert seen == expected
+    assert cursors[0] == (None, expected[len(DATED)])
+
+
+@pytest.mark.parametrize("fetch", ["python", "json"])
+def test_pages_with_filter(docs, fetch):
+    seen, _ = _walk(docs, fetch, 2, client_id=2)
+    assert seen == _expected(docs, client_id=2)
+
+
+def test_unpaged_lists_undated_rows_last(docs):
+    base_query, params = _base_query()
+    rows, paging = fetch_keyset_page(docs, base_query, params, PageArgs(), "test_page")
+    assert [r[0] for r in rows] == _expected(docs)
+    assert paging["next_cursor"] is None
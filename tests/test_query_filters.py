@@ -0,0 +1,45 @@
+import pytest
+
+from utils.query_filters import build_doc_filters
+
+STATUSES = ["In Progress", "Completed", "Failed - ERP timeout", "Error: bad scan", "Partially Failed", "Not Completed"]
+
+
+@pytest.fixture
+def docs(db):
+    with db.cursor() as cur:
+        cur.executemany(
+            "INSERT INTO doc_processing_log (doc_file_name, overall_status) VALUES (%s, %s)",
+            [(f"doc_{i}.pdf", status) for i, status in enumerate(STATUSES)],
+        )
+    db.commit()
+    return db
+
+
+def _statuses(db, args):
+    filters, params = build_doc_filters(args, with_status=True)
+    where = " AND ".join(filters) or "true"
+    rows = db.execute(
+        f"SELECT d.overall_status FROM doc_processing_log d WHERE {where} ORDER BY d.doc_id", params
+    ).fetchall()
+    db.rollback()
+    return [r[0] for r in rows]
+
+
+@pytest.mark.parametrize("status, expected", [
+    # Codes (what the UI sends) and labels: prefix classification
+    ("failed", ["Failed - ERP timeout", "Error: bad scan"]),
+    ("Failed", ["Failed - ERP timeout", "Error: bad scan"]),
+    ("completed", ["Completed"]),
+    ("in_progress", ["In Progress"]),
+    ("other", ["Partially Failed", "Not Completed"]),
+    # Anything else: substring match on the text
+    ("partially", ["Partially Failed"]),
+    ("ERP", ["Failed - ERP timeout"]),
+])
+def test_status_filter(docs, status, expected):
+    assert _statuses(docs, {"status": status}) == expected
+
+
+def test_no_status_filter(docs):
+    assert _statuses(docs, {}) == STATUSES
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from utils import reference_data
+
+
+@pytest.fixture
+def slow_load(monkeypatch):
+    """_load() that blocks until released; counts calls."""
+    release = threading.Event()
+    calls = []
+
+    def load(previous):
+        calls.append(previous)
+        assert release.wait(5)
+        version = (previous["version"] if previous else 0) + 1
+        return {"version": version, "loaded_at": time.monotonic(), "clients": {}, "formats": {}}, True
+
+    monkeypatch.setattr(reference_data, "_load", load)
+    monkeypatch.setattr(reference_data, "_snapshot", None)
+    monkeypatch.setattr(reference_data, "_stats", dict(reference_data._stats))
+    return release, calls
+
+
+def _in_thread(fn):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("value", fn()))
+    thread.start()
+    return thread, result
+
+
+def test_stale_snapshot_is_served_during_a_reload(slow_load, monkeypatch):
+    release, calls = slow_load
+    release.set()
+    old = reference_data.get_snapshot()
+    release.clear()
+    monkeypatch.setattr(reference_data, "_snapshot", dict(old, loaded_at=time.monotonic() - 10_000))
+    stale = reference_data._snapshot
+
+    reloader, reloaded = _in_thread(reference_data.get_snapshot)
+    while len(calls) < 2:
+        time.sleep(0.01)
+
+    # Reload in progress: other readers don't wait and don't start another
+    started = time.monotonic()
+    assert reference_data.get_snapshot() is stale
+    assert time.monotonic() - started < 1
+    assert not reference_data._lock.locked()
+
+    release.set()
+    reloader.join(5)
+    assert reloaded["value"]["version"] == 2
+    assert reference_data.get_snapshot() is reloaded["value"]
+    assert len(calls) == 2
+
+
+def test_explicit_refresh_waits_for_the_running_reload(slow_load, monkeypatch):
+    release, calls = slow_load
+    release.set()
+    old = reference_data.get_snapshot()
+    release.clear()
+    monkeypatch.setattr(reference_data, "_snapshot", dict(old, loaded_at=time.monotonic() - 10_000))
+
+    reloader, _ = _in_thread(reference_data.get_snapshot)
+    while len(calls) < 2:
+        time.sleep(0.01)
+    refresher, refreshed = _in_thread(lambda: reference_data.get_snapshot(max_age=5))
+    time.sleep(0.1)
+    assert "value" not in refreshed
+
+    release.set()
+    reloader.join(5)
+    refresher.join(5)
+    # Served by the reload it waited for, not a second one
+    assert refreshed["value"]["version"] == 2
+    assert len(calls) == 2
+
+
+def test_failed_reload_keeps_serving_the_old_snapshot(slow_load, monkeypatch):
+    release, _ = slow_load
+    release.set()
+    old = reference_data.get_snapshot()
+    monkeypatch.setattr(reference_data, "_snapshot", dict(old, loaded_at=time.monotonic() - 10_000))
+
+    def broken(previous):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(reference_data, "_load", broken)
+    assert reference_data.get_snapshot()["version"] == old["version"]
+    assert reference_data._stats["load_errors"] == 1
+    # Retried only after REFERENCE_RETRY_SECONDS
+    assert reference_data.get_snapshot()["version"] == old["version"]
+    assert reference_data._stats["load_errors"] == 1
+
+
+def test_first_load_error_is_raised(monkeypatch):
+    monkeypatch.setattr(reference_data, "_snapshot", None)
+    monkeypatch.setattr(reference_data, "_stats", dict(reference_data._stats))
+    monkeypatch.setattr(reference_data, "_load", lambda previous: (_ for _ in ()).throw(RuntimeError("db down")))
+    with pytest.raises(RuntimeError):
+        reference_data.get_snapshot()
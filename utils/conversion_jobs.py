@@ -0,0 +1,203 @@
+# utils/conversion_jobs.py
+# -------------------------------------------------------------------
+# Background image -> PDF conversion on a process pool.
+#
+# The upload routes stage the raw image under UPLOAD_FOLDER/.staging and
+# call submit(); the request returns straight away with the job id and
+# the client polls GET /api/upload/jobs/<job_id>.
+#
+#   CONVERSION_WORKERS      worker processes (default min(4, cpu count))
+#   CONVERSION_MAX_PENDING  queued + running jobs before submit() refuses
+#                           with ConversionQueueFull (default workers * 8)
+#   CONVERSION_JOB_TTL      seconds finished jobs stay queryable (default 3600)
+#   CONVERSION_HOOK_THREADS threads running submit()'s on_success hooks
+#                           (default 2)
+#
+# The PDF is written under .staging and renamed into UPLOAD_FOLDER when
+# complete, so the extraction pipeline never sees a half-written file.
+# Job state lives in this process (the API runs as a single process).
+#
+# start_pool() forks the workers at startup, while the process is still
+# single-threaded (app.py calls it first thing). A pool first created
+# later, with threads running, uses a forkserver instead; the workers'
+# code lives in utils/conversion_worker.py.
+#
+# Completion callbacks run on the pool's result thread, which also
+# collects every other finished conversion; they only record the result
+# and free the slot. on_success hooks (a DB insert that may wait for a
+# pool connection) run on a separate thread pool.
+# -------------------------------------------------------------------
+
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from utils.conversion_worker import convert
+
+CONVERSION_WORKERS = int(os.getenv("CONVERSION_WORKERS", str(min(4, os.cpu_count() or 1))))
+CONVERSION_MAX_PENDING = int(os.getenv("CONVERSION_MAX_PENDING", str(CONVERSION_WORKERS * 8)))
+CONVERSION_JOB_TTL = int(os.getenv("CONVERSION_JOB_TTL", "3600"))
+CONVERSION_HOOK_THREADS = int(os.getenv("CONVERSION_HOOK_THREADS", "2"))
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(CONVERSION_MAX_PENDING)
+_jobs = {}
+_futures = {}
+_jobs_lock = threading.Lock()
+# Threads start on first use, so importing this module stays fork-safe
+_hook_executor = ThreadPoolExecutor(max_workers=CONVERSION_HOOK_THREADS, thread_name_prefix="conversion-hook")
+
+
+class ConversionQueueFull(Exception):
+    """Raised by submit() when CONVERSION_MAX_PENDING jobs are already in flight."""
+
+
+def _create_executor():
+    methods = multiprocessing.get_all_start_methods()
+    if "fork" in methods and threading.active_count() == 1:
+        # Nothing else running yet (start_pool() at startup): fork is safe,
+        # and all workers are started now, so none is forked later
+        executor = ProcessPoolExecutor(max_workers=CONVERSION_WORKERS,
+                                       mp_context=multiprocessing.get_context("fork"))
+        executor.submit(os.getpid).result()
+        return executor, "fork"
+
+    # Forking a multi-threaded process can deadlock the child on a lock
+    # held at fork time; fork from a clean single-threaded server instead
+    if "forkserver" in methods:
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(["utils.conversion_worker"])
+        return ProcessPoolExecutor(max_workers=CONVERSION_WORKERS, mp_context=ctx), "forkserver"
+    return ProcessPoolExecutor(max_workers=CONVERSION_WORKERS), "default"
+
+
+def start_pool():
+    """
+    Create the worker pool now. Call at process startup, before the DB
+    pool, thread pools or the host_sync watcher start any threads.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor, method = _create_executor()
+            print(f"✅ Conversion pool: {CONVERSION_WORKERS} worker(s) ({method})")
+        return _executor
+
+
+def _get_executor():
+    return _executor or start_pool()
+
+
+def free_slots():
+    with _jobs_lock:
+        in_flight = len(_futures)
+    return max(0, CONVERSION_MAX_PENDING - in_flight)
+
+
+def _prune_jobs():
+    cutoff = time.time() - CONVERSION_JOB_TTL
+    with _jobs_lock:
+        for job_id in [k for k, j in _jobs.items() if j["finished_at"] and j["finished_at"] < cutoff]:
+            del _jobs[job_id]
+
+
+def _on_done(job_id, src_paths, on_success, future):
+    try:
+        update = {"status": "done", **future.result()}
+    except Exception as e:
+        print(f"❌ Image conversion failed for job {job_id}: {e}")
+        update = {"status": "failed", "error": str(e)}
+        on_success = None
+    finally:
+        _slots.release()
+        for src_path in src_paths:
+            if os.path.exists(src_path):
+                os.remove(src_path)
+
+    with _jobs_lock:
+        _futures.pop(job_id, None)
+        job = _jobs.get(job_id)
+        if job:
+            job.update(update, finished_at=time.time())
+
+    if on_success:
+        _hook_executor.submit(_run_hook, job_id, on_success)
+
+
+def _run_hook(job_id, on_success):
+    try:
+        on_success()
+    except Exception as e:
+        print(f"⚠️ Post-conversion hook failed for job {job_id}: {e}")
+
+
+def submit(src_paths, dest_path, source_names, wait=None, on_success=None):
+    """
+    Queue conversion of the staged images src_paths into one PDF at
+    dest_path (one page per image / TIFF frame, in order).
+    src_paths are deleted once the job finishes. Returns the job id; the
+    finished job carries source_size / pdf_size / bytes_saved.
+    on_success() is called (in this process, on a hook thread) once the
+    PDF is in place.
+    Raises ConversionQueueFull when the pool is saturated (after waiting
+    up to `wait` seconds for a slot, if given).
+    """
+    acquired = _slots.acquire(timeout=wait) if wait else _slots.acquire(blocking=False)
+    if not acquired:
+        raise ConversionQueueFull(f"{CONVERSION_MAX_PENDING} conversions already pending")
+
+    _prune_jobs()
+    job_id = uuid.uuid4().hex
+    with _jobs_lock:
+        _jobs[job_id] = {
+            "job_id": job_id,
+            "source_names": source_names,
+            "file_name": os.path.basename(dest_path),
+            "status": "queued",
+            "source_size": sum(os.path.getsize(p) for p in src_paths),
+            "submitted_at": time.time(),
+            "finished_at": None,
+            "error": None,
+        }
+
+    try:
+        future = _get_executor().submit(convert, src_paths, dest_path)
+    except Exception:
+        _slots.release()
+        with _jobs_lock:
+            _jobs.pop(job_id, None)
+        raise
+
+    with _jobs_lock:
+        _futures[job_id] = future
+    future.add_done_callback(lambda f: _on_done(job_id, src_paths, on_success, f))
+    return job_id
+
+
+def get_job(job_id):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if not job:
+            return None
+        job = dict(job)
+        future = _futures.get(job_id)
+        if job["status"] == "queued" and future is not None and future.running():
+            job["status"] = "running"
+        return job
+
+
+def conversion_stats():
+    with _jobs_lock:
+        counts = {}
+        for job in _jobs.values():
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+    return {
+        "workers": CONVERSION_WORKERS,
+        "max_pending": CONVERSION_MAX_PENDING,
+        "free_slots": free_slots(),
+        "jobs": counts,
+    }
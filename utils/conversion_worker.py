@@ -0,0 +1,22 @@
+# utils/conversion_worker.py
+# -------------------------------------------------------------------
+# Entry point of the image -> PDF conversion worker processes
+# (utils/conversion_jobs.py). Kept free of Flask / DB imports so a
+# forkserver worker loads only this module and utils/uploads.py.
+# -------------------------------------------------------------------
+
+import os
+
+from utils.uploads import STAGING_DIR, save_images_as_pdf
+
+
+def convert(src_paths, dest_path):
+    """Runs in a worker process. Returns save_images_as_pdf()'s size stats."""
+    tmp_path = os.path.join(STAGING_DIR, f"{os.path.basename(dest_path)}.tmp")
+    try:
+        stats = save_images_as_pdf(src_paths, tmp_path)
+        os.replace(tmp_path, dest_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return stats
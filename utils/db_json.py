@@ -0,0 +1,71 @@
+# utils/db_json.py
+# -------------------------------------------------------------------
+# "DB-rendered JSON" for the big list responses (monitoring, human
+# review, dashboard recent uploads): Postgres formats the timestamps
+# (to_char) and writes the row objects, and the route sends the text on
+# without building a dict per row.
+#
+# Rows are rendered with to_json() per value and string_agg(), not
+# json_agg()/json_build_object(): Postgres' own json output puts spaces
+# after ":" and "," and newlines between elements, while this keeps the
+# body byte-identical to jsonify() (keys sorted, compact separators,
+# trailing newline). Postgres writes non-ASCII text as UTF-8;
+# json_response() turns it into the \uXXXX escapes jsonify() writes
+# (unless the app's JSON provider has ensure_ascii off). In debug mode
+# jsonify() indents, so whitespace differs there.
+#
+#   DB_RENDERED_JSON   "0" to build these lists in Python again (default on)
+# -------------------------------------------------------------------
+
+import json
+import os
+import re
+
+from flask import current_app
+
+DB_RENDERED_JSON = os.getenv("DB_RENDERED_JSON", "1") == "1"
+
+# What json.dumps(ensure_ascii=True) escapes beyond Postgres: DEL and non-ASCII
+_NON_ASCII = re.compile(r"[^\x00-\x7e]")
+
+
+def json_object_sql(fields):
+    """
+    SQL text expression for one JSON object. fields: {key: SQL expression};
+    keys come out sorted, like jsonify(). NULL values become null.
+    """
+    parts = []
+    for i, key in enumerate(sorted(fields)):
+        opener = "," if i else "{"
+        parts.append(f"'{opener}{json.dumps(key)}:' || COALESCE(to_json({fields[key]})::text, 'null')")
+    return " || ".join(parts) + " || '}'"
+
+
+def json_array_sql(row_json, order_by, where=None):
+    """Aggregate: JSON array text of row_json over the group (or its `where` rows), '[]' when empty."""
+    agg = f"string_agg({row_json}, ',' ORDER BY {order_by})"
+    if where:
+        agg += f" FILTER (WHERE {where})"
+    return f"'[' || COALESCE({agg}, '') || ']'"
+
+
+def _escape_non_ascii(text):
+    """JSON text with non-ASCII characters escaped as json.dumps() does (\\uXXXX, surrogate pairs)."""
+    if text.isascii() and "\x7f" not in text:
+        return text
+    # Outside strings JSON text is ASCII, so escaping every match is safe
+    return _NON_ASCII.sub(lambda m: json.dumps(m.group())[1:-1], text)
+
+
+def json_response(raw=None, **fields):
+    """
+    200 application/json Response of fields (serialized by the app's JSON
+    provider) plus raw: {key: already rendered JSON text}.
+    """
+    dumps = current_app.json.dumps
+    parts = {key: dumps(value, separators=(",", ":")) for key, value in fields.items()}
+    if getattr(current_app.json, "ensure_ascii", True):
+        raw = {key: _escape_non_ascii(text) for key, text in (raw or {}).items()}
+    parts.update(raw or {})
+    body = "{" + ",".join(f"{json.dumps(key)}:{parts[key]}" for key in sorted(parts)) + "}\n"
+    return current_app.response_class(body, status=200, mimetype="application/json")
@@ -0,0 +1,185 @@
+# utils/ingest.py
+# -------------------------------------------------------------------
+# The part of an upload that comes after the bytes are in .staging:
+# dedup by content hash, stored name, placement (or PDF conversion),
+# stored_files / upload_file_hashes rows and doc_ingest_jobs.
+# Shared by /api/upload, /api/upload/zip and the host_sync watcher
+# (workers/host_sync_watcher.py), so every entry point names and
+# converts files the same way.
+#
+# Uses the per-request DB connection helpers, so it needs a Flask app
+# context (a request, or `with app.app_context():` in a worker thread).
+# -------------------------------------------------------------------
+
+import os
+from functools import partial
+
+from config.db_config import get_request_connection, release_request_connection
+from utils.uploads import UPLOAD_FOLDER, build_prefix, find_duplicates, register_hashes
+from utils.storage import rel_path_for, abs_path, record_stored_files
+from utils.ingest_queue import enqueue_ingest_jobs, enqueue_converted
+from utils import conversion_jobs
+
+
+def ingest_staged(staged, client_id, doc_format_id, client_name, doc_type, merge_images=False,
+                  force_upload=False, queue_wait=None):
+    """
+    Dedup, name, place (or queue for PDF conversion), index and enqueue
+    for ingestion files that are already streamed into .staging. staged entries are dicts with
+    orig_name / ext / is_image / src_path / sha256 / size; each gets a
+    "result" (its upload record, or status "error" + message).
+    Returns the upload records in order. queue_wait: seconds to wait for
+    a conversion slot instead of failing when the queue is full.
+    """
+    # --- Exact re-uploads resolve to the existing document ---
+    duplicates = {}
+    if staged and not force_upload:
+        try:
+            conn = get_request_connection()
+            duplicates = find_duplicates(conn, client_id, {f["sha256"] for f in staged})
+        except Exception as hash_err:
+            # Dedup is best effort; never block an upload on it
+            print(f"⚠️ Duplicate check failed: {hash_err}")
+        finally:
+            release_request_connection()
+
+    uploaded_records = []
+    merge_entries = []  # staged entries for merge_images
+    new_hashes = []     # (sha256, file_name, source_name, size) for upload_file_hashes
+    stored = []         # (file_name, rel_path, client_id) for stored_files
+    ingest = []         # doc_ingest_jobs rows for files that exist now
+
+    for f in staged:
+        orig_name, ext, src_path = f["orig_name"], f["ext"], f["src_path"]
+
+        if merge_images and f["is_image"]:
+            merge_entries.append(f)
+            continue
+
+        duplicate = duplicates.get(f["sha256"])
+        if duplicate:
+            os.remove(src_path)
+            f["result"] = {
+                "file_name": duplicate["file_name"],
+                "saved_path": os.path.abspath(os.path.join(UPLOAD_FOLDER, duplicate["rel_path"])),
+                "status": "duplicate",
+                "doc_id": duplicate["doc_id"],
+                "source_name": orig_name,
+                "sha256": f["sha256"]
+            }
+            uploaded_records.append(f["result"])
+            continue
+
+        # target doc filename prefix
+        prefix = build_prefix(client_name, doc_type)
+
+        # If incoming file is an image -> queue conversion to PDF (.pdf ext)
+        if f["is_image"]:
+            filename = f"{prefix}.pdf"
+            rel_path = rel_path_for(filename, client_name)
+            file_path = abs_path(rel_path)
+            try:
+                job_id = conversion_jobs.submit(
+                    [src_path], file_path, [orig_name], wait=queue_wait,
+                    on_success=partial(enqueue_converted, (
+                        filename, rel_path, client_id, doc_format_id, orig_name, f["sha256"]
+                    )),
+                )
+            except Exception as img_err:
+                print(f"❌ Image conversion could not be queued for {orig_name}: {img_err}")
+                os.remove(src_path)
+                f["result"] = {"status": "error", "message": str(img_err)}
+                # skip this file and continue with others
+                continue
+            record = {
+                "file_name": filename,
+                "saved_path": os.path.abspath(file_path),
+                "job_id": job_id,
+                "status": "queued",
+                # bytes_saved is reported on the job once it finishes
+                "source_size": f["size"]
+            }
+
+        else:
+            # Treat as PDF (or save as-is)
+            filename = f"{prefix}{ext if ext else '.pdf'}"
+            rel_path = rel_path_for(filename, client_name)
+            file_path = abs_path(rel_path)
+            os.replace(src_path, file_path)
+            record = {
+                "file_name": filename,
+                "saved_path": os.path.abspath(file_path),
+                "status": "saved"
+            }
+            ingest.append((filename, rel_path, client_id, doc_format_id, orig_name, f["sha256"]))
+
+        record["sha256"] = f["sha256"]
+        f["result"] = record
+        uploaded_records.append(record)
+        stored.append((filename, rel_path, client_id))
+        new_hashes.append((f["sha256"], filename, orig_name, f["size"]))
+        if not force_upload:
+            # Same file twice in one upload
+            duplicates[f["sha256"]] = {"file_name": filename, "rel_path": rel_path, "doc_id": None}
+
+    if merge_entries:
+        src_paths = [f["src_path"] for f in merge_entries]
+        source_names = [f["orig_name"] for f in merge_entries]
+        filename_pdf = f"{build_prefix(client_name, doc_type)}.pdf"
+        rel_path = rel_path_for(filename_pdf, client_name)
+        file_path = abs_path(rel_path)
+        try:
+            job_id = conversion_jobs.submit(
+                src_paths, file_path, source_names, wait=queue_wait,
+                on_success=partial(enqueue_converted, (
+                    filename_pdf, rel_path, client_id, doc_format_id, ", ".join(source_names), None
+                )),
+            )
+            record = {
+                "file_name": filename_pdf,
+                "saved_path": os.path.abspath(file_path),
+                "job_id": job_id,
+                "status": "queued",
+                "source_files": source_names,
+                "source_size": sum(f["size"] for f in merge_entries)
+            }
+            uploaded_records.append(record)
+            stored.append((filename_pdf, rel_path, client_id))
+            for f in merge_entries:
+                f["result"] = {"file_name": filename_pdf, "job_id": job_id, "status": "merged"}
+        except Exception as img_err:
+            print(f"❌ Merged image conversion could not be queued: {img_err}")
+            for f in merge_entries:
+                f["result"] = {"status": "error", "message": str(img_err)}
+                if os.path.exists(f["src_path"]):
+                    os.remove(f["src_path"])
+
+    if stored:
+        try:
+            conn = get_request_connection()
+            record_stored_files(conn, stored)
+        except Exception as index_err:
+            print(f"❌ Could not record stored file paths: {index_err}")
+        finally:
+            release_request_connection()
+
+    if ingest:
+        try:
+            conn = get_request_connection()
+            enqueue_ingest_jobs(conn, ingest)
+        except Exception as queue_err:
+            print(f"❌ Could not enqueue ingest jobs: {queue_err}")
+        finally:
+            release_request_connection()
+
+    if new_hashes:
+        try:
+            conn = get_request_connection()
+            register_hashes(conn, client_id, new_hashes)
+        except Exception as hash_err:
+            # Files are stored; only dedup of a later re-upload is affected
+            print(f"⚠️ Could not record upload hashes: {hash_err}")
+        finally:
+            release_request_connection()
+
+    return uploaded_records
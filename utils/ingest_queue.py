@@ -0,0 +1,137 @@
+# utils/ingest_queue.py
+# -------------------------------------------------------------------
+# doc_ingest_jobs (migration 8): hand-off from the upload routes to the
+# extraction pipeline, replacing folder scans.
+#
+# Producer: enqueue_ingest_jobs() inserts one row per stored file with a
+# single executemany and NOTIFYs INGEST_CHANNEL in the same transaction,
+# so listeners wake on commit. Images are enqueued once their PDF exists.
+#
+# Consumer (see workers/ingest_worker.py):
+#   claim_jobs()    FOR UPDATE SKIP LOCKED; the claim hides the job for
+#                   INGEST_VISIBILITY_TIMEOUT seconds, after which another
+#                   worker may take it (the first one is presumed dead)
+#   extend_job()    push the timeout out while still working
+#   complete_job()  done
+#   fail_job()      back to pending with exponential backoff
+#                   (INGEST_RETRY_BASE_SECONDS * 2^(attempt-1), capped),
+#                   or failed after max_attempts (INGEST_MAX_ATTEMPTS)
+# Every consumer call checks locked_by, so a worker that lost its claim
+# to a timeout can't overwrite the new owner's result.
+# -------------------------------------------------------------------
+
+import os
+
+from config.db_config import connection
+
+INGEST_CHANNEL = "doc_ingest_jobs"
+INGEST_VISIBILITY_TIMEOUT = int(os.getenv("INGEST_VISIBILITY_TIMEOUT", "300"))
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "5"))
+INGEST_RETRY_BASE_SECONDS = int(os.getenv("INGEST_RETRY_BASE_SECONDS", "30"))
+INGEST_RETRY_MAX_SECONDS = int(os.getenv("INGEST_RETRY_MAX_SECONDS", "3600"))
+
+JOB_COLUMNS = (
+    "job_id", "file_name", "rel_path", "client_id", "doc_format_id",
+    "source_name", "sha256", "attempts", "max_attempts",
+)
+
+
+def enqueue_ingest_jobs(conn, entries):
+    """
+    entries: [(file_name, rel_path, client_id, doc_format_id, source_name, sha256)].
+    Inserts and notifies in one transaction.
+    """
+    if not entries:
+        return
+    with conn.cursor() as cur:
+        cur.executemany("""
+            INSERT INTO doc_ingest_jobs
+                (file_name, rel_path, client_id, doc_format_id, source_name, sha256, max_attempts)
+            VALUES (%s, %s, %s, %s, %s, %s, %s);
+        """, [(*entry, INGEST_MAX_ATTEMPTS) for entry in entries])
+        cur.execute("SELECT pg_notify(%s, %s);", (INGEST_CHANNEL, str(len(entries))))
+    conn.commit()
+
+
+def enqueue_converted(entry):
+    """conversion_jobs on_success hook: the PDF exists now, hand it over."""
+    with connection() as conn:
+        enqueue_ingest_jobs(conn, [entry])
+
+
+def claim_jobs(conn, worker_id, limit=1, visibility_timeout=None):
+    """Claim up to `limit` visible jobs for worker_id. Returns a list of dicts."""
+    timeout = visibility_timeout or INGEST_VISIBILITY_TIMEOUT
+
+    # A running job whose last allowed attempt timed out won't be retried
+    conn.execute("""
+        UPDATE doc_ingest_jobs
+        SET status = 'failed',
+            last_error = COALESCE(last_error || E'\\n', '') || 'visibility timeout expired',
+            locked_by = NULL,
+            updated_on = now()
+        WHERE status = 'running' AND visible_at <= now() AND attempts >= max_attempts;
+    """)
+
+    rows = conn.execute(f"""
+        WITH next AS (
+            SELECT job_id
+            FROM doc_ingest_jobs
+            WHERE status IN ('pending', 'running')
+              AND visible_at <= now()
+              AND attempts < max_attempts
+            ORDER BY visible_at, job_id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE doc_ingest_jobs j
+        SET status = 'running',
+            attempts = j.attempts + 1,
+            locked_by = %s,
+            visible_at = now() + make_interval(secs => %s),
+            updated_on = now()
+        FROM next
+        WHERE j.job_id = next.job_id
+        RETURNING {", ".join(f"j.{c}" for c in JOB_COLUMNS)};
+    """, (limit, worker_id, timeout)).fetchall()
+    conn.commit()
+    return [dict(zip(JOB_COLUMNS, row)) for row in rows]
+
+
+def extend_job(conn, job_id, worker_id, seconds=None):
+    """Heartbeat: keep the claim for another `seconds`. False = claim lost."""
+    cur = conn.execute("""
+        UPDATE doc_ingest_jobs
+        SET visible_at = now() + make_interval(secs => %s), updated_on = now()
+        WHERE job_id = %s AND locked_by = %s AND status = 'running';
+    """, (seconds or INGEST_VISIBILITY_TIMEOUT, job_id, worker_id))
+    conn.commit()
+    return cur.rowcount == 1
+
+
+def complete_job(conn, job_id, worker_id):
+    """Mark done. False = the claim was lost to a timeout first."""
+    cur = conn.execute("""
+        UPDATE doc_ingest_jobs
+        SET status = 'done', locked_by = NULL, last_error = NULL, updated_on = now()
+        WHERE job_id = %s AND locked_by = %s AND status = 'running';
+    """, (job_id, worker_id))
+    conn.commit()
+    return cur.rowcount == 1
+
+
+def fail_job(conn, job_id, worker_id, error):
+    """Schedule a retry with backoff, or fail for good after max_attempts."""
+    cur = conn.execute("""
+        UPDATE doc_ingest_jobs
+        SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END,
+            visible_at = now() + make_interval(
+                secs => LEAST(%s * power(2, GREATEST(attempts - 1, 0)), %s)
+            ),
+            last_error = %s,
+            locked_by = NULL,
+            updated_on = now()
+        WHERE job_id = %s AND locked_by = %s AND status = 'running';
+    """, (INGEST_RETRY_BASE_SECONDS, INGEST_RETRY_MAX_SECONDS, str(error)[:2000], job_id, worker_id))
+    conn.commit()
+    return cur.rowcount == 1
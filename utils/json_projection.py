@@ -0,0 +1,96 @@
+# utils/json_projection.py
+# -------------------------------------------------------------------
+# Server-side projection of doc_processing_log.extracted_json /
+# corrected_json (JSONB since migration 11). The detail routes select
+# only the fields a screen shows instead of fetching both documents and
+# parsing them per request. The ValidationStatus object is precomputed
+# on write (doc_processing_log.validation_status, migration 12).
+#
+#   FROM doc_processing_log d
+#   {PROJECTION_JOIN}
+#   -> p.extracted / p.corrected   the documents, "final_data" unwrapped
+#      p.display                   corrected if it has fields, else extracted
+#
+# ordered_fields_sql() and matched_fields_sql() return JSONB expressions
+# over those columns; psycopg hands them back as Python dicts / lists.
+# -------------------------------------------------------------------
+
+import re
+
+# Fields shown on the detail screens, in display order (FixReview.jsx
+# keeps the same list as preferredOrder)
+ORDERED_FIELDS = [
+    "Branch", "Date", "ConsignmentNo", "Source", "Destination", "Vehicle",
+    "EWayBillNo", "Consignor", "Consignee", "GSTType", "Delivery Address",
+    "Invoice No", "ContentName", "ActualWeight", "E-WayBill ValidUpto",
+    "Invoice Date", "E-Way Bill Date", "Get Rate", "GoodsType",
+]
+
+
+def _final_data(col):
+    return (
+        f"CASE WHEN jsonb_typeof({col}) = 'object' AND {col} ? 'final_data' "
+        f"THEN {col} -> 'final_data' ELSE {col} END"
+    )
+
+
+PROJECTION_JOIN = f"""
+    CROSS JOIN LATERAL (
+        SELECT
+            e AS extracted,
+            c AS corrected,
+            CASE
+                WHEN jsonb_typeof(c) = 'object' AND c <> '{{}}'::jsonb THEN c
+                WHEN jsonb_typeof(e) = 'object' THEN e
+                ELSE '{{}}'::jsonb
+            END AS display
+        FROM (SELECT {_final_data("d.extracted_json")} AS e,
+                     {_final_data("d.corrected_json")} AS c) f
+    ) p
+"""
+
+
+def _text_array(values):
+    quoted = ", ".join("'" + v.replace("'", "''") + "'" for v in values)
+    return f"ARRAY[{quoted}]::text[]"
+
+
+def _as_object(expr):
+    return f"CASE WHEN jsonb_typeof({expr}) = 'object' THEN {expr} ELSE '{{}}'::jsonb END"
+
+
+def _normalized(expr):
+    # FixReview.jsx normalizeKey(): alphanumerics only, lower case
+    return f"lower(regexp_replace({expr}, '[^A-Za-z0-9]', '', 'g'))"
+
+
+def ordered_fields_sql(obj, fields=ORDERED_FIELDS):
+    """JSONB [{"field", "value"}] of the fields (exact keys) present in obj, in order."""
+    return f"""COALESCE((
+        SELECT jsonb_agg(jsonb_build_object('field', k.key, 'value', {obj} -> k.key) ORDER BY k.ord)
+        FROM unnest({_text_array(fields)}) WITH ORDINALITY AS k(key, ord)
+        WHERE jsonb_typeof({obj}) = 'object' AND {obj} ? k.key
+    ), '[]'::jsonb)"""
+
+
+def matched_fields_sql(obj, fields=ORDERED_FIELDS):
+    """
+    JSONB object with obj's entries for the fields, keys matched the way
+    the frontend does (punctuation / case ignored), keeping obj's own key.
+    One entry per field: the exact key wins, else the first match by name.
+    """
+    return f"""COALESCE((
+        SELECT jsonb_object_agg(m.key, m.value)
+        FROM (
+            SELECT DISTINCT ON (k.ord) e.key, e.value
+            FROM unnest({_text_array(fields)}) WITH ORDINALITY AS k(key, ord)
+            JOIN jsonb_each({_as_object(obj)}) e
+              ON {_normalized("e.key")} = {_normalized("k.key")}
+            ORDER BY k.ord, e.key <> k.key, e.key
+        ) m
+    ), '{{}}'::jsonb)"""
+
+
+def field_key(name):
+    """Field name as doc_failed_fields.field_key stores it (migration 12)."""
+    return re.sub(r"[^A-Za-z0-9]", "", str(name or "")).lower()
@@ -0,0 +1,217 @@
+# utils/pagination.py
+# -------------------------------------------------------------------
+# Keyset (cursor) pagination for the doc_processing_log list routes.
+#
+#   GET /api/monitoring?limit=100
+#   GET /api/monitoring?limit=100&after=<next_cursor>
+#   GET /api/monitoring?limit=100&count=estimate   (or count=exact)
+#
+# Rows are ordered by (uploaded_on DESC NULLS LAST, doc_id DESC). The
+# cursor is an opaque token holding the (uploaded_on, doc_id) of the last
+# row sent (uploaded_on null once the page reached the undated rows), so
+# the next page is a plain index range scan instead of OFFSET. A paged
+# query is a UNION ALL of the dated rows after the cursor and the undated
+# ones, each branch in the order of the (uploaded_on DESC, doc_id DESC)
+# indexes.
+# Without `limit` the routes keep returning the full list (old contract).
+# -------------------------------------------------------------------
+
+import base64
+import json
+from datetime import datetime
+
+from utils.db_json import json_array_sql
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+SERVER_CURSOR_ITERSIZE = 500
+COUNT_MODES = ("estimate", "exact")
+
+
+class PageArgs:
+    def __init__(self, limit=None, after=None, count=None):
+        self.limit = limit      # None -> unpaged (legacy full list)
+        self.after = after      # (uploaded_on, doc_id) or None
+        self.count = count      # None | "estimate" | "exact"
+
+
+ORDER_BY = "uploaded_on DESC NULLS LAST, doc_id DESC"
+
+
+def encode_cursor(uploaded_on, doc_id):
+    raw = json.dumps([uploaded_on.isoformat() if uploaded_on else None, doc_id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        uploaded_on, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        # null: the previous page ended among the rows without uploaded_on
+        return (datetime.fromisoformat(uploaded_on) if uploaded_on is not None else None), int(doc_id)
+    except Exception:
+        raise ValueError("Invalid 'after' cursor")
+
+
+def parse_page_args(args):
+    """Read limit / after / count from request.args. Raises ValueError on bad input."""
+    limit = args.get("limit")
+    after = args.get("after")
+    count = args.get("count")
+
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError("'limit' must be an integer")
+        if limit < 1:
+            raise ValueError("'limit' must be >= 1")
+        limit = min(limit, MAX_PAGE_SIZE)
+    elif after:
+        # A cursor without a page size still means "give me a page"
+        limit = DEFAULT_PAGE_SIZE
+
+    if count and count not in COUNT_MODES:
+        raise ValueError("'count' must be one of: " + ", ".join(COUNT_MODES))
+
+    return PageArgs(
+        limit=limit,
+        after=decode_cursor(after) if after else None,
+        count=count or None,
+    )
+
+
+def count_rows(conn, base_query, params, mode):
+    """Total rows matching base_query: planner estimate (cheap) or exact COUNT(*)."""
+    cur = conn.cursor()
+    if mode == "estimate":
+        cur.execute("EXPLAIN (FORMAT JSON) " + base_query, tuple(params))
+        plan = cur.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    cur.execute(f"SELECT COUNT(*) FROM ({base_query}) AS q", tuple(params))
+    return cur.fetchone()[0]
+
+
+def _page_query(base_query, params, page):
+    """base_query + keyset condition, ORDER BY and LIMIT (+1 look-ahead row)."""
+    if not page.limit:
+        return base_query + " ORDER BY d.uploaded_on DESC NULLS LAST, d.doc_id DESC", list(params)
+
+    after_on, after_id = page.after or (None, None)
+    branches = []
+    query_params = []
+
+    # Dated rows, unless the cursor is already past them
+    if not (page.after and after_on is None):
+        if page.after:
+            cond = "(d.uploaded_on, d.doc_id) < (%s, %s)"
+            extra = [after_on, after_id]
+        else:
+            cond, extra = "d.uploaded_on IS NOT NULL", []
+        branches.append(f"{base_query} AND {cond} ORDER BY d.uploaded_on DESC, d.doc_id DESC LIMIT %s")
+        query_params += list(params) + extra + [page.limit + 1]
+
+    # Rows without uploaded_on come last
+    cond, extra = "d.uploaded_on IS NULL", []
+    if page.after and after_on is None:
+        cond += " AND d.doc_id < %s"
+        extra = [after_id]
+    branches.append(f"{base_query} AND {cond} ORDER BY d.doc_id DESC LIMIT %s")
+    query_params += list(params) + extra + [page.limit + 1]
+
+    if len(branches) == 1:
+        # Past the dated rows: the undated branch is already ordered and limited
+        return branches[0], query_params
+
+    query = " UNION ALL ".join(f"({b})" for b in branches)
+    query += f" ORDER BY {ORDER_BY} LIMIT %s"
+    query_params.append(page.limit + 1)
+    return query, query_params
+
+
+def _paging(page, has_more, last_key, total):
+    paging = {
+        "limit": page.limit,
+        "has_more": has_more,
+        "next_cursor": None,
+    }
+    if has_more:
+        paging["next_cursor"] = encode_cursor(*last_key)
+    if page.count:
+        paging["total"] = total
+        paging["total_is_estimate"] = page.count == "estimate"
+    return paging
+
+
+def fetch_keyset_page(conn, base_query, params, page, cursor_name):
+    """
+    Run base_query (which must already contain a WHERE clause and select
+    d.doc_id as column 0 and d.uploaded_on as column 4) through a named
+    server-side cursor, in ORDER_BY order and starting after page.after.
+
+    Returns (rows, paging) where paging is the dict sent back to the client.
+    Only one page (+1 look-ahead row) is ever pulled into the worker.
+    """
+    total = None
+    if page.count:
+        total = count_rows(conn, base_query, params, page.count)
+
+    query, query_params = _page_query(base_query, params, page)
+
+    with conn.cursor(name=cursor_name) as cur:
+        cur.itersize = SERVER_CURSOR_ITERSIZE
+        cur.execute(query, tuple(query_params))
+        if page.limit:
+            rows = cur.fetchmany(page.limit + 1)
+        else:
+            rows = cur.fetchall()
+
+    # Server-side cursors live inside a transaction; end it before the
+    # connection goes back to the pool.
+    conn.rollback()
+
+    has_more = bool(page.limit) and len(rows) > page.limit
+    if has_more:
+        rows = rows[:page.limit]
+
+    last_key = (rows[-1][4], rows[-1][0]) if rows else None
+    return rows, _paging(page, has_more, last_key, total)
+
+
+def fetch_keyset_page_json(conn, base_query, params, page, row_json):
+    """
+    fetch_keyset_page(), rendered by Postgres (utils/db_json.py).
+    row_json is a SQL expression over base_query's output columns (which
+    must include doc_id and uploaded_on). Returns (data_json, paging):
+    the JSON array text of the page's rows, in page order.
+    """
+    total = None
+    if page.count:
+        total = count_rows(conn, base_query, params, page.count)
+
+    query, query_params = _page_query(base_query, params, page)
+    # Leave the look-ahead row out of the array and the cursor
+    in_page = f"rn <= {int(page.limit)}" if page.limit else None
+    last = f" FILTER (WHERE {in_page})" if in_page else ""
+
+    row = conn.execute(f"""
+        WITH page AS ({query}),
+        numbered AS (
+            SELECT page.*, row_number() OVER (ORDER BY {ORDER_BY}) AS rn
+            FROM page
+        )
+        SELECT
+            {json_array_sql(row_json, "rn", in_page)},
+            count(*),
+            (array_agg(uploaded_on ORDER BY rn DESC){last})[1],
+            (array_agg(doc_id ORDER BY rn DESC){last})[1]
+        FROM numbered
+    """, tuple(query_params)).fetchone()
+    conn.rollback()
+
+    data_json, row_count, last_uploaded_on, last_doc_id = row
+    has_more = bool(page.limit) and row_count > page.limit
+    return data_json, _paging(page, has_more, (last_uploaded_on, last_doc_id), total)
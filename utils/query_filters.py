@@ -0,0 +1,61 @@
+# utils/query_filters.py
+# -------------------------------------------------------------------
+# Shared WHERE-clause builder for the doc_processing_log list routes
+# (dashboard, monitoring, human review, export).
+#
+# Date filters are emitted as half-open timestamp ranges:
+#     d.uploaded_on >= from_date AND d.uploaded_on < to_date + 1 day
+# instead of DATE(d.uploaded_on) BETWEEN ..., so Postgres can use the
+# uploaded_on indexes created in migrations/migrate.py.
+# -------------------------------------------------------------------
+
+from datetime import datetime, timedelta
+from utils.status_codes import overall_code_for
+
+
+def parse_date(value, name):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise ValueError(f"'{name}' must be a date in YYYY-MM-DD format")
+
+
+def build_doc_filters(args, alias="d", with_status=False, date_column="uploaded_on"):
+    """
+    Read client_id / from_date / to_date (and optionally status) from
+    request.args and return (filters, params) ready to be AND-ed together.
+    date_column lets the same filters run against doc_daily_stats.day.
+    Raises ValueError for malformed dates.
+    """
+    filters = []
+    params = []
+
+    client_id = args.get("client_id")
+    from_date = args.get("from_date")
+    to_date = args.get("to_date")
+
+    if client_id:
+        filters.append(f"{alias}.client_id = %s")
+        params.append(client_id)
+
+    if with_status:
+        status = args.get("status")
+        # Known codes / labels match by prefix (see utils/status_codes.py)
+        code = overall_code_for(status)
+        if code:
+            filters.append(f"{alias}.overall_status_code = %s")
+            params.append(code)
+        elif status:
+            # Free-text status that isn't a known code: substring match
+            filters.append(f"{alias}.overall_status ILIKE %s")
+            params.append(f"%{status}%")
+
+    if from_date:
+        filters.append(f"{alias}.{date_column} >= %s")
+        params.append(parse_date(from_date, "from_date"))
+
+    if to_date:
+        filters.append(f"{alias}.{date_column} < %s")
+        params.append(parse_date(to_date, "to_date") + timedelta(days=1))
+
+    return filters, params
@@ -0,0 +1,197 @@
+# utils/reference_data.py
+# -------------------------------------------------------------------
+# Process-local cache of clients and doc_formats (they change about
+# weekly, but were read on every page load and every upload).
+#
+#   REFERENCE_CACHE_TTL   seconds before a snapshot is reloaded (default 300)
+#
+# Each load becomes an immutable snapshot; `version` goes up only when
+# the rows actually changed. Edits to clients / formats show up within
+# REFERENCE_CACHE_TTL; refresh() reloads at once (in this process).
+# A reload queries outside the snapshot lock: one thread reloads while
+# the others keep getting the old snapshot until the new one is swapped
+# in. Only callers that asked for fresher data (max_age) wait for it.
+#
+# The JSON bodies of GET /api/clients and /api/doc_formats/<client_id>
+# are rendered once per snapshot with a strong ETag (hash of the body),
+# so conditional requests are answered with 304 without touching the DB.
+# An id the snapshot doesn't know triggers one early reload (at most
+# every REFERENCE_MISS_RELOAD_SECONDS) before it is rejected.
+# -------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from flask import Response, request
+
+from config.db_config import connection
+from utils.uploads import name_parts
+
+REFERENCE_CACHE_TTL = float(os.getenv("REFERENCE_CACHE_TTL", "300"))
+REFERENCE_MISS_RELOAD_SECONDS = float(os.getenv("REFERENCE_MISS_RELOAD_SECONDS", "5"))
+# After a failed reload the old snapshot is served this long before trying again
+REFERENCE_RETRY_SECONDS = 10
+
+_lock = threading.Lock()         # _snapshot swap + _stats
+_reload_lock = threading.Lock()  # one reload at a time
+_snapshot = None
+_stats = {"loads": 0, "changes": 0, "load_errors": 0, "not_modified": 0}
+
+
+def _render(payload):
+    """(body, etag) -- body as Flask's jsonify writes it outside debug mode."""
+    body = (json.dumps(payload, sort_keys=True, separators=(",", ":")) + "\n").encode("utf-8")
+    return body, hashlib.sha256(body).hexdigest()[:32]
+
+
+def _load(previous):
+    with connection() as conn:
+        clients = conn.execute(
+            "SELECT client_id, client_name FROM clients ORDER BY client_name;"
+        ).fetchall()
+        formats = conn.execute("""
+            SELECT doc_format_id, client_id, doc_type, doc_format_name, file_type
+            FROM doc_formats
+            ORDER BY doc_format_name;
+        """).fetchall()
+
+    clients_body = _render({"status": "success", "data": [{"id": r[0], "name": r[1]} for r in clients]})
+
+    formats_by_client = {}
+    for doc_format_id, client_id, doc_type, name, file_type in formats:
+        formats_by_client.setdefault(client_id, []).append(
+            {"id": doc_format_id, "doc_type": doc_type, "name": name, "file_type": file_type}
+        )
+    formats_bodies = {
+        client_id: _render({"status": "success", "data": rows})
+        for client_id, rows in formats_by_client.items()
+    }
+
+    digest = hashlib.sha256(repr((clients, formats)).encode("utf-8")).hexdigest()
+    changed = previous is None or previous["digest"] != digest
+    return {
+        "version": (previous["version"] if previous else 0) + (1 if changed else 0),
+        "digest": digest,
+        "loaded_at": time.monotonic(),
+        "clients": {client_id: name for client_id, name in clients},
+        "formats": {r[0]: r for r in formats},
+        "clients_body": clients_body,
+        "formats_bodies": formats_bodies,
+    }, changed
+
+
+def _is_fresh(snapshot, max_age):
+    return snapshot is not None and time.monotonic() - snapshot["loaded_at"] < max_age
+
+
+def get_snapshot(max_age=None):
+    """Current snapshot, reloaded when older than max_age (default REFERENCE_CACHE_TTL)."""
+    global _snapshot
+    wait = max_age is not None
+    max_age = REFERENCE_CACHE_TTL if max_age is None else max_age
+    snapshot = _snapshot
+    if _is_fresh(snapshot, max_age):
+        return snapshot
+
+    # Stale: serve it while another thread is already reloading
+    if not _reload_lock.acquire(blocking=wait or snapshot is None):
+        return snapshot
+    try:
+        snapshot = _snapshot
+        if _is_fresh(snapshot, max_age):
+            return snapshot
+        try:
+            new_snapshot, changed = _load(snapshot)
+        except Exception as e:
+            with _lock:
+                _stats["load_errors"] += 1
+                if _snapshot is None:
+                    raise
+                print(f"⚠️ Reference data reload failed, serving version {_snapshot['version']}: {e}")
+                _snapshot = dict(_snapshot, loaded_at=time.monotonic() - max(0.0, REFERENCE_CACHE_TTL - REFERENCE_RETRY_SECONDS))
+                return _snapshot
+        with _lock:
+            _stats["loads"] += 1
+            if changed:
+                _stats["changes"] += 1
+                print(f"🔄 Reference data version {new_snapshot['version']}: "
+                      f"{len(new_snapshot['clients'])} client(s), {len(new_snapshot['formats'])} format(s)")
+            _snapshot = new_snapshot
+            return _snapshot
+    finally:
+        _reload_lock.release()
+
+
+def refresh():
+    """Reload now. Returns the (possibly unchanged) version."""
+    return get_snapshot(max_age=0)["version"]
+
+
+def lookup_name_parts(client_id, doc_format_id):
+    """
+    Cached utils.uploads.lookup_name_parts(): (client_name, doc_type, doc_format_name).
+    Raises ValueError("Invalid client ID" / "Invalid format ID").
+    """
+    try:
+        client_id = int(client_id)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid client ID")
+    try:
+        doc_format_id = int(doc_format_id)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid format ID")
+
+    snapshot = get_snapshot()
+    if client_id not in snapshot["clients"] or doc_format_id not in snapshot["formats"]:
+        # Possibly added since the last load
+        snapshot = get_snapshot(max_age=REFERENCE_MISS_RELOAD_SECONDS)
+
+    client_name = snapshot["clients"].get(client_id)
+    if client_name is None:
+        raise ValueError("Invalid client ID")
+    doc_format = snapshot["formats"].get(doc_format_id)
+    if doc_format is None:
+        raise ValueError("Invalid format ID")
+
+    _, _, doc_type, doc_format_name, _ = doc_format
+    return name_parts(client_name, doc_type, doc_format_name)
+
+
+def _conditional_response(body, etag):
+    if request.if_none_match.contains_weak(etag):
+        _stats["not_modified"] += 1
+        resp = Response(status=304)
+    else:
+        resp = Response(body, status=200, mimetype="application/json")
+    resp.set_etag(etag)
+    # Always revalidate; a matching ETag costs a 304 and no DB query
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+def clients_response():
+    snapshot = get_snapshot()
+    return _conditional_response(*snapshot["clients_body"])
+
+
+def doc_formats_response(client_id):
+    snapshot = get_snapshot()
+    rendered = snapshot["formats_bodies"].get(client_id)
+    if rendered is None:
+        rendered = _render({"status": "success", "data": []})
+    return _conditional_response(*rendered)
+
+
+def reference_stats():
+    snapshot = _snapshot
+    return {
+        **_stats,
+        "version": snapshot["version"] if snapshot else None,
+        "age_seconds": round(time.monotonic() - snapshot["loaded_at"], 1) if snapshot else None,
+        "ttl_seconds": REFERENCE_CACHE_TTL,
+        "clients": len(snapshot["clients"]) if snapshot else 0,
+        "formats": len(snapshot["formats"]) if snapshot else 0,
+    }
@@ -0,0 +1,119 @@
+# utils/response_cache.py
+# -------------------------------------------------------------------
+# In-process TTL + LRU cache for the read-heavy list endpoints
+# (dashboard_summary, monitoring, human_review).
+#
+# Key   = (endpoint, normalized query args)
+# Value = the JSON body of a 200 response
+#
+#   RESPONSE_CACHE_TTL   seconds an entry stays fresh (default 30, 0 = off)
+#   RESPONSE_CACHE_SIZE  max entries before LRU eviction (default 256)
+#
+# Writes that change what these endpoints return (update_corrected_json,
+# upload_files) call invalidate() explicitly; the TTL covers status
+# changes written by the external extraction pipeline.
+# -------------------------------------------------------------------
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, make_response, request
+
+
+class TTLCache:
+    def __init__(self, maxsize=256, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+response_cache = TTLCache(
+    maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "30")),
+)
+
+
+def _cache_key(endpoint):
+    # Drop empty filters and sort, so ?client_id=&status=X == ?status=X
+    args = tuple(sorted(
+        (k, v) for k, v in request.args.items(multi=True) if v not in ("", None)
+    ))
+    return endpoint, args
+
+
+def cached_response(endpoint):
+    """Decorator: serve the route's 200 JSON body from response_cache."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if response_cache.ttl <= 0:
+                return view(*args, **kwargs)
+
+            key = _cache_key(endpoint)
+            body = response_cache.get(key)
+            if body is not None:
+                resp = Response(body, status=200, mimetype="application/json")
+                resp.headers["X-Cache"] = "HIT"
+                return resp
+
+            resp = make_response(view(*args, **kwargs))
+            if resp.status_code == 200 and resp.mimetype == "application/json":
+                response_cache.set(key, resp.get_data())
+            resp.headers["X-Cache"] = "MISS"
+            return resp
+        return wrapper
+    return decorator
+
+
+def invalidate_response_cache():
+    response_cache.invalidate()
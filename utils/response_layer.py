@@ -0,0 +1,90 @@
+# utils/response_layer.py
+# -------------------------------------------------------------------
+# App-wide conditional GET + gzip for JSON responses (init_app in app.py).
+#
+# For every 200 application/json response to a GET/HEAD:
+#   - ETag: the view's own if it set one (reference_data), else a hash of
+#     the body; a matching If-None-Match is answered with 304 and no body
+#   - gzip when the client accepts it and the body is at least
+#     RESPONSE_GZIP_MIN_BYTES; the compressed variant's ETag gets a
+#     "-gzip" suffix, as two encodings can't share a strong ETag
+#
+#   RESPONSE_ETAGS           "0" to turn off ETags / 304 (default on)
+#   RESPONSE_GZIP_MIN_BYTES  smallest body worth compressing (default 1024)
+#   RESPONSE_GZIP_LEVEL      zlib level 1-9, 0 = no compression (default 6)
+#
+# The view still runs for a 304 (only the transfer is saved); the list
+# endpoints behind @cached_response mostly answer from memory anyway.
+# Streamed and file responses (exports, send_from_directory) are never
+# touched; views can opt out explicitly with @raw_response.
+# -------------------------------------------------------------------
+
+import gzip
+import hashlib
+import os
+
+from flask import current_app, request
+
+RESPONSE_ETAGS = os.getenv("RESPONSE_ETAGS", "1") == "1"
+RESPONSE_GZIP_MIN_BYTES = int(os.getenv("RESPONSE_GZIP_MIN_BYTES", "1024"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+
+
+def raw_response(view):
+    """Decorator: leave this view's responses exactly as it returns them."""
+    view.raw_response = True
+    return view
+
+
+def _opted_out():
+    view = current_app.view_functions.get(request.endpoint)
+    return getattr(view, "raw_response", False)
+
+
+def _wants_gzip(size):
+    return (
+        RESPONSE_GZIP_LEVEL > 0
+        and size >= RESPONSE_GZIP_MIN_BYTES
+        and "gzip" in request.accept_encodings
+    )
+
+
+def _process_response(response):
+    if (
+        request.method not in ("GET", "HEAD")
+        or response.status_code != 200
+        or response.mimetype != "application/json"
+        or response.is_streamed
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or _opted_out()
+    ):
+        return response
+
+    body = response.get_data()
+    compress = _wants_gzip(len(body))
+    response.vary.add("Accept-Encoding")
+
+    if RESPONSE_ETAGS:
+        etag, _ = response.get_etag()
+        if not etag:
+            etag = hashlib.sha256(body).hexdigest()[:32]
+        variant = f"{etag}-gzip" if compress else etag
+        response.set_etag(variant)
+        if "Cache-Control" not in response.headers:
+            # Stored by the browser, but always revalidated
+            response.headers["Cache-Control"] = "no-cache"
+
+        if request.if_none_match.contains_weak(variant) or request.if_none_match.contains_weak(etag):
+            response.status_code = 304
+            response.set_data(b"")
+            return response
+
+    if compress:
+        response.set_data(gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL))
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+def init_app(app):
+    app.after_request(_process_response)
@@ -0,0 +1,59 @@
+# utils/status_codes.py
+# -------------------------------------------------------------------
+# Normalized status codes for doc_processing_log.
+#
+# The pipeline writes free-text statuses ("Completed", "Failed - ERP
+# timeout", "File Missing in ERP", ...). Migration 2 adds three STORED
+# generated columns that classify them once, on write:
+#
+#   overall_status_code     <- overall_status
+#   extraction_status_code  <- data_extraction_status
+#   erp_status_code         <- erp_entry_status
+#
+# Routes filter on these codes (plain btree / partial-index friendly)
+# instead of repeating ILIKE prefix matches per row per request.
+#
+# Classification is by prefix, so ?status=failed on the monitoring list
+# matches "Failed - ERP timeout" and "Error ..." but no longer
+# "Partially Failed", which the old substring filter (ILIKE '%failed%')
+# also returned; that row's code is "other". Any ?status= value that is
+# not a code or UI label still gets the substring match.
+# Keep the CASE expressions in migrations/migrate.py in sync with this.
+# -------------------------------------------------------------------
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+SUCCESS = "success"
+FAILED = "failed"
+FILE_MISSING = "file_missing"
+FIXED = "fixed"
+OTHER = "other"
+
+OVERALL_CODES = (IN_PROGRESS, COMPLETED, FAILED, OTHER)
+EXTRACTION_CODES = (IN_PROGRESS, SUCCESS, FAILED, OTHER)
+ERP_CODES = (IN_PROGRESS, SUCCESS, FAILED, FILE_MISSING, FIXED, OTHER)
+
+# Labels older UI builds send as ?status=... (the current one sends the
+# codes) -> overall_status_code
+OVERALL_STATUS_LABELS = {
+    "in progress": IN_PROGRESS,
+    "completed": COMPLETED,
+    "failed": FAILED,
+}
+
+# Human review queue: extraction succeeded but ERP entry did not.
+# Must match the predicate of the partial indexes in migration 3.
+HUMAN_REVIEW_PREDICATE = (
+    "d.extraction_status_code = 'success' "
+    "AND d.erp_status_code IN ('failed', 'file_missing')"
+)
+
+
+def overall_code_for(status):
+    """Map a ?status= value (UI label or code) to an overall_status_code, else None."""
+    if not status:
+        return None
+    key = status.strip().lower()
+    if key in OVERALL_CODES:
+        return key
+    return OVERALL_STATUS_LABELS.get(key)
@@ -0,0 +1,114 @@
+# utils/storage.py
+# -------------------------------------------------------------------
+# Where uploaded files live under UPLOAD_FOLDER.
+#
+#   UPLOAD_LAYOUT=flat     <file_name>                               (default)
+#   UPLOAD_LAYOUT=sharded  <client>/<YYYY>/<MM>/<DD>/<file_name>
+#
+# Stored file names are unique (they carry a microsecond timestamp), so
+# the name stays the document's key (doc_processing_log.doc_file_name)
+# and stored_files (migration 7) maps it to its relative path. Names
+# without a stored_files row are flat files: both layouts are readable
+# while `python -m migrations.shard_uploads` moves old files over.
+# Keep UPLOAD_LAYOUT=flat until the extraction pipeline reads the
+# sharded tree.
+#
+# Not stored files: dot directories (.staging / .chunked, in-flight
+# uploads) and the host_sync drop folder (HOST_SYNC_DIR, by default
+# UPLOAD_FOLDER/host_sync). walk_stored_files() skips both.
+# -------------------------------------------------------------------
+
+import datetime
+import os
+
+from utils.uploads import UPLOAD_FOLDER
+
+UPLOAD_LAYOUT = os.getenv("UPLOAD_LAYOUT", "flat")
+UNASSIGNED_SHARD = "_unassigned"
+HOST_SYNC_DIR = os.getenv("HOST_SYNC_DIR", os.path.join(UPLOAD_FOLDER, "host_sync"))
+
+
+def shard_dir(client_name, when):
+    """<client>/<YYYY>/<MM>/<DD> for a client name as used in stored names."""
+    return os.path.join(client_name or UNASSIGNED_SHARD, when.strftime("%Y"), when.strftime("%m"), when.strftime("%d"))
+
+
+def rel_path_for(file_name, client_name, when=None, layout=None):
+    """Relative path (under UPLOAD_FOLDER) a new file should be written to."""
+    if (layout or UPLOAD_LAYOUT) != "sharded":
+        return file_name
+    when = when or datetime.datetime.now()
+    return os.path.join(shard_dir(client_name, when), file_name).replace(os.sep, "/")
+
+
+def abs_path(rel_path):
+    """Absolute path for rel_path; the parent directory is created on demand."""
+    path = os.path.join(UPLOAD_FOLDER, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def walk_stored_files(top=UPLOAD_FOLDER):
+    """Yields (dir_path, file_name) for the stored files under top (both layouts)."""
+    host_sync_dir = os.path.realpath(HOST_SYNC_DIR)
+    for dir_path, dir_names, file_names in os.walk(top):
+        dir_names[:] = [
+            d for d in dir_names
+            if not d.startswith(".") and os.path.realpath(os.path.join(dir_path, d)) != host_sync_dir
+        ]
+        for name in file_names:
+            if not name.startswith("."):
+                yield dir_path, name
+
+
+def record_stored_files(conn, entries):
+    """entries: [(file_name, rel_path, client_id)]. Flat files need no row."""
+    rows = [(name, rel, client_id) for name, rel, client_id in entries if rel != name]
+    if not rows:
+        return
+    with conn.cursor() as cur:
+        cur.executemany("""
+            INSERT INTO stored_files (file_name, rel_path, client_id)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (file_name) DO UPDATE SET rel_path = EXCLUDED.rel_path;
+        """, rows)
+    conn.commit()
+
+
+def load_client_prefixes(conn):
+    """[(prefix, client_id, client_name)] longest first; prefix as used in stored names."""
+    rows = conn.execute("SELECT client_id, client_name FROM clients").fetchall()
+    prefixes = []
+    for client_id, name in rows:
+        if name:
+            shard_name = name.replace(" ", "_")
+            prefixes.append((f"{shard_name}_", client_id, shard_name))
+    return sorted(prefixes, key=lambda p: len(p[0]), reverse=True)
+
+
+def client_for_file_name(file_name, prefixes):
+    """(client_id, client_name) from a "<client>_<doc_type>_..." name, or (None, None)."""
+    for prefix, client_id, client_name in prefixes:
+        if file_name.startswith(prefix):
+            return client_id, client_name
+    return None, None
+
+
+def lookup_rel_path(conn, file_name):
+    """stored_files lookup (primary key, no directory scan); flat name if unknown."""
+    row = conn.execute(
+        "SELECT rel_path FROM stored_files WHERE file_name = %s;", (file_name,)
+    ).fetchone()
+    return row[0] if row else file_name
+
+
+def existing_path(base_dir, rel_path, file_name):
+    """
+    rel_path under base_dir if it exists, else the flat location.
+    Covers files indexed by a migration batch that hasn't moved them yet.
+    Returns the path relative to base_dir, or None.
+    """
+    for candidate in (rel_path, file_name):
+        if candidate and os.path.isfile(os.path.join(base_dir, candidate)):
+            return candidate
+    return None
@@ -0,0 +1,280 @@
+# utils/uploads.py
+# -------------------------------------------------------------------
+# Shared upload helpers: client/format name lookup, the stored file
+# naming scheme, content-hash dedup and image -> PDF conversion.
+# Used by the single-shot /api/upload route and the chunked upload API.
+#
+# Uploads are streamed into UPLOAD_FOLDER/.staging while their SHA-256 is
+# computed; upload_file_hashes (migration 5) maps (client_id, sha256) to
+# the stored file so an exact re-upload returns the existing document.
+#
+# Images are normalized before they go into the PDF:
+#   IMAGE_MAX_DIMENSION  longest edge in pixels (default 2339 = A4 @ 200 DPI, 0 = no cap)
+#   IMAGE_PDF_DPI        DPI written into the PDF (default 200)
+#   IMAGE_GRAYSCALE      "1" to store pages as 8-bit grayscale (default off)
+#   IMAGE_JPEG_QUALITY   JPEG quality of the embedded page image (default 75)
+# JPEGs are decoded at reduced size via Image.draft(), so a 50 MP photo
+# never has to be fully decoded in memory.
+#
+# Every frame of a multi-page TIFF becomes a PDF page, and several images
+# can be merged into one PDF. Pages are decoded, normalized and written
+# one at a time, so memory does not grow with the page count.
+# -------------------------------------------------------------------
+
+import os
+import datetime
+import hashlib
+import threading
+import uuid
+from PIL import Image, ImageOps, ImageSequence
+
+# Folder for uploaded files
+UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "uploaded_docs")
+
+# Uploads land here first (same filesystem -> moving into place is a rename)
+STAGING_DIR = os.path.join(UPLOAD_FOLDER, ".staging")
+
+# allowed image extensions
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".webp"}
+
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "2339"))
+IMAGE_PDF_DPI = float(os.getenv("IMAGE_PDF_DPI", "200"))
+IMAGE_GRAYSCALE = os.getenv("IMAGE_GRAYSCALE", "0") == "1"
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "75"))
+
+
+def name_parts(client_name, doc_type, doc_format_name):
+    """
+    (client_name, doc_type, doc_format_name) as used in stored file names:
+    spaces replaced by underscores, client prefix dropped from the format name.
+    """
+    client_name = client_name.replace(" ", "_")
+    doc_type = doc_type.replace(" ", "_")
+    doc_format_name = doc_format_name.replace(" ", "_")
+
+    # Remove client prefix if present in format name
+    if doc_format_name.lower().startswith(client_name.lower()):
+        doc_format_name = doc_format_name[len(client_name):].lstrip("_")
+
+    return client_name, doc_type, doc_format_name
+
+
+def lookup_name_parts(conn, client_id, doc_format_id):
+    """
+    Return (client_name, doc_type, doc_format_name) with spaces replaced
+    by underscores, as used in stored file names.
+    Raises ValueError("Invalid client ID" / "Invalid format ID").
+    The upload routes use the cached utils.reference_data.lookup_name_parts().
+    """
+    cur = conn.cursor()
+
+    # Get client name
+    cur.execute("SELECT client_name FROM clients WHERE client_id = %s;", (client_id,))
+    client_name_row = cur.fetchone()
+    if not client_name_row:
+        raise ValueError("Invalid client ID")
+
+    # Get document type and format name
+    cur.execute("""
+        SELECT doc_format_name, doc_type
+        FROM doc_formats
+        WHERE doc_format_id = %s;
+    """, (doc_format_id,))
+    doc_info = cur.fetchone()
+    if not doc_info:
+        raise ValueError("Invalid format ID")
+
+    doc_format_name, doc_type = doc_info
+    return name_parts(client_name_row[0], doc_type, doc_format_name)
+
+
+_name_clock_lock = threading.Lock()
+_last_name_time = datetime.datetime.min
+_name_token = (None, None)  # (pid, token)
+
+
+def _unique_now():
+    """datetime.now(), but strictly increasing across calls in this process."""
+    global _last_name_time
+    with _name_clock_lock:
+        now = datetime.datetime.now()
+        if now <= _last_name_time:
+            # Same microsecond as the previous name (tight loop / parallel uploads)
+            now = _last_name_time + datetime.timedelta(microseconds=1)
+        _last_name_time = now
+        return now
+
+
+def _process_token():
+    """Random token of this process, new after a fork (gunicorn workers, etc.)."""
+    global _name_token
+    pid = os.getpid()
+    with _name_clock_lock:
+        if _name_token[0] != pid:
+            _name_token = (pid, uuid.uuid4().hex[:6])
+        return _name_token[1]
+
+
+def build_prefix(client_name, doc_type, now=None):
+    """
+    <client>_<doc_type>_<YYYYmmdd>_<HHMMSS_micro>_<token> -- stored file
+    name without extension. The clock is only unique within a process;
+    the per-process token keeps the API workers and the standalone
+    host_sync watcher from producing the same name.
+    """
+    now = now or _unique_now()
+    date_str = now.strftime("%Y%m%d")
+    time_str = now.strftime("%H%M%S_%f")  # microsecond precision
+    return f"{client_name}_{doc_type}_{date_str}_{time_str}_{_process_token()}"
+
+
+def staging_path(ext):
+    """A fresh path under .staging for an upload that isn't in place yet."""
+    os.makedirs(STAGING_DIR, exist_ok=True)
+    return os.path.join(STAGING_DIR, f"{uuid.uuid4().hex}{ext}")
+
+
+def save_stream(stream, path, block_size=1024 * 1024, max_bytes=None):
+    """
+    Copy stream to path, hashing as it goes. Returns (sha256 hex, size).
+    Raises ValueError once more than max_bytes have been read.
+    """
+    h = hashlib.sha256()
+    size = 0
+    with open(path, "wb") as fh:
+        for block in iter(lambda: stream.read(block_size), b""):
+            size += len(block)
+            if max_bytes is not None and size > max_bytes:
+                raise ValueError(f"exceeds {max_bytes} bytes")
+            h.update(block)
+            fh.write(block)
+    return h.hexdigest(), size
+
+
+def hash_file(path, block_size=1024 * 1024):
+    """(sha256 hex, size) of a file on disk."""
+    h = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(block_size), b""):
+            h.update(block)
+            size += len(block)
+    return h.hexdigest(), size
+
+
+def find_duplicates(conn, client_id, hashes):
+    """
+    {sha256: {"file_name", "rel_path", "doc_id"}} for hashes this client already uploaded.
+    Entries whose file is gone and never made it into doc_processing_log
+    (e.g. a failed conversion) don't count as duplicates.
+    """
+    if not hashes:
+        return {}
+    rows = conn.execute("""
+        SELECT h.sha256, h.file_name, COALESCE(sf.rel_path, h.file_name), d.doc_id
+        FROM upload_file_hashes h
+        LEFT JOIN stored_files sf ON sf.file_name = h.file_name
+        LEFT JOIN LATERAL (
+            SELECT doc_id FROM doc_processing_log
+            WHERE doc_file_name = h.file_name
+            ORDER BY doc_id DESC LIMIT 1
+        ) d ON TRUE
+        WHERE h.client_id = %s AND h.sha256 = ANY(%s);
+    """, (client_id, list(hashes))).fetchall()
+    return {
+        sha: {"file_name": file_name, "rel_path": rel_path, "doc_id": doc_id}
+        for sha, file_name, rel_path, doc_id in rows
+        if doc_id is not None or os.path.exists(os.path.join(UPLOAD_FOLDER, rel_path))
+    }
+
+
+def register_hashes(conn, client_id, entries):
+    """entries: [(sha256, file_name, source_name, file_size)]; newest upload wins."""
+    if not entries:
+        return
+    with conn.cursor() as cur:
+        cur.executemany("""
+            INSERT INTO upload_file_hashes (client_id, sha256, file_name, source_name, file_size)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (client_id, sha256) DO UPDATE
+            SET file_name = EXCLUDED.file_name,
+                source_name = EXCLUDED.source_name,
+                file_size = EXCLUDED.file_size,
+                created_on = now();
+        """, [(client_id, *e) for e in entries])
+    conn.commit()
+
+
+def is_image(ext, mimetype=None):
+    return ext in IMAGE_EXTS or bool(mimetype and mimetype.startswith("image/"))
+
+
+def normalize_image(img):
+    """
+    Downscale / orient / convert an opened (not yet loaded) image for PDF output.
+    Returns a new image in "RGB" or "L" mode.
+    """
+    mode = "L" if IMAGE_GRAYSCALE else "RGB"
+    max_dim = IMAGE_MAX_DIMENSION
+
+    # JPEG only: let libjpeg decode at 1/2, 1/4 or 1/8 scale (never below max_dim)
+    if max_dim:
+        img.draft(mode, (max_dim, max_dim))
+
+    # Phone photos are stored sideways with an EXIF Orientation tag
+    img = ImageOps.exif_transpose(img)
+
+    if max_dim and max(img.size) > max_dim:
+        img.thumbnail((max_dim, max_dim), Image.LANCZOS)
+
+    # Convert to RGB (or L) if needed (PDF requires RGB)
+    if img.mode != mode:
+        img = img.convert(mode)
+    return img
+
+
+def iter_pages(sources):
+    """Yield one normalized page per frame of each source, in order."""
+    for src in sources:
+        with Image.open(src) as img:
+            for frame in ImageSequence.Iterator(img):
+                yield normalize_image(frame)
+
+
+def save_images_as_pdf(sources, file_path):
+    """
+    Write every frame of every source (paths or file objects) into one
+    multi-page PDF. Only the current page is held in memory: the first page
+    creates the file, later pages are appended to it.
+    Returns size stats, including bytes_saved vs. the sources.
+    """
+    sizes = [os.path.getsize(src) if isinstance(src, (str, os.PathLike)) else None for src in sources]
+    source_size = None if None in sizes else sum(sizes)
+
+    pages = 0
+    for page in iter_pages(sources):
+        # RGB/L pages are embedded as JPEG
+        page.save(
+            file_path, "PDF",
+            append=pages > 0,
+            resolution=IMAGE_PDF_DPI,
+            quality=IMAGE_JPEG_QUALITY,
+        )
+        pages += 1
+        page.close()
+
+    if not pages:
+        raise ValueError("No image frames to convert")
+
+    pdf_size = os.path.getsize(file_path)
+    return {
+        "pages": pages,
+        "source_size": source_size,
+        "pdf_size": pdf_size,
+        "bytes_saved": source_size - pdf_size if source_size is not None else None,
+    }
+
+
+def save_image_as_pdf(src, file_path):
+    """Convert one image (all frames, for multi-page TIFFs) into a PDF."""
+    return save_images_as_pdf([src], file_path)
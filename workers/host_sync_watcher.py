@@ -0,0 +1,524 @@
+# workers/host_sync_watcher.py
+# -------------------------------------------------------------------
+# Ingest files dropped into the host_sync folder (the host's
+# Ready_to_Run directory mounted at uploaded_docs/host_sync).
+#
+#   HOST_SYNC_WATCH=1 python app.py            # thread inside the API
+#   python -m workers.host_sync_watcher        # standalone process
+#
+# Files go through utils/ingest.py, i.e. the same dedup, naming and
+# image -> PDF conversion as /api/upload. Client and format come from
+# the folder a file sits in:
+#   host_sync/<client>/<doc format>/<file>
+# where <client> is a client name or id and <doc format> is a format
+# name, doc_type or id of that client (spaces may be written as "_").
+# Anything else uses HOST_SYNC_CLIENT_ID / HOST_SYNC_DOC_FORMAT_ID if
+# set, and is skipped otherwise. Originals are left in place.
+#
+# Detection: inotify (IN_CLOSE_WRITE / IN_MOVED_TO, so only finished
+# writes) with a reconcile scan every HOST_SYNC_RESCAN_SECONDS for
+# anything missed; where inotify isn't available (or HOST_SYNC_MODE=poll,
+# e.g. network mounts) the folder is scanned every HOST_SYNC_POLL_SECONDS
+# and a file counts as complete once unmodified for
+# HOST_SYNC_SETTLE_SECONDS.
+#
+# Debounce: events collect until the folder has been quiet for
+# HOST_SYNC_DEBOUNCE_SECONDS, HOST_SYNC_BATCH_SIZE files are waiting, or
+# the oldest has waited HOST_SYNC_MAX_DELAY_SECONDS; each batch is
+# ingested with one set of DB writes per client/format.
+#
+# Checkpoint: host_sync_files (migration 9) holds path, size and mtime
+# of every file taken in. A restart does one stat-only walk and ingests
+# only files that are new or changed since.
+#
+# If the checkpoint can't be loaded (DB not up yet, migration 9 not
+# applied) or the loop fails, the watcher retries with backoff up to
+# HOST_SYNC_RETRY_MAX_SECONDS. State, last error and heartbeat are in
+# GET /api/_host_sync and /readyz when it runs inside the API.
+#
+# Run a single watcher per drop folder (not one per API worker process).
+# -------------------------------------------------------------------
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+import traceback
+from dotenv import load_dotenv
+
+# Project modules read env at import time
+load_dotenv()
+
+from flask import Flask
+from werkzeug.utils import secure_filename
+
+from config.db_config import init_app as init_db, get_request_connection, release_request_connection
+from utils.response_cache import invalidate_response_cache
+from utils.uploads import UPLOAD_FOLDER, IMAGE_EXTS, lookup_name_parts, is_image, staging_path, save_stream
+from utils.storage import HOST_SYNC_DIR
+from utils.ingest import ingest_staged
+from utils import conversion_jobs
+
+HOST_SYNC_MODE = os.getenv("HOST_SYNC_MODE", "auto")  # auto | inotify | poll
+HOST_SYNC_CLIENT_ID = os.getenv("HOST_SYNC_CLIENT_ID")
+HOST_SYNC_DOC_FORMAT_ID = os.getenv("HOST_SYNC_DOC_FORMAT_ID")
+HOST_SYNC_DEBOUNCE_SECONDS = float(os.getenv("HOST_SYNC_DEBOUNCE_SECONDS", "2"))
+HOST_SYNC_MAX_DELAY_SECONDS = float(os.getenv("HOST_SYNC_MAX_DELAY_SECONDS", "30"))
+HOST_SYNC_BATCH_SIZE = int(os.getenv("HOST_SYNC_BATCH_SIZE", "500"))
+HOST_SYNC_POLL_SECONDS = float(os.getenv("HOST_SYNC_POLL_SECONDS", "10"))
+HOST_SYNC_RESCAN_SECONDS = float(os.getenv("HOST_SYNC_RESCAN_SECONDS", "600"))
+HOST_SYNC_SETTLE_SECONDS = float(os.getenv("HOST_SYNC_SETTLE_SECONDS", "5"))
+# Big drops of images wait for conversion slots instead of failing
+HOST_SYNC_QUEUE_WAIT = int(os.getenv("HOST_SYNC_QUEUE_WAIT", "300"))
+# DB not reachable yet / migration 9 missing: retry with backoff up to this
+HOST_SYNC_RETRY_MAX_SECONDS = float(os.getenv("HOST_SYNC_RETRY_MAX_SECONDS", "60"))
+
+HOST_SYNC_EXTS = IMAGE_EXTS | {".pdf"}
+
+
+# ---------- inotify (Linux) ----------
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len (+ name)
+
+
+class Inotify:
+    """Minimal inotify(7) binding over libc. Raises OSError where unavailable."""
+
+    MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+
+    def __init__(self):
+        try:
+            self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            init = self._libc.inotify_init1
+        except (OSError, AttributeError):
+            raise OSError("inotify is not available on this platform")
+        self.fd = init(os.O_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1: {os.strerror(err)}")
+        self.dirs = {}  # watch descriptor -> directory
+
+    def add_watch(self, path):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_add_watch {path}: {os.strerror(err)}")
+        self.dirs[wd] = path
+
+    def read(self, timeout):
+        """[(directory, name, mask)] of the events that arrive within timeout seconds."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 1024 * 1024)
+        except BlockingIOError:
+            return []
+
+        events, offset = [], 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & _IN_IGNORED:
+                self.dirs.pop(wd, None)  # directory removed
+                continue
+            events.append((self.dirs.get(wd), name, mask))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+# ---------- Watcher ----------
+def _key(value):
+    return str(value).strip().lower().replace(" ", "_")
+
+
+def _wanted(name):
+    return not name.startswith(".") and os.path.splitext(name)[1].lower() in HOST_SYNC_EXTS
+
+
+class HostSyncWatcher:
+    def __init__(self, app, root=None):
+        self.app = app
+        self.root = os.path.abspath(root or HOST_SYNC_DIR)
+        self.seen = {}      # rel_path -> (size, mtime_ns) already handled
+        self.pending = {}   # rel_path -> monotonic time first queued
+        self.last_event = 0.0
+        self.rescan_interval = HOST_SYNC_POLL_SECONDS
+        self._stop = threading.Event()
+        self.thread = None
+        # Liveness, reported by stats()
+        self.state = "starting"
+        self.last_error = None
+        self.restarts = 0
+        self.heartbeat = None
+        self.last_flush = None
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        now = time.time()
+        return {
+            "state": self.state,
+            "alive": self.thread.is_alive() if self.thread else self.state in ("starting", "running", "retrying"),
+            "root": self.root,
+            "last_error": self.last_error,
+            "restarts": self.restarts,
+            "heartbeat_age_seconds": round(now - self.heartbeat, 1) if self.heartbeat else None,
+            "last_flush_age_seconds": round(now - self.last_flush, 1) if self.last_flush else None,
+            "pending": len(self.pending),
+            "checkpointed": len(self.seen),
+        }
+
+    # --- Checkpoint ---
+    def _load_checkpoint(self):
+        with self.app.app_context():
+            try:
+                conn = get_request_connection()
+                rows = conn.execute("SELECT rel_path, file_size, mtime_ns FROM host_sync_files;").fetchall()
+            finally:
+                release_request_connection()
+        self.seen = {rel: (size, mtime_ns) for rel, size, mtime_ns in rows}
+        print(f"📌 host_sync checkpoint: {len(self.seen)} file(s) already ingested")
+
+    def _save_checkpoint(self, conn, done):
+        """done: [(rel_path, size, mtime_ns, file_name, status)]"""
+        with conn.cursor() as cur:
+            cur.executemany("""
+                INSERT INTO host_sync_files (rel_path, file_size, mtime_ns, file_name, status)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (rel_path) DO UPDATE
+                SET file_size = EXCLUDED.file_size,
+                    mtime_ns = EXCLUDED.mtime_ns,
+                    file_name = EXCLUDED.file_name,
+                    status = EXCLUDED.status,
+                    processed_on = now();
+            """, done)
+        conn.commit()
+
+    # --- Detection ---
+    def _rel(self, path):
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def _scan(self):
+        """New or changed files that have been left alone for HOST_SYNC_SETTLE_SECONDS."""
+        now = time.time()
+        found = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for name in filenames:
+                if not _wanted(name):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                rel = self._rel(path)
+                if self.seen.get(rel) == (st.st_size, st.st_mtime_ns):
+                    continue
+                if now - st.st_mtime < HOST_SYNC_SETTLE_SECONDS:
+                    continue
+                found.append(rel)
+        return found
+
+    def _watch_tree(self, inotify, top):
+        for dirpath, dirnames, _ in os.walk(top):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            inotify.add_watch(dirpath)
+
+    def _start_inotify(self):
+        if HOST_SYNC_MODE == "poll":
+            return None
+        try:
+            inotify = Inotify()
+        except OSError as e:
+            print(f"⚠️ host_sync: {e}; falling back to polling")
+            return None
+        try:
+            self._watch_tree(inotify, self.root)
+        except OSError as e:
+            # Usually fs.inotify.max_user_watches
+            print(f"⚠️ host_sync: {e}; falling back to polling")
+            inotify.close()
+            return None
+        self.rescan_interval = HOST_SYNC_RESCAN_SECONDS
+        return inotify
+
+    def _handle_events(self, inotify, events):
+        """Queue finished files. Returns True if a rescan is needed soon."""
+        rescan = False
+        for directory, name, mask in events:
+            if mask & _IN_Q_OVERFLOW:
+                print("⚠️ host_sync: inotify queue overflowed, rescanning")
+                rescan = True
+                continue
+            if directory is None or name.startswith("."):
+                continue
+            path = os.path.join(directory, name)
+            if mask & _IN_ISDIR:
+                if mask & (_IN_CREATE | _IN_MOVED_TO):
+                    # Files may land before the new watch is in place
+                    try:
+                        self._watch_tree(inotify, path)
+                    except OSError as e:
+                        print(f"⚠️ host_sync: {e}; relying on periodic rescans")
+                        self.rescan_interval = HOST_SYNC_POLL_SECONDS
+                    rescan = True
+                continue
+            if mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO) and _wanted(name):
+                self._queue(self._rel(path))
+        return rescan
+
+    # --- Debounce ---
+    def _queue(self, rel):
+        # Already waiting (e.g. seen again by a rescan): not a new event
+        if rel not in self.pending:
+            self.pending[rel] = self.last_event = time.monotonic()
+
+    def _due(self):
+        if not self.pending:
+            return False
+        now = time.monotonic()
+        return (
+            len(self.pending) >= HOST_SYNC_BATCH_SIZE
+            or now - self.last_event >= HOST_SYNC_DEBOUNCE_SECONDS
+            or now - min(self.pending.values()) >= HOST_SYNC_MAX_DELAY_SECONDS
+        )
+
+    def _flush(self):
+        batch = sorted(self.pending, key=self.pending.get)[:HOST_SYNC_BATCH_SIZE]
+        for rel in batch:
+            del self.pending[rel]
+        try:
+            self._process(batch)
+            self.last_flush = time.time()
+        except Exception as e:
+            # Not checkpointed, so the next rescan retries them
+            print(f"❌ host_sync: batch of {len(batch)} failed: {e}")
+
+    # --- Ingestion ---
+    def _load_targets(self, conn):
+        """({client key: client_id}, {(client_id, format key): doc_format_id})"""
+        clients = {}
+        for client_id, client_name in conn.execute("SELECT client_id, client_name FROM clients;").fetchall():
+            clients[_key(client_id)] = client_id
+            if client_name:
+                clients[_key(client_name)] = client_id
+        formats = {}
+        for doc_format_id, client_id, name, doc_type in conn.execute(
+            "SELECT doc_format_id, client_id, doc_format_name, doc_type FROM doc_formats;"
+        ).fetchall():
+            # An exact format name or id wins over a doc_type shared by several formats
+            if doc_type:
+                formats.setdefault((client_id, _key(doc_type)), doc_format_id)
+            for value in (name, doc_format_id):
+                if value:
+                    formats[(client_id, _key(value))] = doc_format_id
+        return clients, formats
+
+    def _target_for(self, rel, clients, formats):
+        parts = rel.split("/")
+        if len(parts) >= 3:
+            client_id = clients.get(_key(parts[0]))
+            doc_format_id = formats.get((client_id, _key(parts[1])))
+            if client_id is not None and doc_format_id is not None:
+                return client_id, doc_format_id
+        if HOST_SYNC_CLIENT_ID and HOST_SYNC_DOC_FORMAT_ID:
+            return int(HOST_SYNC_CLIENT_ID), int(HOST_SYNC_DOC_FORMAT_ID)
+        return None
+
+    def _process(self, batch):
+        with self.app.app_context():
+            try:
+                conn = get_request_connection()
+                clients, formats = self._load_targets(conn)
+            finally:
+                release_request_connection()
+
+            groups = {}
+            for rel in batch:
+                try:
+                    st = os.stat(os.path.join(self.root, rel))
+                except FileNotFoundError:
+                    continue
+                if self.seen.get(rel) == (st.st_size, st.st_mtime_ns):
+                    continue  # reopened for writing but unchanged
+                target = self._target_for(rel, clients, formats)
+                if not target:
+                    print(f"⚠️ host_sync: no client/format folder for {rel}, skipped")
+                    # Remembered until restart only: fixing the folder or env picks it up then
+                    self.seen[rel] = (st.st_size, st.st_mtime_ns)
+                    continue
+                groups.setdefault(target, []).append((rel, st))
+
+            done = []
+            for (client_id, doc_format_id), files in groups.items():
+                try:
+                    conn = get_request_connection()
+                    client_name, doc_type, _ = lookup_name_parts(conn, client_id, doc_format_id)
+                except ValueError as e:
+                    print(f"⚠️ host_sync: {e} for {len(files)} file(s), skipped")
+                    continue
+                finally:
+                    release_request_connection()
+
+                # --- Copy into .staging, hashing as it goes ---
+                staged = []
+                for rel, st in files:
+                    ext = os.path.splitext(rel)[1].lower()
+                    src_path = staging_path(ext)
+                    try:
+                        with open(os.path.join(self.root, rel), "rb") as fh:
+                            sha256, size = save_stream(fh, src_path)
+                    except OSError as copy_err:
+                        print(f"❌ host_sync: could not read {rel}: {copy_err}")
+                        if os.path.exists(src_path):
+                            os.remove(src_path)
+                        continue
+                    staged.append({
+                        "orig_name": secure_filename(os.path.basename(rel)) or f"host_sync{ext}",
+                        "ext": ext,
+                        "is_image": is_image(ext),
+                        "src_path": src_path,
+                        "sha256": sha256,
+                        "size": size,
+                        "rel_path": rel,
+                        "stat": st,
+                    })
+
+                ingest_staged(
+                    staged, client_id, doc_format_id, client_name, doc_type,
+                    queue_wait=HOST_SYNC_QUEUE_WAIT,
+                )
+                for f in staged:
+                    result = f.get("result") or {"status": "error", "message": "not processed"}
+                    if result["status"] == "error":
+                        print(f"❌ host_sync: {f['rel_path']}: {result.get('message')}")
+                        continue
+                    done.append((
+                        f["rel_path"], f["stat"].st_size, f["stat"].st_mtime_ns,
+                        result.get("file_name"), result["status"],
+                    ))
+
+            if not done:
+                return
+            try:
+                conn = get_request_connection()
+                self._save_checkpoint(conn, done)
+            finally:
+                release_request_connection()
+
+        for rel, size, mtime_ns, _, _ in done:
+            self.seen[rel] = (size, mtime_ns)
+        new_count = sum(1 for d in done if d[4] != "duplicate")
+        if new_count:
+            invalidate_response_cache()
+        print(f"✅ host_sync: ingested {len(done)} file(s) ({len(done) - new_count} duplicate(s))")
+
+    # --- Main loop ---
+    def run(self):
+        upload_root = os.path.abspath(UPLOAD_FOLDER)
+        if os.path.commonpath([self.root, upload_root]) == self.root:
+            # Stored uploads would come straight back in as new drops
+            self.state = "disabled"
+            self.last_error = f"{self.root} contains UPLOAD_FOLDER"
+            print(f"❌ host_sync: {self.root} contains UPLOAD_FOLDER; watcher not started")
+            return
+
+        delay = 1.0
+        while not self._stop.is_set():
+            try:
+                self._watch()
+            except Exception as e:
+                self.state = "retrying"
+                self.last_error = str(e)
+                self.restarts += 1
+                print(f"❌ host_sync: watcher failed ({e}); retrying in {delay:.0f}s")
+                traceback.print_exc()
+                self._stop.wait(delay)
+                delay = min(delay * 2, HOST_SYNC_RETRY_MAX_SECONDS)
+                continue
+            delay = 1.0
+        self.state = "stopped"
+
+    def _watch(self):
+        os.makedirs(self.root, exist_ok=True)
+        self._load_checkpoint()
+        self.pending.clear()
+        self.rescan_interval = HOST_SYNC_POLL_SECONDS
+        inotify = self._start_inotify()
+        print(f"👀 Watching {self.root} ({'inotify' if inotify else 'polling'})")
+
+        try:
+            # Whatever arrived while we were down
+            for rel in self._scan():
+                self._queue(rel)
+            next_scan = time.monotonic() + self.rescan_interval
+            self.state, self.last_error = "running", None
+
+            while not self._stop.is_set():
+                self.heartbeat = time.time()
+                timeout = max(0.0, min(1.0, next_scan - time.monotonic()))
+                if inotify:
+                    if self._handle_events(inotify, inotify.read(timeout)):
+                        next_scan = min(next_scan, time.monotonic() + HOST_SYNC_DEBOUNCE_SECONDS)
+                else:
+                    self._stop.wait(timeout)
+
+                if time.monotonic() >= next_scan:
+                    try:
+                        for rel in self._scan():
+                            self._queue(rel)
+                    except OSError as e:
+                        print(f"❌ host_sync: scan failed: {e}")
+                    next_scan = time.monotonic() + self.rescan_interval
+
+                while self._due():
+                    self._flush()
+        finally:
+            if inotify:
+                inotify.close()
+
+
+_watcher = None
+
+
+def start_watcher(app, root=None):
+    """Run a HostSyncWatcher in a daemon thread of this process."""
+    global _watcher
+    watcher = HostSyncWatcher(app, root)
+    watcher.thread = threading.Thread(target=watcher.run, name="host-sync-watcher", daemon=True)
+    watcher.thread.start()
+    _watcher = watcher
+    return watcher
+
+
+def watcher_stats():
+    """stats() of the watcher started in this process, None if there is none."""
+    return _watcher.stats() if _watcher else None
+
+
+if __name__ == "__main__":
+    # Conversion workers first, while this process has no other threads
+    conversion_jobs.start_pool()
+    # Just enough of an app for the per-request DB helpers
+    watcher_app = Flask(__name__)
+    init_db(watcher_app)
+    try:
+        HostSyncWatcher(watcher_app).run()
+    except KeyboardInterrupt:
+        print("🛑 host_sync watcher stopped")
@@ -0,0 +1,124 @@
+# workers/ingest_worker.py
+# -------------------------------------------------------------------
+# Reference consumer for doc_ingest_jobs (utils/ingest_queue.py).
+#
+#   python -m workers.ingest_worker                      # run forever
+#   python -m workers.ingest_worker --once               # drain visible jobs, exit
+#   python -m workers.ingest_worker --handler pkg.mod:fn # real extraction step
+#
+# The worker LISTENs on the queue channel and sleeps until an upload
+# commits (or INGEST_POLL_SECONDS passes, which also picks up retries
+# and jobs whose visibility timeout expired). Jobs are claimed in
+# batches of INGEST_BATCH_SIZE with FOR UPDATE SKIP LOCKED, so any
+# number of workers can run side by side. The batch shares one
+# visibility timeout, so each job's claim is extended right before its
+# handler runs; a job whose claim already expired (and was taken by
+# another worker) is skipped instead of being processed twice.
+#
+# A handler is fn(job, path) -> None; raising schedules a retry. The
+# default handler only checks the file is there, which is enough to try
+# the queue against a local Postgres:
+#   DB_HOST=localhost DB_NAME=... python -m migrations.migrate
+#   (upload a file through the API, or INSERT a row by hand)
+#   python -m workers.ingest_worker --once
+# -------------------------------------------------------------------
+
+import importlib
+import os
+import socket
+import sys
+import time
+import traceback
+from dotenv import load_dotenv
+
+INGEST_POLL_SECONDS = float(os.getenv("INGEST_POLL_SECONDS", "30"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "10"))
+
+
+def check_file_handler(job, path):
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"{job['rel_path']} not found in upload folder")
+    print(f"📄 job {job['job_id']}: {job['file_name']} ({os.path.getsize(path)} bytes) ready for extraction")
+
+
+def _load_handler(spec):
+    if not spec:
+        return check_file_handler
+    module_name, func_name = spec.split(":", 1)
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def _arg(name, default=None):
+    args = sys.argv[1:]
+    if name in args and args.index(name) + 1 < len(args):
+        return args[args.index(name) + 1]
+    return default
+
+
+def run_batch(worker_id, handler):
+    """Claim and process one batch. Returns the number of jobs claimed."""
+    from config.db_config import connection
+    from utils.ingest_queue import claim_jobs, extend_job, complete_job, fail_job
+    from utils.uploads import UPLOAD_FOLDER
+
+    with connection() as conn:
+        jobs = claim_jobs(conn, worker_id, limit=INGEST_BATCH_SIZE)
+
+    for job in jobs:
+        # The timeout started at claim time; earlier handlers in the batch used part of it
+        with connection() as conn:
+            if not extend_job(conn, job["job_id"], worker_id):
+                print(f"⚠️ job {job['job_id']}: claim expired while waiting in the batch, skipped")
+                continue
+
+        path = os.path.join(UPLOAD_FOLDER, job["rel_path"])
+        try:
+            handler(job, path)
+        except Exception as e:
+            print(f"❌ job {job['job_id']} attempt {job['attempts']}/{job['max_attempts']} failed: {e}")
+            traceback.print_exc()
+            with connection() as conn:
+                fail_job(conn, job["job_id"], worker_id, e)
+            continue
+
+        with connection() as conn:
+            if not complete_job(conn, job["job_id"], worker_id):
+                print(f"⚠️ job {job['job_id']}: claim expired before completion, another worker owns it")
+
+    return len(jobs)
+
+
+def run(once=False, handler_spec=None):
+    from config.db_config import listen_connection
+    from utils.ingest_queue import INGEST_CHANNEL
+
+    handler = _load_handler(handler_spec)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    print(f"🟢 Ingest worker {worker_id} listening on '{INGEST_CHANNEL}'")
+
+    listener = None if once else listen_connection()
+    try:
+        if listener:
+            listener.execute(f"LISTEN {INGEST_CHANNEL}")
+
+        while True:
+            # Keep claiming while there's work; full batches mean more may be waiting
+            while run_batch(worker_id, handler) == INGEST_BATCH_SIZE:
+                pass
+            if once:
+                break
+
+            # Sleep until NOTIFY (or the poll interval), then drain the rest
+            for _ in listener.notifies(timeout=INGEST_POLL_SECONDS, stop_after=1):
+                pass
+            time.sleep(0.05)
+    except KeyboardInterrupt:
+        print("🛑 Ingest worker stopped")
+    finally:
+        if listener:
+            listener.close()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    run(once="--once" in sys.argv[1:], handler_spec=_arg("--handler"))